@@ -0,0 +1,59 @@
+'''
+Benchmark of the output cache (tabbedbox/cache.py): milliseconds to get the
+SVG file of a box by generating it and storing it in the cache (a miss)
+against copying it out of the cache (a hit), for boxes with a growing
+number of dividers. Both include working out the Box and its cache key from
+the spec.
+
+usage: python bench/cache.py [-n repeats]
+'''
+import argparse,os,shutil,sys,tempfile,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+
+from tabbedbox.batch import renderSvg
+from tabbedbox.cache import OutputCache,outputKey
+from tabbedbox.core import boxFromSpec
+
+DIVIDERS = [0, 3, 12, 30]
+BASE = {'length':600, 'width':500, 'depth':120, 'tab':6, 'thickness':3}
+
+def get(cache, spec, path):
+  # the file for spec at path, from the cache if it has it; True on a hit
+  box = boxFromSpec(spec)
+  key = outputKey(box, format='svg')
+  if cache.fetch(key, path):
+    return True
+  f = open(path, 'w')
+  try:
+    f.write(renderSvg(box))
+  finally:
+    f.close()
+  cache.store(key, path)
+  return False
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the output cache')
+  parser.add_argument('-n', '--repeat', type=int, default=5)
+  args = parser.parse_args(argv)
+  work = tempfile.mkdtemp()
+  try:
+    path = os.path.join(work, 'box.svg')
+    print('%-8s %10s %10s %10s %8s' % ('dividers', 'bytes', 'miss ms', 'hit ms', 'speedup'))
+    for n in DIVIDERS:
+      spec = dict(BASE, div_l=n, div_w=n)
+      (miss,hit) = ([], [])
+      for i in range(args.repeat):
+        cache = OutputCache(os.path.join(work, 'cache%d' % i))
+        for times in (miss, hit):
+          start = time.time()
+          get(cache, spec, path)
+          times.append(time.time()-start)
+      assert cache.stats() == {'hits':1, 'misses':1, 'stores':1, 'evictions':0}
+      (miss,hit) = (min(miss), min(hit))
+      print('%-8d %10d %10.2f %10.2f %7.0fx' % (n, os.path.getsize(path), miss*1000, hit*1000, miss/hit))
+  finally:
+    shutil.rmtree(work)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,36 @@
+'''
+Benchmark of common-line cutting: segments indexed, time taken and cut
+length saved, for a box laid out with no spacing and for a sheet of parts
+nested edge to edge.
+
+usage: python bench/commonline.py
+'''
+import os,sys,time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.commonline import CommonLine
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.nest import collectParts,nest
+
+def report(name, draw):
+  cl = CommonLine()
+  draw(cl)
+  segments = sum([len(item[1])//2-1 for (part,items) in cl.parts for item in items if item[0] in ('edge','hole')])
+  start = time.time()
+  cl.trim()
+  print('%-28s %9d %9.1f   %s' % (name, segments, (time.time()-start)*1000, cl.summary()))
+
+def main():
+  print('%-28s %9s %9s' % ('case', 'segments', 'ms'))
+  box = boxFromSpec({'length':2000, 'width':2000, 'depth':200, 'tab':5, 'div_l':10, 'div_w':10,
+                     'keydiv':0, 'spacing':0, 'kerf':0})
+  report('2 m box, no spacing', lambda cl: generate(box, cl))
+  parts = []
+  for n in range(60):
+    parts.extend(collectParts(boxFromSpec({'length':80+n*37%300, 'width':60+n*53%250, 'depth':30+n*17%120,
+      'div_l':n%4, 'div_w':n*3%5, 'kerf':0}), 'b%d-' % n))
+  sheet = nest(parts, (3000.0, 3000.0), 0)[0]
+  report('sheet of %d parts, no gaps' % len(sheet.placements), sheet.draw)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,34 @@
+'''
+Report of SVG output size: element count and bytes for the plain output
+(every edge and hole its own path) against the compact output (one compound
+path per part), for a few representative boxes.
+
+usage: python bench/compact.py
+'''
+import os,sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.svg import CompactSvgDocument,SvgDocument
+
+CASES = [
+  ('default box', {}),
+  ('no dividers', {'div_l':0, 'div_w':0}),
+  ('10x10 dividers, keyed', {'length':400, 'width':400, 'depth':80, 'div_l':10, 'div_w':10, 'keydiv':0}),
+  ('3 row Schroff', {'schroff':1, 'hp':84, 'rows':3, 'depth':65, 'inside':1, 'boxtype':2, 'div_l':0, 'div_w':0}),
+]
+
+def render(spec, sink):
+  doc = sink()
+  generate(boxFromSpec(spec), doc)
+  return (len(list(doc.lines())), len(doc.tostring().encode('utf-8')))
+
+def main():
+  print('%-24s %9s %9s %10s %10s %7s' % ('case', 'elements', 'compact', 'bytes', 'compact', 'ratio'))
+  for (name,spec) in CASES:
+    (n1,b1) = render(spec, SvgDocument)
+    (n2,b2) = render(spec, CompactSvgDocument)
+    print('%-24s %9d %9d %10d %10d %6.1fx' % (name, n1, n2, b1, b2, float(b1)/b2))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,52 @@
+'''
+Benchmark of the edge kernels: core.side() against the NumPy edges.sideVector()
+on a 2 m panel with 5 mm tabs, for a bare edge and a whole box, checking
+that both give the same paths.
+
+usage: python bench/edges.py [-n repeats]
+'''
+import argparse,os,sys,timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.core import Box,Options,generate,side
+from tabbedbox.edges import numpy,sideVector
+
+class Recorder(object):  # sink keeping the drawn paths for comparison
+  def __init__(self):
+    self.paths = []
+  def drawS(self, path):
+    self.paths.append(path.coords)
+  drawHole = drawS
+  def drawCircle(self, r, centre):
+    self.paths.append((r, centre))
+  def beginPart(self, name):
+    self.paths.append(name)
+  def endPart(self):
+    pass
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the edge kernels')
+  parser.add_argument('-n', '--repeat', type=int, default=20)
+  args = parser.parse_args(argv)
+  if numpy is None:
+    sys.exit('NumPy is not installed, sideVector() would only call side()')
+
+  box = Box(Options(length=2000, width=2000, height=300, tab=5, thickness=3, kerf=0.1,
+                    div_l=10, div_w=10, keydiv=0, boxtype=1, style=1))
+  cases = [
+    ('2 m edge', lambda kernel,sink: sink.drawS(kernel(box,sink,(0,0),(0,1),(0,1),-3,2000.0,(1,0),1))),
+    ('2 m box, 10x10 dividers', lambda kernel,sink: generate(box,sink,side=kernel)),
+  ]
+  print('%-28s %12s %12s %8s' % ('case', 'side() ms', 'vector ms', 'speedup'))
+  for (name,case) in cases:
+    (a,b) = (Recorder(),Recorder())
+    case(side,a)
+    case(sideVector,b)
+    if a.paths != b.paths:
+      sys.exit('%s: kernels disagree' % name)
+    t1 = min(timeit.repeat(lambda: case(side,Recorder()), number=1, repeat=args.repeat))
+    t2 = min(timeit.repeat(lambda: case(sideVector,Recorder()), number=1, repeat=args.repeat))
+    print('%-28s %12.3f %12.3f %7.1fx' % (name, t1*1000, t2*1000, t1/t2))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,82 @@
+'''
+Benchmark of dry-run quoting (tabbedbox/estimate.py): boxes quoted per
+second over a spread of random box specs, both from checked Boxes and from
+spec dicts, against generating the same boxes into a model.PartCollector.
+For the generated sample it also reports the largest difference between
+the estimate and the cut length, pierces and layout size of the parts
+drawn; Schroff rail slots are cut as arcs in the estimate and polylines in
+the model, so it leaves Schroff out.
+
+usage: python bench/estimate.py [-n variants] [--sample n]
+'''
+import argparse,os,random,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+
+from tabbedbox.core import BoxError,boxFromSpec
+from tabbedbox.estimate import estimate
+from tabbedbox.model import SCALE,collectParts
+
+def specs(count, seed=1):
+  # count valid box specs over the box types, layouts, keying and kerfs,
+  # with tabs wider than the material is thick
+  rand = random.Random(seed)
+  found = []
+  while len(found) < count:
+    divl = rand.randint(0, 6)
+    thickness = rand.choice([3, 4, 6])
+    spec = {'length':rand.uniform(60, 600), 'width':rand.uniform(60, 500), 'depth':rand.uniform(30, 150),
+            'tab':thickness*rand.choice([1.5, 2, 3]), 'thickness':thickness, 'kerf':rand.choice([0, 0.1, 0.2]),
+            'equal':rand.randint(0, 1), 'style':rand.randint(1, 3), 'boxtype':rand.randint(1, 6),
+            'div_l':divl, 'div_w':rand.randint(0, 6), 'keydiv':rand.randint(0, 3)}
+    if rand.random() < 0.2:
+      spec['div_l_sizes'] = ','.join([str(rand.randint(1, 4)) for i in range(divl+1)])
+    try:
+      boxFromSpec(spec)
+    except BoxError:
+      continue
+    found.append(spec)
+  return found
+
+def measured(parts):
+  # (cut length, pierces, width, height) of the parts drawn
+  s = float(SCALE)
+  cut = sum([p.cutLength() for p in parts])
+  pierces = sum([len(p.outline)+len(p.holes) for p in parts])
+  width = (max([p.origin[0]+p.size[0] for p in parts])-min([p.origin[0] for p in parts]))/s
+  height = (max([p.origin[1]+p.size[1] for p in parts])-min([p.origin[1] for p in parts]))/s
+  return (cut, pierces, width, height)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark dry-run quoting')
+  parser.add_argument('-n', '--variants', type=int, default=20000)
+  parser.add_argument('--sample', type=int, default=200, help='boxes to generate for comparison')
+  args = parser.parse_args(argv)
+  sheet = specs(args.variants)
+  boxes = [boxFromSpec(spec) for spec in sheet]
+
+  start = time.time()
+  for box in boxes:
+    estimate(box)
+  boxSeconds = time.time()-start
+  start = time.time()
+  for spec in sheet:
+    estimate(boxFromSpec(spec))
+  specSeconds = time.time()-start
+  print('%d variants: %.0f/s from boxes, %.0f/s from specs' % (len(boxes), len(boxes)/boxSeconds, len(boxes)/specSeconds))
+
+  sample = boxes[:args.sample]
+  start = time.time()
+  drawn = [measured(collectParts(box)) for box in sample]
+  drawSeconds = time.time()-start
+  print('%d generated: %.0f/s, %.0fx slower' % (len(sample), len(sample)/drawSeconds,
+                                               (drawSeconds/len(sample))/(boxSeconds/len(boxes))))
+  worst = [0.0]*4
+  for (box,(cut,pierces,width,height)) in zip(sample, drawn):
+    e = estimate(box)
+    for (i,diff) in enumerate((abs(e.cut-cut), abs(e.pierces-pierces), abs(e.width-width), abs(e.height-height))):
+      worst[i] = max(worst[i], diff)
+  print('largest difference: cut %.4f mm, pierces %d, width %.4f mm, height %.4f mm' % tuple(worst))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,55 @@
+'''
+Benchmark of the divider grid (tabbedbox/grid.py) on boxes with n by n
+dividers keyed into every side: time to generate and serialize a plain SVG
+with the divider holes of each panel written as one path per hole size
+(drawPattern) against every hole as an element of its own (the drawHole
+fallback), with the holes, element count and size of each.
+
+usage: python bench/grid.py [-n repeats]
+'''
+import argparse,os,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.svg import SvgDocument
+
+DIVIDERS = [1, 3, 6, 10, 20]
+BASE = {'length':600, 'width':500, 'depth':120, 'tab':6, 'thickness':3, 'keydiv':0}
+
+class PerHoleDocument(SvgDocument):
+  drawPattern = None  # holes come one by one through drawHole()
+  holes = 0
+
+  def drawHole(self, path):
+    self.holes += 1
+    SvgDocument.drawHole(self, path)
+
+def run(box, kind, repeat):
+  # (best seconds, elements, bytes) of generating and serializing box
+  best = None
+  for i in range(repeat):
+    start = time.time()
+    doc = kind()
+    generate(box, doc)
+    text = doc.tostring()
+    elapsed = time.time()-start
+    best = elapsed if best is None else min(best, elapsed)
+  return (best, text.count('\n<'), len(text))
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the divider grid')
+  parser.add_argument('-n', '--repeat', type=int, default=3)
+  args = parser.parse_args(argv)
+  print('%9s %7s %10s %9s %10s %10s %9s %10s' % ('dividers', 'holes', 'path ms', 'elements', 'bytes', 'each ms', 'elements', 'bytes'))
+  for n in DIVIDERS:
+    box = boxFromSpec(dict(BASE, div_l=n, div_w=n))
+    counter = PerHoleDocument()
+    generate(box, counter)
+    holes = counter.holes
+    (pt,pe,pb) = run(box, SvgDocument, args.repeat)
+    (et,ee,eb) = run(box, PerHoleDocument, args.repeat)
+    print('%9s %7d %10.1f %9d %10d %10.1f %9d %10d' % ('%dx%d' % (n, n), holes, pt*1000, pe, pb, et*1000, ee, eb))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,49 @@
+'''
+Benchmark of Schroff hole patterns at growing ventilation grid densities:
+time to generate and serialize a plain SVG with each pattern written as one
+path (drawPattern) against every hole as an element of its own (the drawCircle
+fallback), with the element count and size of each.
+
+usage: python bench/holes.py [-n repeats]
+'''
+import argparse,os,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.svg import SvgDocument
+
+SCHROFF = {'schroff':1, 'hp':84, 'depth':200, 'inside':1, 'boxtype':2, 'div_l':0, 'div_w':0, 'rows':3}
+PITCHES = [10, 6, 4, 3, 2]  # mm between ventilation holes half as wide
+
+class PerHoleDocument(SvgDocument):
+  drawPattern = None  # holes come one by one through drawCircle()
+
+def run(box, kind, repeat):
+  # (best seconds, elements, bytes) of generating and serializing box
+  best = None
+  for i in range(repeat):
+    start = time.time()
+    doc = kind()
+    generate(box, doc)
+    text = doc.tostring()
+    elapsed = time.time()-start
+    best = elapsed if best is None else min(best, elapsed)
+  return (best, text.count('\n<'), len(text))
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark hole patterns')
+  parser.add_argument('-n', '--repeat', type=int, default=3)
+  args = parser.parse_args(argv)
+  print('%6s %7s %10s %9s %10s %10s %9s %10s' % ('pitch', 'holes', 'path ms', 'elements', 'bytes', 'each ms', 'elements', 'bytes'))
+  for pitch in PITCHES:
+    box = boxFromSpec(dict(SCHROFF, vent=pitch/2.0, vent_pitch=pitch))
+    counter = PerHoleDocument()
+    generate(box, counter)
+    holes = len([e for part in counter.parts for e in part[1] if isinstance(e, tuple)])
+    (pt,pe,pb) = run(box, SvgDocument, args.repeat)
+    (et,ee,eb) = run(box, PerHoleDocument, args.repeat)
+    print('%6g %7d %10.1f %9d %10d %10.1f %9d %10d' % (pitch, holes, pt*1000, pe, pb, et*1000, ee, eb))
+
+if __name__ == '__main__':
+  main()
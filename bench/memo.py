@@ -0,0 +1,69 @@
+'''
+Benchmark of memoized edges and instanced parts as the divider count grows:
+generation time and compact SVG size for plain generation, memo.Instancer
+drawing repeats out in full (flatten) and memo.Instancer with <use>, with
+the parts placed as <use> and the holes in the parts drawn.
+
+Every divider is placed, so the dividers cost a <use> each, but each one
+also keys a row of holes into the walls and floor it meets. Those holes
+are geometry of their own, in parts drawn in full, so the <use> size grows
+with them, by about 35 bytes a hole.
+
+usage: python bench/memo.py [-n repeats]
+'''
+import argparse,os,sys,timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.memo import Instancer
+from tabbedbox.svg import CompactSvgDocument
+
+DIVIDERS = [0, 2, 5, 10, 20, 40]
+
+def plain(box):
+  doc = CompactSvgDocument()
+  generate(box, doc)
+  return doc
+
+def instanced(flatten):
+  def render(box):
+    doc = CompactSvgDocument()
+    inst = Instancer(doc, flatten=flatten)
+    generate(box, inst, inst.side)
+    return doc
+  return render
+
+class HoleCounter(object):  # sink counting the holes drawn and the parts placed
+  holes = placed = 0
+  def beginPart(self, name):
+    pass
+  def endPart(self):
+    pass
+  def drawS(self, path):
+    pass
+  def drawHole(self, path):
+    self.holes += 1
+  def drawCircle(self, r, centre):
+    self.holes += 1
+  def placePart(self, name, like, offset):
+    self.placed += 1
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark memoized edges and instanced parts')
+  parser.add_argument('-n', '--repeat', type=int, default=5)
+  args = parser.parse_args(argv)
+
+  print('%-9s %10s %10s %10s %10s %10s %7s %7s' % ('dividers', 'plain ms', 'flat ms', 'use ms', 'flat bytes', 'use bytes', 'placed', 'holes'))
+  for n in DIVIDERS:
+    box = boxFromSpec({'length':800, 'width':800, 'depth':80, 'tab':5, 'div_l':n, 'div_w':n, 'keydiv':0})
+    row = []
+    for render in (plain, instanced(True), instanced(False)):
+      row.append(min(timeit.repeat(lambda: render(box).tostring(), number=1, repeat=args.repeat))*1000)
+    sizes = [len(render(box).tostring()) for render in (instanced(True), instanced(False))]
+    counter = HoleCounter()
+    inst = Instancer(counter)
+    generate(box, inst, inst.side)
+    print('%-9d %10.1f %10.1f %10.1f %10d %10d %7d %7d' % tuple([n]+row+sizes+[counter.placed, counter.holes]))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,53 @@
+'''
+Memory per part of the geometry model against the SVG strings and the
+document tree the extension builds for the same box (ElementTree through the
+inkex stub in bench/stub), for boxes with a growing number of dividers. Also
+reports how many distinct part shapes model.dedupe() finds. Python 3 only
+(tracemalloc).
+
+usage: python bench/model.py
+'''
+import os,sys,tracemalloc
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCH, 'stub'), os.path.dirname(BENCH)]
+
+import inkex
+from boxmaker import InkscapeSink
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.model import collectParts,dedupe
+from tabbedbox.svg import SvgDocument
+
+DIVIDERS = [0, 3, 12, 30]
+BASE = {'length':600, 'width':500, 'depth':120, 'tab':6, 'thickness':3}
+
+def allocated(build):
+  # (bytes still allocated by what build() returns, the result)
+  tracemalloc.start()
+  try:
+    result = build()
+    return (tracemalloc.get_traced_memory()[0], result)
+  finally:
+    tracemalloc.stop()
+
+def strings(box):
+  doc = SvgDocument()
+  generate(box, doc)
+  return list(doc.lines())
+
+def tree(box):
+  layer = inkex.etree.Element(inkex.addNS('g','svg'))
+  generate(box, InkscapeSink(layer, 1))
+  return layer
+
+def main():
+  print('%-8s %6s %7s %12s %12s %12s %7s' % ('dividers', 'parts', 'shapes', 'model B', 'strings B', 'tree B', 'ratio'))
+  for n in DIVIDERS:
+    box = boxFromSpec(dict(BASE, div_l=n, div_w=n))
+    (model,parts) = allocated(lambda: collectParts(box))
+    (text,lines) = allocated(lambda: strings(box))
+    (dom,layer) = allocated(lambda: tree(box))
+    count = len(parts)
+    print('%-8d %6d %7d %12d %12d %12d %6.1fx' % (n, count, len(dedupe(parts)), model//count, text//count, dom//count, float(dom)/model))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,36 @@
+'''
+Benchmark of sheet nesting: time to pack the parts of a growing number of
+boxes onto 1200 x 900 mm sheets, with the sheets used and their utilization.
+
+usage: python bench/nest.py [-n repeats]
+'''
+import argparse,os,sys,timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.core import boxFromSpec
+from tabbedbox.nest import collectParts,nest
+
+SHEET = (1200.0, 900.0)
+BOXES = [1, 10, 30, 60]
+
+def spec(n):  # a spread of box sizes and divider counts
+  return {'length':80+n*37%300, 'width':60+n*53%250, 'depth':30+n*17%120,
+          'div_l':n%4, 'div_w':n*3%5, 'boxtype':1+n%6, 'style':1+n%3}
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark sheet nesting')
+  parser.add_argument('-n', '--repeat', type=int, default=5)
+  args = parser.parse_args(argv)
+
+  print('%-6s %6s %9s %7s %9s' % ('boxes', 'parts', 'nest ms', 'sheets', 'used'))
+  for count in BOXES:
+    parts = []
+    for n in range(count):
+      parts.extend(collectParts(boxFromSpec(spec(n)), 'b%d-' % n))
+    seconds = min(timeit.repeat(lambda: nest(parts, SHEET), number=1, repeat=args.repeat))
+    sheets = nest(parts, SHEET)
+    used = sum([sheet.used() for sheet in sheets])/(len(sheets)*SHEET[0]*SHEET[1])
+    print('%-6d %6d %9.1f %7d %8.1f%%' % (count, len(parts), seconds*1000, len(sheets), used*100))
+
+if __name__ == '__main__':
+  main()
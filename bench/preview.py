@@ -0,0 +1,81 @@
+'''
+Benchmark of updating a box in place (--update=1) against drawing it again
+on a new layer, for a run of single setting changes on one document, the
+way a live preview is used. Runs boxmaker.py in process with the inkex stub
+in bench/stub. It also times incremental.partKeys() on the box and fails if
+working out the keys computes any divider hole.
+
+usage: python bench/preview.py [--dividers n] [-n repeats]
+'''
+import argparse,os,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCH, 'stub'), os.path.dirname(BENCH)]
+
+import inkex
+from boxmaker import BoxMaker
+from tabbedbox import grid
+from tabbedbox.core import OPTIONS,boxFromSpec
+from tabbedbox.incremental import partKeys
+
+STEPS = [('first run', {}), ('kerf', {'kerf':0.15}), ('spacing', {'spacing':3}),
+         ('div_l', {'div_l':-1}), ('div_w', {'div_w':-1}), ('style', {'style':3}),
+         ('tab', {'tab':8}), ('spacing back', {'spacing':1})]
+
+def document():
+  root = inkex.etree.Element(inkex.addNS('svg','svg'), {'width':'10000mm', 'height':'10000mm'})
+  return inkex.etree.ElementTree(root)
+
+def run(doc, spec, update):
+  # seconds for one run of the effect on doc
+  effect = BoxMaker()
+  effect.getoptions(['--%s=%s' % item for item in sorted(spec.items())]+['--update=%d' % update, os.devnull])
+  effect.document = doc
+  effect.current_layer = doc.getroot()
+  start = time.time()
+  effect.effect()
+  return time.time()-start
+
+def keys(spec, repeat):
+  # best seconds for partKeys() of the box of spec, which must not draw a hole
+  box = boxFromSpec(spec)
+  holes = grid.holes
+  def refuse(*args):
+    raise AssertionError('partKeys() computed divider holes')
+  grid.holes = refuse
+  try:
+    best = None
+    for i in range(repeat):
+      start = time.time()
+      partKeys(box)
+      elapsed = time.time()-start
+      best = elapsed if best is None else min(best, elapsed)
+  finally:
+    grid.holes = holes
+  return best
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark in-place updates for live preview')
+  parser.add_argument('--dividers', type=int, default=10, help='dividers along each axis (default: 10, the dialog maximum)')
+  parser.add_argument('-n', '--repeat', type=int, default=3)
+  args = parser.parse_args(argv)
+
+  base = dict([(name,default) for (name,dest,kind,default) in OPTIONS])
+  base.update(length=600, width=500, depth=120, div_l=args.dividers, div_w=args.dividers, keydiv=0)
+  print('partKeys: %.1f ms' % (keys(base, args.repeat)*1000))
+  print('%-14s %10s %10s' % ('change', 'new ms', 'update ms'))
+  best = {}
+  for repeat in range(args.repeat):
+    (fresh,updated) = (document(), document())
+    spec = dict(base)
+    for (label,change) in STEPS:
+      for (key,value) in change.items():
+        spec[key] = spec[key]+value if value < 0 else value
+      times = (run(fresh, spec, 0), run(updated, spec, 1))
+      best[label] = [min(pair) for pair in zip(best.get(label, times), times)]
+  for (label,change) in STEPS:
+    print('%-14s %10.1f %10.1f' % (label, best[label][0]*1000, best[label][1]*1000))
+  print('after %d runs: %d elements under the root drawing new layers, %d updating in place' % (
+    len(STEPS), len(fresh.getroot()), len(updated.getroot())))
+
+if __name__ == '__main__':
+  main()
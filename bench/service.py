@@ -0,0 +1,128 @@
+'''
+Load test of the generation service (tabbedbox/service.py). Starts a local
+instance, or uses the one at --url, then keeps --concurrency connections
+each sending box requests back to back until --requests have been made,
+over a fixed mix of box sizes and divider counts. Reports requests per
+second, client side latency quantiles and the status codes seen (503 is the
+queue pushing back), then the service's own /metrics.json. With --spawn n it
+first times n runs of python -m tabbedbox, the process per box the service
+saves.
+
+Needs Python 3.7+.
+
+usage: python bench/service.py [-n requests] [-c concurrency] [-j jobs] [--queue n] [--format svg|dxf|gcode] [--url http://host:port] [--spawn n]
+'''
+import argparse,asyncio,collections,json,os,random,subprocess,sys,time
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+SPAWN = ['--length=180', '--width=240', '--depth=50', '--div_l=2', '--div_w=3', '-o', os.devnull]
+
+def specs(count, seed=1):
+  # count box specs: sizes 60-400 mm, up to 6 dividers each way
+  rand = random.Random(seed)
+  return [{'length':rand.randint(80, 400), 'width':rand.randint(60, 300), 'depth':rand.randint(30, 120),
+           'div_l':rand.randint(0, 6), 'div_w':rand.randint(0, 6), 'tab':6, 'thickness':3} for i in range(count)]
+
+def quantile(values, q):  # nearest rank of sorted values
+  return values[min(len(values)-1, int(q*len(values)))]
+
+async def request(reader, writer, host, target, body):
+  # (status, body bytes, connection closed) of one POST on a kept alive connection
+  writer.write(('POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n'
+                % (target, host, len(body))).encode('latin-1')+body)
+  status = int((await reader.readline()).split()[1])
+  headers = {}
+  while True:
+    line = await reader.readline()
+    if line in (b'\r\n', b''):
+      break
+    (name,colon,value) = line.decode('latin-1').partition(':')
+    headers[name.strip().lower()] = value.strip()
+  data = await reader.readexactly(int(headers['content-length']))
+  return (status, data, headers.get('connection', '').lower() == 'close')
+
+async def client(host, port, target, work, latencies, statuses):
+  # send the specs left in work one at a time over one connection
+  (reader,writer) = await asyncio.open_connection(host, port)
+  try:
+    while work:
+      body = json.dumps(work.pop()).encode('utf-8')
+      start = time.time()
+      (status,data,closed) = await request(reader, writer, host, target, body)
+      latencies.append(time.time()-start)
+      statuses[status] += 1
+      if closed:
+        writer.close()
+        (reader,writer) = await asyncio.open_connection(host, port)
+  finally:
+    writer.close()
+
+async def load(host, port, target, work, concurrency):
+  latencies = []
+  statuses = collections.Counter()
+  start = time.time()
+  await asyncio.gather(*[client(host, port, target, work, latencies, statuses) for i in range(concurrency)])
+  return (time.time()-start, sorted(latencies), statuses)
+
+def startService(jobs, queue):
+  # (process, url) of a local service on a free port, once it is listening
+  argv = [sys.executable, '-m', 'tabbedbox.service', '--port', '0', '--queue', str(queue)]
+  if jobs:
+    argv.extend(['-j', str(jobs)])
+  proc = subprocess.Popen(argv, stdout=subprocess.PIPE, cwd=ROOT)
+  line = proc.stdout.readline().decode('utf-8')
+  if not line.startswith('serving on '):
+    proc.kill()
+    raise RuntimeError('service did not start')
+  return (proc, line.split()[2].rstrip('/'))
+
+def spawnTime(count):
+  # seconds per box running python -m tabbedbox in a new process each time
+  start = time.time()
+  for i in range(count):
+    subprocess.check_call([sys.executable, '-m', 'tabbedbox']+SPAWN, cwd=ROOT)
+  return (time.time()-start)/count
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Load test the generation service')
+  parser.add_argument('-n', '--requests', type=int, default=500)
+  parser.add_argument('-c', '--concurrency', type=int, default=16, help='connections kept busy at once')
+  parser.add_argument('-j', '--jobs', type=int, default=0, help='workers of the local service (default: one per cpu)')
+  parser.add_argument('--queue', type=int, default=64, help='queue places of the local service')
+  parser.add_argument('--format', default='svg', choices=('svg','dxf','gcode'))
+  parser.add_argument('--url', help='service to test instead of a local one')
+  parser.add_argument('--spawn', type=int, default=0, help='also time this many runs of python -m tabbedbox')
+  args = parser.parse_args(argv)
+
+  if args.spawn:
+    print('process per box: %.1f ms' % (spawnTime(args.spawn)*1000))
+  proc = None
+  url = args.url
+  if not url:
+    (proc,url) = startService(args.jobs, args.queue)
+  try:
+    address = urlsplit(url)
+    work = specs(args.requests)
+    (seconds,latencies,statuses) = asyncio.run(load(address.hostname, address.port, '/box?format='+args.format, work, args.concurrency))
+    print('%d requests in %.2fs: %.1f/s with %d connections' % (len(latencies), seconds, len(latencies)/seconds, args.concurrency))
+    print('status   %s' % ', '.join(['%d: %d' % item for item in sorted(statuses.items())]))
+    print('client   ms p50 %.1f  p90 %.1f  p99 %.1f  max %.1f' % tuple(
+      [quantile(latencies, q)*1000 for q in (0.5, 0.9, 0.99)]+[latencies[-1]*1000]))
+    metrics = json.loads(urlopen(url+'/metrics.json').read().decode('utf-8'))
+    for stage in ('queue','generate','total'):
+      l = metrics['latency'][stage]
+      if l['count']:
+        print('%-8s ms p50 %.1f  p90 %.1f  p99 %.1f  max %.1f' % (stage, l['p50']*1000, l['p90']*1000, l['p99']*1000, l['max']*1000))
+    queue = metrics['queue']
+    print('queue    peak %d of %d, %d workers' % (queue['peak'], queue['capacity'], metrics['workers']['count']))
+  finally:
+    if proc:
+      proc.terminate()
+      proc.wait()
+
+if __name__ == '__main__':
+  main()
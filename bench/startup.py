@@ -0,0 +1,72 @@
+'''
+Cold start cost of generating a single box from the command line: wall time
+of a fresh interpreter running the bare interpreter, importing the core,
+python -m tabbedbox and boxmaker.py (under the inkex stub in bench/stub),
+then the -X importtime breakdown of python -m tabbedbox (Python 3.7+) with
+the modules that take longest to import.
+
+usage: python bench/startup.py [-n repeats] [--top n]
+'''
+import argparse,os,subprocess,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+from tabbedbox.core import OPTIONS
+
+BOX = ['--length=180', '--width=240', '--depth=50', '--div_l=2', '--div_w=3']
+
+def commands():
+  # (label, argv, extra PYTHONPATH entries)
+  extension = ['--%s=%s' % (name, default) for (name,dest,kind,default) in OPTIONS]
+  return [
+    ('interpreter', ['-c', 'pass'], []),
+    ('import tabbedbox.core', ['-c', 'import tabbedbox.core'], []),
+    ('python -m tabbedbox', ['-m', 'tabbedbox']+BOX+['-o', os.devnull], []),
+    ('boxmaker.py (stub inkex)', [os.path.join(ROOT, 'boxmaker.py')]+extension+BOX+[os.devnull], [os.path.join(BENCH, 'stub')]),
+  ]
+
+def run(argv, path, flags=()):
+  env = dict(os.environ, PYTHONPATH=os.pathsep.join(path+[ROOT]))
+  env.pop('PYTHONDONTWRITEBYTECODE', None)  # time with compiled modules cached, as installed
+  start = time.time()
+  proc = subprocess.Popen([sys.executable]+list(flags)+argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=ROOT, env=env)
+  (out,err) = proc.communicate()
+  if proc.returncode:
+    raise RuntimeError('%s failed: %s' % (' '.join(argv), err.decode('utf-8', 'replace')))
+  return (time.time()-start, err.decode('utf-8', 'replace'))
+
+def importTimes(text):
+  # [(self us, cumulative us, module)] from -X importtime output
+  rows = []
+  for line in text.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    (own,cumulative,name) = line[len('import time:'):].split('|')
+    rows.append((int(own), int(cumulative), name.rstrip()))
+  return rows
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark cold start of a single box')
+  parser.add_argument('-n', '--repeat', type=int, default=10)
+  parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+  args = parser.parse_args(argv)
+
+  print('%-26s %9s' % ('command', 'best ms'))
+  for (label,argv,path) in commands():
+    run(argv, path)  # compile and cache the modules first
+    best = min([run(argv, path)[0] for i in range(args.repeat)])
+    print('%-26s %9.1f' % (label, best*1000))
+
+  if sys.version_info < (3, 7):
+    return 0
+  (label,argv,path) = commands()[2]
+  rows = importTimes(run(argv, path, ['-X', 'importtime'])[1])
+  print('\n%s: %d modules imported in %.1f ms' % (label, len(rows), sum([r[0] for r in rows])/1000.0))
+  print('%9s %9s  %s' % ('self ms', 'total ms', 'module'))
+  for (own,cumulative,name) in sorted(rows, reverse=True)[:args.top]:
+    print('%9.1f %9.1f  %s' % (own/1000.0, cumulative/1000.0, name))
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
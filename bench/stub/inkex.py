@@ -0,0 +1,51 @@
+'''
+Stand-in for the parts of the Inkscape 0.92 inkex module that boxmaker.py
+uses, so the extension can be run headless by bench/suite.py. The document
+is a blank SVG in millimetre user units, which is what unittouu() converts
+to, and affect() writes it to stdout like Inkscape's does.
+'''
+import optparse,sys
+try:
+  from lxml import etree
+except ImportError:
+  import xml.etree.ElementTree as etree
+
+NSS = {'svg':'http://www.w3.org/2000/svg',
+       'inkscape':'http://www.inkscape.org/namespaces/inkscape',
+       'sodipodi':'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd'}
+MM_PER_UNIT = {'mm':1.0, 'cm':10.0, 'm':1000.0, 'in':25.4,
+               'pt':25.4/72, 'pc':25.4/6, 'px':25.4/96}
+SIZE = '10000mm'  # document width and height
+
+def addNS(tag, ns=None):
+  return '{%s}%s' % (NSS[ns], tag) if ns else tag
+
+def errormsg(msg):
+  sys.stderr.write(msg+'\n')
+
+class Effect(object):
+  def __init__(self):
+    self.OptionParser = optparse.OptionParser(usage='usage: %prog [options] SVGfile')
+
+  def unittouu(self, string):
+    string = str(string).strip()
+    for unit in sorted(MM_PER_UNIT, key=len, reverse=True):
+      if string.endswith(unit):
+        return float(string[:-len(unit)])*MM_PER_UNIT[unit]
+    return float(string)
+
+  def getoptions(self, args=sys.argv[1:]):
+    (self.options,self.args) = self.OptionParser.parse_args(args)
+
+  def affect(self, args=sys.argv[1:], output=True):
+    self.getoptions(args)
+    root = etree.Element(addNS('svg','svg'), {'width':SIZE, 'height':SIZE, 'viewBox':'0 0 10000 10000'})
+    self.document = etree.ElementTree(root)
+    self.current_layer = root
+    self.effect()
+    if output:
+      self.output()
+
+  def output(self):
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    out.write(etree.tostring(self.document.getroot()))
@@ -0,0 +1,5 @@
+'''
+Stand-in for Inkscape's simplestyle module, see inkex.py.
+'''
+def formatStyle(a):
+  return ';'.join(['%s:%s' % (k,v) for (k,v) in a.items()])
@@ -0,0 +1,233 @@
+'''
+Benchmark and regression suite over the parameter space: every box type,
+layout and divider keying option, with divider counts from none to many,
+plus a few Schroff cases, some with rail slots or ventilation grids.
+
+For each case it reports the generation time (best of -n runs), the peak
+memory allocated while generating (Python 3 only), and the element count
+and size of the plain SVG output. It also takes a fingerprint of the cut
+geometry: every non-empty segment of every part, ends in either order,
+rounded to a nanometre, plus the circles. Drawing order, joins between
+edges and where closed contours start do not change the fingerprint, so
+faster kernels and output stages can be checked against bench/golden.json
+(taken from core.side(), itself checked against the original extension).
+
+--inkex runs each case through boxmaker.py instead, with the inkex stub in
+bench/stub, and checks that the extension draws the same paths as the core.
+
+usage: python bench/suite.py [-k filter] [-n repeats] [--vector] [--memo] [--order] [--inkex] [--update]
+'''
+import argparse,hashlib,json,os,subprocess,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+from tabbedbox.core import OPTIONS,PRECISION,BoxError,boxFromSpec,generate,side
+from tabbedbox.memo import Instancer
+from tabbedbox.svg import SvgDocument
+from tabbedbox.toolpath import Toolpath
+
+try:
+  import tracemalloc
+except ImportError:
+  tracemalloc = None
+
+GOLDEN = os.path.join(BENCH, 'golden.json')
+DIVIDERS = [0, 1, 3, 12, 48]
+BASE = {'length':600, 'width':500, 'depth':120, 'tab':6, 'thickness':3}
+SCHROFF = {'schroff':1, 'hp':84, 'depth':65, 'inside':1, 'boxtype':2, 'div_l':0, 'div_w':0}
+
+def cases():
+  # (id, spec) for every case of the sweep
+  for boxtype in range(1, 7):
+    for layout in range(1, 5):
+      for keydiv in range(0, 4):
+        for n in DIVIDERS:
+          spec = dict(BASE, boxtype=boxtype, style=layout, keydiv=keydiv, div_l=n, div_w=n)
+          yield ('bt%d-l%d-k%d-d%d' % (boxtype, layout, keydiv, n), spec)
+  for rows in (1, 2, 3):
+    for layout in range(1, 5):
+      yield ('schroff-r%d-l%d' % (rows, layout), dict(SCHROFF, rows=rows, style=layout))
+  yield ('schroff-slots', dict(SCHROFF, rows=2, rail_slot=6))
+  yield ('schroff-vent', dict(SCHROFF, rows=3, vent=4, vent_pitch=6))
+  yield ('schroff-vent-fine', dict(SCHROFF, rows=3, vent=2, vent_pitch=3, vent_margin=5, rail_slot=4))
+
+
+class Fingerprint(object):
+  # sink hashing the cut geometry of each part independent of drawing order
+  SCALE = 1e6
+
+  def __init__(self):
+    self.parts = {}
+
+  def beginPart(self, name):
+    self.part = self.parts.setdefault(name, [])
+
+  def endPart(self):
+    pass
+
+  def drawS(self, path):
+    c = [int(round(v*self.SCALE)) for v in path.coords]
+    for i in range(2, len(c), 2):
+      (a,b) = ((c[i-2],c[i-1]), (c[i],c[i+1]))
+      if a != b:
+        self.part.append(min(a,b)+max(a,b))
+
+  drawHole = drawS
+
+  def drawCircle(self, r, centre):
+    self.part.append(tuple([int(round(v*self.SCALE)) for v in (r,)+tuple(centre)]))
+
+  def digest(self):
+    text = ';'.join(['%s:%s' % (name, sorted(segments)) for (name,segments) in sorted(self.parts.items())])
+    return hashlib.sha1(text.encode('ascii')).hexdigest()
+
+def draw(box, sink, options):
+  # generate box into sink the way the options ask for
+  kernel = side
+  if options.vector:
+    from tabbedbox.edges import sideVector as kernel
+  if options.order:
+    tp = Toolpath()
+    draw(box, tp, argparse.Namespace(vector=options.vector, memo=options.memo, order=False))
+    tp.draw(sink)
+  elif options.memo:
+    inst = Instancer(sink)
+    inst.edges.kernel = kernel
+    generate(box, inst, inst.side)
+  else:
+    generate(box, sink, kernel)
+
+def measure(spec, options):
+  # (ms, peak KiB or None, elements, bytes, fingerprint) for one case
+  try:
+    box = boxFromSpec(spec)
+  except BoxError as e:
+    return (0.0, None, 0, 0, 'error: '+'; '.join(e.args))
+  best = None
+  for run in range(options.repeat):
+    start = time.time()
+    doc = SvgDocument(box.hairline, box.spacing)
+    draw(box, doc, options)
+    seconds = time.time()-start
+    best = seconds if best is None else min(best, seconds)
+  peak = None
+  if tracemalloc:
+    tracemalloc.start()
+    draw(box, SvgDocument(box.hairline, box.spacing), options)
+    peak = tracemalloc.get_traced_memory()[1]//1024
+    tracemalloc.stop()
+  fp = Fingerprint()
+  draw(box, fp, options)
+  return (best*1000, peak, len(list(doc.lines())), len(doc.tostring().encode('utf-8')), fp.digest())
+
+
+class Paths(object):
+  # sink keeping path data the way the extension writes it
+  def __init__(self):
+    self.paths = []
+  def beginPart(self, name):
+    pass
+  def endPart(self):
+    pass
+  def drawS(self, path):
+    self.paths.append(path.d(PRECISION))
+  drawHole = drawS
+  def drawCircle(self, r, centre):
+    self.paths.append((float(centre[0]), float(centre[1]), float(r)))
+  def drawPattern(self, pattern):
+    if len(pattern):
+      self.paths.append(pattern.d(PRECISION))
+
+def inkexPaths(spec):
+  # paths drawn by boxmaker.py under the inkex stub, None if it rejects the box
+  values = dict([(name,default) for (name,dest,kind,default) in OPTIONS])
+  values.update(spec)
+  args = [sys.executable, os.path.join(ROOT, 'boxmaker.py')]
+  for (name,value) in sorted(values.items()):
+    args.append('--%s=%s' % (name, value))
+  env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(BENCH, 'stub'), ROOT]))
+  proc = subprocess.Popen(args+[os.devnull], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+  (out,err) = proc.communicate()
+  if proc.returncode or not out:
+    return None
+  sys.path.insert(0, os.path.join(BENCH, 'stub'))
+  try:
+    import inkex
+  finally:
+    sys.path.pop(0)
+  paths = []
+  for el in inkex.etree.fromstring(out).iter(inkex.addNS('path','svg')):
+    if el.get('d') is not None:
+      paths.append(el.get('d'))
+    else:
+      paths.append(tuple([float(el.get(inkex.addNS(a,'sodipodi'))) for a in ('cx','cy','rx')]))
+  return paths
+
+def checkInkex(selected):
+  failed = 0
+  for (name,spec) in selected:
+    try:
+      box = boxFromSpec(spec)
+      sink = Paths()
+      generate(box, sink)
+      expected = sink.paths
+    except BoxError:
+      expected = None
+    start = time.time()
+    got = inkexPaths(spec)
+    ok = got == expected
+    failed += not ok
+    print('%-18s %9.1f %s' % (name, (time.time()-start)*1000, 'ok' if ok else 'DIFFERS'))
+  print('%d cases, %d differ' % (len(selected), failed))
+  return 1 if failed else 0
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark and regression suite')
+  parser.add_argument('-k', '--filter', default='', help='only cases whose id contains this')
+  parser.add_argument('-n', '--repeat', type=int, default=3, help='timing runs per case')
+  parser.add_argument('--vector', action='store_true', help='use the NumPy edge kernel')
+  parser.add_argument('--memo', action='store_true', help='generate through the edge cache')
+  parser.add_argument('--order', action='store_true', help='put the parts in cutting order')
+  parser.add_argument('--inkex', action='store_true', help='check boxmaker.py under the inkex stub')
+  parser.add_argument('--update', action='store_true', help='write the fingerprints to golden.json')
+  options = parser.parse_args(argv)
+
+  selected = [(name,spec) for (name,spec) in cases() if options.filter in name]
+  if options.inkex:
+    return checkInkex(selected)
+  golden = {}
+  if os.path.exists(GOLDEN):
+    f = open(GOLDEN)
+    try:
+      golden = json.load(f)
+    finally:
+      f.close()
+
+  print('%-18s %9s %9s %9s %10s  %s' % ('case', 'ms', 'peak KiB', 'elements', 'bytes', 'geometry'))
+  total = 0.0
+  failed = []
+  for (name,spec) in selected:
+    (ms,peak,elements,size,fingerprint) = measure(spec, options)
+    total += ms
+    if options.update:
+      golden[name] = fingerprint
+      status = 'stored'
+    elif golden.get(name) == fingerprint:
+      status = 'ok'
+    else:
+      status = 'DIFFERS' if name in golden else 'no golden'
+      failed.append(name)
+    print('%-18s %9.1f %9s %9d %10d  %s' % (name, ms, '-' if peak is None else peak, elements, size, status))
+  print('%d cases in %.1f ms of generation, %d failed' % (len(selected), total, len(failed)))
+  if options.update:
+    f = open(GOLDEN, 'w')
+    try:
+      json.dump(golden, f, indent=0, sort_keys=True)
+      f.write('\n')
+    finally:
+      f.close()
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,40 @@
+'''
+Report of toolpath ordering: rapid travel in drawing order against cutting
+order, and the time taken to work the order out, for single boxes and for a
+sheet of nested parts.
+
+usage: python bench/toolpath.py
+'''
+import os,sys,time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabbedbox.core import boxFromSpec,generate
+from tabbedbox.nest import collectParts,nest
+from tabbedbox.toolpath import Toolpath
+
+CASES = [
+  ('default box', {}),
+  ('10x10 dividers, keyed', {'length':400, 'width':400, 'depth':80, 'div_l':10, 'div_w':10, 'keydiv':0}),
+  ('2 m box, 5 mm tabs', {'length':2000, 'width':2000, 'depth':200, 'tab':5, 'div_l':10, 'div_w':10, 'keydiv':0}),
+]
+
+def report(name, draw):
+  tp = Toolpath()
+  draw(tp)
+  start = time.time()
+  tp.order()
+  print('%-26s %12.0f %12.0f %9.1f' % (name, tp.travelBefore, tp.travelAfter, (time.time()-start)*1000))
+
+def main():
+  print('%-26s %12s %12s %9s' % ('case', 'before mm', 'after mm', 'order ms'))
+  for (name,spec) in CASES:
+    report(name, lambda tp: generate(boxFromSpec(spec), tp))
+  parts = []
+  for n in range(30):
+    parts.extend(collectParts(boxFromSpec({'length':80+n*37%300, 'width':60+n*53%250, 'depth':30+n*17%120,
+      'div_l':n%4, 'div_w':n*3%5}), 'b%d-' % n))
+  sheet = nest(parts, (3000.0, 3000.0))[0]
+  report('sheet of %d nested parts' % len(sheet.placements), sheet.draw)
+
+if __name__ == '__main__':
+  main()
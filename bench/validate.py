@@ -0,0 +1,42 @@
+'''
+Benchmark of the geometry check (tabbedbox/validate.py): milliseconds to
+generate a box into a model.PartCollector against checking the parts it
+holds, for boxes with a growing number of dividers, with the segments and
+the problems found.
+
+usage: python bench/validate.py [-n repeats]
+'''
+import argparse,os,sys,time
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+
+from tabbedbox.core import boxFromSpec
+from tabbedbox.model import collectParts
+from tabbedbox.validate import validateParts
+
+DIVIDERS = [0, 3, 12, 30]
+BASE = {'length':600, 'width':500, 'depth':120, 'tab':6, 'thickness':3}
+
+def best(repeat, f):
+  # (seconds, result) of the fastest of repeat calls to f
+  times = []
+  for i in range(repeat):
+    start = time.time()
+    result = f()
+    times.append(time.time()-start)
+  return (min(times), result)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the geometry check')
+  parser.add_argument('-n', '--repeat', type=int, default=5)
+  args = parser.parse_args(argv)
+  print('%-8s %10s %10s %10s %8s %8s' % ('dividers', 'segments', 'draw ms', 'check ms', 'ratio', 'problems'))
+  for n in DIVIDERS:
+    box = boxFromSpec(dict(BASE, div_l=n, div_w=n))
+    (draw,parts) = best(args.repeat, lambda: collectParts(box))
+    (check,problems) = best(args.repeat, lambda: validateParts(parts))
+    segments = sum([len(e) for p in parts for e in p.outline+p.holes])
+    print('%-8d %10d %10.2f %10.2f %8.2f %8d' % (n, segments, draw*1000, check*1000, check/draw, len(problems)))
+
+if __name__ == '__main__':
+  main()
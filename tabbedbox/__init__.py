@@ -0,0 +1,6 @@
+'''
+Headless tabbed box generation, shared with the Inkscape extension in
+boxmaker.py.
+'''
+from .core import Box,BoxError,Options,boxFromSpec,generate,optionsFromSpec,side
+from .svg import SvgDocument
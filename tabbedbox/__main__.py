@@ -0,0 +1,39 @@
+'''
+Single box from the command line, with the options of the extension:
+
+usage: python -m tabbedbox --length 180 --width 240 --depth 50 [...] [-o box.svg] [--compact] [--precision n]
+
+Only the geometry core and the SVG writer are loaded, so a box costs little
+more than starting the interpreter; see bench/startup.py.
+'''
+import argparse,sys
+
+from .core import OPTION_HELP,OPTIONS,PRECISION,BoxError,boxFromSpec,generate
+from .svg import CompactSvgDocument,SvgDocument
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='tabbedbox', description='Generate one tabbed box as SVG')
+  for (name,dest,kind,default) in OPTIONS:
+    parser.add_argument('--'+name, type=kind, default=default, help='%s (default: %s)' % (OPTION_HELP[name], default))
+  parser.add_argument('-o', '--output', default='-', help='SVG file to write (default: stdout)')
+  parser.add_argument('--compact', action='store_true', help='one compound path per part')
+  parser.add_argument('--precision', type=int, default=PRECISION, help='decimals written for coordinates (default: %d)' % PRECISION)
+  args = parser.parse_args(argv)
+
+  spec = dict([(name, getattr(args, name)) for (name,dest,kind,default) in OPTIONS])
+  try:
+    box = boxFromSpec(spec)
+  except BoxError as e:
+    for error in e.args:
+      sys.stderr.write(error+'\n')
+    return 1
+  doc = (CompactSvgDocument if args.compact else SvgDocument)(box.hairline, box.spacing, args.precision)
+  generate(box, doc)
+  if args.output == '-':
+    sys.stdout.write(doc.tostring())
+  else:
+    doc.write(args.output)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
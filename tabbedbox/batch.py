@@ -0,0 +1,397 @@
+'''
+Headless batch generation: reads a CSV or JSONL sheet of box specs and
+renders one SVG per spec across a pool of worker processes.
+
+Spec fields are the command line option names of the extension (length,
+width, depth, tab, kerf, boxtype, div_l, ...); missing or blank fields take
+the boxmaker.inx defaults. An optional "name" field sets the output file
+name, otherwise rows are numbered in input order.
+
+Every box is checked as it is drawn for holes and contours that cross and
+parts that overlap (see validate.py) unless --no-validate is given; boxes
+with problems are still written, and the problems listed.
+
+With --cache DIR, finished files are kept in an on-disk cache (see
+cache.py) and a spec that comes to a box rendered before with the same
+output settings is copied from there instead of generated.
+
+With --dry-run nothing is drawn: each spec is quoted instead (see
+estimate.py), one CSV row of cut length, pierces, material and machine
+time at --feed per box on stdout.
+
+usage: python -m tabbedbox.batch specs.csv -o outdir [-j jobs] [--vector] [--precision n] [--compact] [--memo [--flatten]] [--stream] [--order] [--common-line] [--trace file]
+       [--format svg|dxf|gcode] [--feed mm/min] [--power s] [--cache dir [--cache-size MB]] [--no-validate]
+       python -m tabbedbox.batch specs.csv --dry-run [--feed mm/min] [--pierce-time s]
+'''
+import argparse,csv,json,multiprocessing,os,re,sys,time
+try:
+  from cStringIO import StringIO
+except ImportError:  # Python 3
+  from io import StringIO
+
+from .cache import MB,SIZE,OutputCache,outputKey,summary
+from .core import PRECISION,Box,BoxError,boxFromSpec,generate,side
+from .estimate import estimate
+from .memo import EdgeCache,Instancer
+from .commonline import CommonLine
+from .machine import FEED,POWER,DxfDocument,GcodeDocument
+from .toolpath import Toolpath
+from .trace import Recorder
+from .validate import ValidatingSink,describe
+from .svg import CompactSvgDocument,StreamingCompactSvgDocument,StreamingSvgDocument,SvgDocument
+
+def readSpecs(path):
+  # list of spec dicts from a .csv file (with header row) or a JSON-lines file
+  f = open(path)
+  try:
+    if path.lower().endswith('.csv'):
+      return [dict(row) for row in csv.DictReader(f)]
+    return [json.loads(line) for line in f if line.strip()]
+  finally:
+    f.close()
+
+def renderSvg(spec, kernel=side, precision=PRECISION, compact=False, memo=False, flatten=False, order=False, commonLine=False, trace=None, problems=None):
+  # SVG document text for one spec, raises BoxError for rejected settings;
+  # compact writes one compound path per part, memo computes each distinct
+  # edge once and places repeated parts with <use> unless flatten is set,
+  # order draws the parts in cutting order (see toolpath.py) and commonLine
+  # cuts lines shared by parts once (see commonline.py); trace is a
+  # trace.Recorder to record the run in; problems, if a list, gets the
+  # problems validate.py finds in the box added to it
+  box = _box(spec, trace)
+  doc = (CompactSvgDocument if compact else SvgDocument)(box.hairline, box.spacing, precision)
+  check = problems is not None
+  if trace is None:
+    _validate(_draw(box, doc, kernel, memo, flatten, order, commonLine, check), problems)
+    return doc.tostring()
+  with trace.span('generate'):
+    checked = _draw(box, trace.sink(doc), trace.kernel(kernel), memo, flatten, order, commonLine, check)
+  _validate(checked, problems, trace)
+  with trace.span('serialize'):
+    return doc.tostring()
+
+def streamSvg(spec, path, kernel=side, precision=PRECISION, compact=False, memo=False, flatten=False, order=False, commonLine=False, trace=None, problems=None):
+  # as renderSvg(), writing each part to the file at path as it is generated;
+  # raises BoxError before the file is created
+  box = _box(spec, trace)
+  check = problems is not None
+  f = open(path, 'w')
+  try:
+    doc = (StreamingCompactSvgDocument if compact else StreamingSvgDocument)(f, box.hairline, box.spacing, precision)
+    if trace is None:
+      checked = _draw(box, doc, kernel, memo, flatten, order, commonLine, check)
+      doc.close()
+      _validate(checked, problems)
+    else:
+      # parts are written as they are drawn, so serialize only has the end
+      with trace.span('generate'):
+        checked = _draw(box, trace.sink(doc), trace.kernel(kernel), memo, flatten, order, commonLine, check)
+      with trace.span('serialize'):
+        doc.close()
+      _validate(checked, problems, trace)
+  finally:
+    f.close()
+
+def writeMachine(spec, path, format, kernel=side, precision=PRECISION, memo=False, order=False, commonLine=False, trace=None, feed=FEED, power=POWER, problems=None):
+  # write one spec to the file at path as 'dxf' or 'gcode' (see machine.py),
+  # part by part; raises BoxError before the file is created
+  box = _box(spec, trace)
+  f = open(path, 'w')
+  try:
+    _drawMachine(box, f, format, kernel, precision, memo, order, commonLine, trace, feed, power, problems)
+  finally:
+    f.close()
+
+def renderMachine(spec, format, kernel=side, precision=PRECISION, memo=False, order=False, commonLine=False, trace=None, feed=FEED, power=POWER, problems=None):
+  # as writeMachine(), returning the file text
+  box = _box(spec, trace)
+  out = StringIO()
+  _drawMachine(box, out, format, kernel, precision, memo, order, commonLine, trace, feed, power, problems)
+  return out.getvalue()
+
+def _drawMachine(box, out, format, kernel, precision, memo, order, commonLine, trace, feed, power, problems):
+  check = problems is not None
+  doc = DxfDocument(out, precision) if format=='dxf' else GcodeDocument(out, precision, feed, power)
+  if trace is None:
+    checked = _draw(box, doc, kernel, memo, True, order, commonLine, check)
+    doc.close()
+    _validate(checked, problems)
+    return
+  with trace.span('generate'):
+    checked = _draw(box, trace.sink(doc), trace.kernel(kernel), memo, True, order, commonLine, check)
+  with trace.span('serialize'):
+    doc.close()
+  _validate(checked, problems, trace)
+
+def _box(spec, trace):
+  # the checked Box of spec, which may be one already
+  if isinstance(spec, Box):
+    return spec
+  if trace is None:
+    return boxFromSpec(spec)
+  with trace.span('options'):
+    return boxFromSpec(spec)
+
+def _draw(box, doc, kernel, memo, flatten, order=False, commonLine=False, check=False):
+  # draw box into doc through the stages asked for: the edge cache, then
+  # cutting order, then common lines; with check, the box is drawn through a
+  # validate.ValidatingSink in front of the first stage after the
+  # edge cache, which is returned
+  if commonLine:
+    cl = CommonLine()
+    checked = _draw(box, cl, kernel, memo, flatten, order, check=check)
+    cl.draw(doc)
+    return checked
+  if order:
+    tp = Toolpath()
+    checked = _draw(box, tp, kernel, memo, flatten, check=check)
+    tp.draw(doc)
+    return checked
+  checked = ValidatingSink(doc) if check else None
+  doc = checked or doc
+  if memo:
+    inst = Instancer(doc, EdgeCache(kernel), flatten)
+    generate(box, inst, inst.side)
+  else:
+    generate(box, doc, kernel)
+  return checked
+
+def _validate(checked, problems, trace=None):
+  # add the problems of the ValidatingSink checked, if any, to problems
+  if checked is None:
+    return
+  if trace is None:
+    problems.extend(checked.problems())
+    return
+  with trace.span('validate'):
+    problems.extend(checked.problems())
+
+EXTENSIONS = {'svg':'.svg', 'dxf':'.dxf', 'gcode':'.nc'}
+
+def outputName(index, spec):
+  name = spec.get('name') or 'box-%05d' % (index+1)
+  return re.sub(r'[^\w.-]+', '_', str(name))
+
+_caches = {}  # (directory,maxBytes) -> the OutputCache of this process
+
+def _render(job):
+  # pool worker: render one spec to disk, returns (index,name,error,trace,cache,
+  # problems) with trace the Recorder.data() of the run if options ask for
+  # one, cache the (hits,misses,evictions) of the run if options name a cache
+  # directory and problems those validate.py found in the box unless options
+  # turn validation off, kept with the file if it goes to the cache
+  (index,spec,outdir,options) = job
+  spec = dict(spec)
+  name = outputName(index, spec)
+  spec.pop('name', None)
+  options = dict(options)
+  format = options.pop('format', 'svg')
+  path = os.path.join(outdir, name+EXTENSIONS[format])
+  trace = options['trace'] = Recorder() if options.pop('trace', False) else None
+  directory = options.pop('cache', None)
+  maxBytes = options.pop('cacheSize', SIZE)
+  problems = options['problems'] = [] if options.pop('validate', True) else None
+  if format != 'svg':
+    for key in ('compact','flatten','stream'):
+      options.pop(key, None)
+  error = counts = None
+  try:
+    if directory:
+      counts = _cached(spec, path, format, options, _cache(directory, maxBytes))
+    else:
+      _write(spec, path, format, options)
+  except (BoxError,ValueError) as e:
+    error = '; '.join([str(a) for a in e.args])
+  return (index, name, error, trace and trace.data(), counts, problems)
+
+def _cache(directory, maxBytes):
+  cache = _caches.get((directory,maxBytes))
+  if cache is None:
+    cache = _caches[(directory,maxBytes)] = OutputCache(directory, maxBytes)
+  return cache
+
+def _cached(spec, path, format, options, cache):
+  # copy the output for spec from cache to path, or write it and store it;
+  # returns the (hits,misses,evictions) this took. If options has a list of
+  # problems, the validate.py problems are stored with the file and a hit
+  # adds them to it as a run would
+  before = cache.stats()
+  trace = options.get('trace')
+  problems = options.get('problems')
+  check = problems is not None
+  box = _box(spec, trace)
+  output = dict(options, format=format, kernel=options.get('kernel', side).__name__)
+  output.pop('trace', None)
+  output.pop('problems', None)
+  key = outputKey(box, **output)
+  if trace is None:
+    hit = cache.fetch(key, path, check)
+  else:
+    with trace.span('cache'):
+      hit = cache.fetch(key, path, check)
+  if hit and check:
+    problems.extend([(kind,part,other,tuple(at)) for (kind,part,other,at) in json.loads(hit)])
+  elif not hit:
+    _write(box, path, format, options)
+    cache.store(key, path, json.dumps(problems) if check else None)
+  after = cache.stats()
+  return tuple([after[k]-before[k] for k in ('hits','misses','evictions')])
+
+def _write(spec, path, format, options):
+  # write spec, or a checked Box, to path as format with the renderer options
+  if format != 'svg':
+    writeMachine(spec, path, format, **options)
+    return
+  options = dict(options)
+  if options.pop('stream', False):
+    streamSvg(spec, path, **options)
+    return
+  svg = renderSvg(spec, **options)
+  f = open(path, 'w')
+  try:
+    f.write(svg)
+  finally:
+    f.close()
+
+
+ESTIMATE_FIELDS = ['name','parts','cut_mm','pierces','width_mm','height_mm','area_mm2','part_area_mm2','minutes']
+
+def dryRun(specs, out, feed=FEED, pierceTime=0.0):
+  # write a CSV row of the estimate.py quote of each spec to out, minutes
+  # at feed mm/min with pierceTime seconds a pierce; returns the list of
+  # (index,name,error) of the specs rejected
+  writer = csv.writer(out, lineterminator='\n')
+  writer.writerow(ESTIMATE_FIELDS)
+  failures = []
+  for (index,spec) in enumerate(specs):
+    name = outputName(index, spec)
+    spec = dict(spec)
+    spec.pop('name', None)
+    try:
+      e = estimate(boxFromSpec(spec))
+    except (BoxError,ValueError) as error:
+      failures.append((index, name, '; '.join([str(a) for a in error.args])))
+      continue
+    writer.writerow([name, e.parts, '%.1f' % e.cut, e.pierces, '%.1f' % e.width, '%.1f' % e.height,
+                     '%.0f' % e.area, '%.0f' % e.partArea, '%.2f' % (e.seconds(feed, pierceTime)/60)])
+  return failures
+
+
+class BatchResult(object):
+  def __init__(self, count, failures, seconds, trace=None, cache=None, problems=()):
+    self.count = count          # specs processed
+    self.failures = failures    # list of (index,name,error)
+    self.seconds = seconds
+    self.trace = trace          # trace.Recorder of all the runs, if traced
+    self.cache = cache          # dict of cache hits, misses and evictions, if cached
+    self.problems = problems    # list of (index,name,[validate.py problems]) of the boxes with any
+
+  def rate(self):  # boxes per second
+    return self.count/self.seconds if self.seconds else 0.0
+
+  def summary(self):
+    text = '%d boxes in %.2fs (%.1f boxes/sec), %d failed' % (
+      self.count, self.seconds, self.rate(), len(self.failures))
+    if self.problems:
+      text += ', %d with geometry problems' % len(self.problems)
+    if self.cache is not None:
+      text += ', '+summary(self.cache)
+    return text
+
+def runBatch(specs, outdir, jobs=None, chunksize=None, **options):
+  # render every spec into outdir using jobs worker processes (default: one per
+  # cpu), options are passed on to renderSvg(), or streamSvg() with stream=True,
+  # or writeMachine() with format 'dxf' or 'gcode';
+  # trace=True records every run and merges them into result.trace;
+  # cache='dir' keeps finished files in an OutputCache there, bounded to
+  # cacheSize bytes, and counts hits and misses in result.cache;
+  # every box generated is validated and any problems listed in
+  # result.problems unless validate=False
+  if not os.path.isdir(outdir):
+    os.makedirs(outdir)
+  work = [(index,spec,outdir,options) for index,spec in enumerate(specs)]
+  jobs = jobs or multiprocessing.cpu_count()
+  start = time.time()
+  if jobs == 1:
+    results = [_render(job) for job in work]
+  else:
+    if not chunksize:
+      chunksize = max(1, len(work)//(jobs*8))
+    pool = multiprocessing.Pool(jobs)
+    try:
+      results = list(pool.imap_unordered(_render, work, chunksize))
+    finally:
+      pool.close()
+      pool.join()
+  seconds = time.time()-start
+  failures = sorted([r[:3] for r in results if r[2] is not None])
+  trace = None
+  if options.get('trace'):
+    trace = Recorder()
+    for r in results:
+      trace.merge(r[3])
+  cache = None
+  if options.get('cache'):
+    counts = [r[4] for r in results if r[4] is not None]
+    cache = dict([(k, sum([c[i] for c in counts])) for (i,k) in enumerate(('hits','misses','evictions'))])
+  problems = sorted([(r[0], r[1], r[5]) for r in results if r[5]])
+  return BatchResult(len(results), failures, seconds, trace, cache, problems)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='tabbedbox.batch', description='Generate tabbed boxes from a sheet of specs')
+  parser.add_argument('specs', help='CSV or JSONL file of box specs')
+  parser.add_argument('-o', '--output', default='.', help='output directory')
+  parser.add_argument('-j', '--jobs', type=int, default=0, help='worker processes (default: one per cpu)')
+  parser.add_argument('--vector', action='store_true', help='use the NumPy edge kernel')
+  parser.add_argument('--precision', type=int, default=PRECISION, help='decimals written for coordinates (default: %d)' % PRECISION)
+  parser.add_argument('--compact', action='store_true', help='one compound path per part')
+  parser.add_argument('--memo', action='store_true', help='reuse repeated edges, <use> for repeated parts')
+  parser.add_argument('--flatten', action='store_true', help='with --memo, draw repeated parts out in full')
+  parser.add_argument('--stream', action='store_true', help='write each part out as it is generated')
+  parser.add_argument('--order', action='store_true', help='draw parts and holes in cutting order')
+  parser.add_argument('--common-line', dest='commonLine', action='store_true', help='cut lines shared by parts only once')
+  parser.add_argument('--trace', metavar='FILE', help='write timings and part counts to FILE, JSON for .json, Prometheus text otherwise')
+  parser.add_argument('--format', choices=sorted(EXTENSIONS), default='svg', help='output file format (default: svg)')
+  parser.add_argument('--feed', type=float, default=FEED, help='G-code and --dry-run cutting feed in mm/min (default: %g)' % FEED)
+  parser.add_argument('--power', type=float, default=POWER, help='G-code M3 S value, laser power or spindle speed (default: %g)' % POWER)
+  parser.add_argument('--cache', metavar='DIR', help='keep finished files in DIR and reuse them for boxes made before')
+  parser.add_argument('--cache-size', dest='cacheSize', type=float, default=SIZE//MB, help='MB the cache may hold (default: %d)' % (SIZE//MB))
+  parser.add_argument('--no-validate', dest='validate', action='store_false', help='do not check the boxes for crossing and overlapping cuts')
+  parser.add_argument('--dry-run', dest='dryRun', action='store_true', help='draw nothing, write a CSV quote of each box to stdout')
+  parser.add_argument('--pierce-time', dest='pierceTime', type=float, default=0.0, help='seconds each pierce adds to --dry-run machine time (default: 0)')
+  args = parser.parse_args(argv)
+  if args.dryRun:
+    start = time.time()
+    specs = readSpecs(args.specs)
+    failures = dryRun(specs, sys.stdout, args.feed, args.pierceTime)
+    seconds = time.time()-start
+    for (index,name,error) in failures:
+      sys.stderr.write('%s: %s\n' % (name, error))
+    sys.stderr.write('%d boxes quoted in %.2fs, %d failed\n' % (len(specs), seconds, len(failures)))
+    return 1 if failures else 0
+  output = {}
+  if args.format != 'svg':
+    output = dict(format=args.format)
+    if args.format == 'gcode':
+      output.update(feed=args.feed, power=args.power)
+  if args.cache:
+    output.update(cache=args.cache, cacheSize=int(args.cacheSize*MB))
+
+  kernel = side
+  if args.vector:
+    from .edges import sideVector as kernel
+  result = runBatch(readSpecs(args.specs), args.output, args.jobs, kernel=kernel, precision=args.precision, compact=args.compact,
+    memo=args.memo, flatten=args.flatten, stream=args.stream, order=args.order,
+    commonLine=args.commonLine, trace=bool(args.trace), validate=args.validate, **output)
+  if result.trace:
+    result.trace.write(args.trace)
+  for (index,name,error) in result.failures:
+    sys.stderr.write('%s: %s\n' % (name, error))
+  for (index,name,problems) in result.problems:
+    for problem in problems:
+      sys.stderr.write('%s: warning: %s\n' % (name, describe(problem)))
+  sys.stdout.write(result.summary() + '\n')
+  return 1 if result.failures else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,244 @@
+'''
+Content-addressed output cache: finished output files kept on disk under a
+key worked out from the box as the geometry sees it, so a box asked for
+again is copied out instead of generated.
+
+outputKey(box, **output) hashes the unit-converted settings of a checked Box
+(X, Y, Z, thickness, nomTab, equalTabs, correction, spacing, boxtype,
+layout, divx, divy, the divider keying and, in Schroff mode, the Schroff
+settings), the output settings (format, precision, compact, ...) and the
+source of the tabbedbox package, so entries made by other code are never
+used. Specs that come to the same box share an entry, whatever their units
+or spelling: width 24cm and 240mm, blank fields and defaults, "3" and 3.0.
+
+OutputCache(directory, maxBytes) keeps one file per key under directory.
+A hit copies the entry out and touches its modification time, so the
+oldest modification time is always the least recently used entry. When a
+store takes the cache over maxBytes, the least recently used entries are
+removed until it is down to LOW_WATER of maxBytes. Entries are written to a
+temporary file and renamed into place, so worker processes can share one
+cache directory. Each OutputCache counts its hits, misses, stores and
+evictions.
+
+An entry may carry a short text next to the file, such as the problems the
+geometry check found in the box: store(key, path, meta) keeps it in a META
+file beside the entry, and fetch(key, path, meta=True) returns it, counting
+an entry stored without one as a miss. The two are evicted together.
+
+usage: cache = OutputCache('cache'); key = outputKey(box, format='svg')
+       if not cache.fetch(key, 'box.svg'): ...write box.svg...; cache.store(key, 'box.svg')
+       python -m tabbedbox.cache DIR [--clear]
+'''
+import argparse,errno,hashlib,os,shutil,sys,tempfile
+
+MB = 1024*1024
+SIZE = 256*MB       # default bound on the bytes kept
+LOW_WATER = 0.9     # fraction of the bound eviction brings the cache down to
+META = '.meta'      # suffix of the text kept beside an entry
+
+# Box attributes the output depends on, and those of Schroff mode
+BOX_FIELDS = ('X','Y','Z','thickness','nomTab','equalTabs','correction','spacing','hairline',
+              'boxtype','layout','divx','divy','divxSizes','divySizes','keydivwalls','keydivfloor','divOffset','schroff')
+SCHROFF_FIELDS = ('rows','rail_height','row_centre_spacing','row_spacing','rail_mount_depth',
+                  'rail_mount_centre_offset','rail_mount_radius','rail_slot','vent','vent_pitch','vent_margin')
+
+_source = None
+
+def sourceDigest():
+  # digest of the .py files of the package, worked out once per process
+  global _source
+  if _source is None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(here)):
+      if name.endswith('.py'):
+        f = open(os.path.join(here, name), 'rb')
+        try:
+          h.update(name.encode('utf-8')+b'\0'+f.read())
+        finally:
+          f.close()
+    _source = h.hexdigest()
+  return _source
+
+def _normal(value):
+  # settings as text that is the same for equal values: floats to a
+  # nanometre (no -0), numbers of either type alike
+  if isinstance(value, float) or isinstance(value, int):
+    return '%.6f' % (float(value)+0.0)
+  return str(value)
+
+def outputKey(box, **output):
+  # hex key of the output of box with the output settings given as keyword
+  # arguments (format='svg', precision=4, compact=False, ...)
+  fields = BOX_FIELDS+(SCHROFF_FIELDS if box.schroff else ())
+  items = ['%s=%s' % (name, _normal(getattr(box, name))) for name in fields]
+  items.extend(['%s=%s' % (name, _normal(value)) for (name,value) in sorted(output.items())])
+  items.append('source=%s' % sourceDigest())
+  return hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest()
+
+
+class OutputCache(object):
+  # size bounded LRU cache of output files under directory
+  def __init__(self, directory, maxBytes=SIZE):
+    self.directory = directory
+    self.maxBytes = maxBytes
+    self.size = None    # bytes held, as of the last scan plus stores since
+    self.hits = self.misses = self.stores = self.evictions = 0
+
+  def path(self, key):
+    return os.path.join(self.directory, key[:2], key)
+
+  def fetch(self, key, dest, meta=False):
+    # copy the entry for key to the file dest and count a hit, or count a
+    # miss and return False if there is none; with meta, return the text
+    # stored with the entry instead of True, a miss if it has none
+    path = self.path(key)
+    text = True
+    try:
+      if meta:
+        f = open(path+META, 'rb')
+        try:
+          text = f.read().decode('utf-8')
+        finally:
+          f.close()
+      shutil.copyfile(path, dest)
+      os.utime(path, None)
+    except (IOError,OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+      self.misses += 1
+      return False
+    self.hits += 1
+    return text
+
+  def store(self, key, source, meta=None):
+    # keep a copy of the file source as the entry for key, and the text meta
+    # beside it if given, then evict down to LOW_WATER if that takes the
+    # cache over its bound
+    path = self.path(key)
+    folder = os.path.dirname(path)
+    if not os.path.isdir(folder):
+      try:
+        os.makedirs(folder)
+      except OSError:  # made by another worker in the meantime
+        if not os.path.isdir(folder):
+          raise
+    size = 0
+    if meta is not None:  # before the entry, so a fetch never finds one without it
+      size += self._place(folder, path+META, lambda temp: _writeText(temp, meta))
+    size += self._place(folder, path, lambda temp: shutil.copyfile(source, temp))
+    self.stores += 1
+    if self.size is None:
+      self.size = self.usage()[1]
+    else:
+      self.size += size
+    if self.size > self.maxBytes:
+      self.evict()
+
+  def _place(self, folder, path, write):
+    # write(temp) a temporary file in folder and rename it to path; its size
+    (fd,temp) = tempfile.mkstemp(dir=folder, prefix='.tmp')
+    try:
+      os.close(fd)
+      write(temp)
+      size = os.path.getsize(temp)
+      try:
+        os.rename(temp, path)
+      except OSError:  # Windows will not rename over an existing file
+        os.remove(path)
+        os.rename(temp, path)
+    except:
+      if os.path.exists(temp):
+        os.remove(temp)
+      raise
+    return size
+
+  def entries(self):
+    # [(mtime, size, path)] of every entry, oldest first, the size taking in
+    # any META file beside it
+    found = []
+    if not os.path.isdir(self.directory):
+      return found
+    for folder in os.listdir(self.directory):
+      folder = os.path.join(self.directory, folder)
+      if not os.path.isdir(folder):
+        continue
+      for name in os.listdir(folder):
+        if name.startswith('.tmp') or name.endswith(META):
+          continue
+        path = os.path.join(folder, name)
+        try:
+          st = os.stat(path)
+        except OSError:  # evicted by another worker
+          continue
+        size = st.st_size
+        if os.path.exists(path+META):
+          size += os.path.getsize(path+META)
+        found.append((st.st_mtime, size, path))
+    found.sort()
+    return found
+
+  def usage(self):  # (entries, bytes)
+    found = self.entries()
+    return (len(found), sum([size for (mtime,size,path) in found]))
+
+  def evict(self):
+    # remove least recently used entries until the cache is down to LOW_WATER
+    found = self.entries()
+    size = sum([entry[1] for entry in found])
+    target = self.maxBytes*LOW_WATER
+    for (mtime,entrySize,path) in found:
+      if size <= target:
+        break
+      try:
+        os.remove(path)
+        self.evictions += 1
+      except OSError:  # evicted by another worker
+        pass
+      _remove(path+META)
+      size -= entrySize
+    self.size = size
+
+  def clear(self):
+    for (mtime,size,path) in self.entries():
+      os.remove(path)
+      _remove(path+META)
+    self.size = 0
+
+  def stats(self):
+    return {'hits':self.hits, 'misses':self.misses, 'stores':self.stores, 'evictions':self.evictions}
+
+def _writeText(path, text):
+  f = open(path, 'wb')
+  try:
+    f.write(text.encode('utf-8'))
+  finally:
+    f.close()
+
+def _remove(path):  # remove path if it is there
+  try:
+    os.remove(path)
+  except OSError:
+    pass
+
+def summary(stats):
+  # one line for a stats() dict, or the sum of several
+  looked = stats['hits']+stats['misses']
+  return 'cache %d hits, %d misses (%.0f%% hit), %d evictions' % (
+    stats['hits'], stats['misses'], 100.0*stats['hits']/looked if looked else 0.0, stats['evictions'])
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='tabbedbox.cache', description='Show or clear an output cache directory')
+  parser.add_argument('directory')
+  parser.add_argument('--clear', action='store_true', help='remove every entry')
+  args = parser.parse_args(argv)
+  cache = OutputCache(args.directory)
+  if args.clear:
+    cache.clear()
+  (count,size) = cache.usage()
+  sys.stdout.write('%d entries, %.1f MB\n' % (count, size/float(MB)))
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,229 @@
+'''
+Common-line cutting: a sink that collects the parts drawn into it and draws
+them on into another sink with every stretch of line that two cuts share
+cut only once, the first time it comes up.
+
+Each segment is hashed on the line it lies on: its direction, and its
+distance from the origin rounded to the tolerance. Every line keeps the
+sorted union of the intervals already cut along it, so the part of a new
+segment that is already cut is found with a couple of bisections. The rest
+of each path is drawn as the runs left over; a closed contour that lost a
+stretch becomes an open path from one end of the gap round to the other.
+Circles are passed on as they are. So is a hole pattern (holes.Pattern),
+but for any of its holes with a side on a line already cut, such as a
+divider slot cut in from the edge of its part: those are taken out of it
+and trimmed like any other hole. The rest stay in the pattern, their sides
+still added to the lines cut for the parts that come after.
+
+usage: cl = CommonLine(); generate(box, cl); cl.draw(doc); print(cl.summary())
+'''
+import math
+from array import array
+from bisect import bisect_left,bisect_right
+
+from .core import Path
+from .holes import drawPatterns
+
+TOLERANCE = 0.01  # mm; segments this close to the same line and overlapping by more are shared
+ANGLE_STEP = 1e-6 # radians, for the direction of slanted segments
+
+def _round(v):  # round half up, so values less than 1 apart round less than 2 apart
+  return int(math.floor(v+0.5))
+
+def subtract(starts, ends, a, b, tolerance=TOLERANCE):
+  # parts of a..b not covered by the sorted, disjoint intervals starts/ends
+  # that are longer than tolerance
+  pieces = []
+  cur = a
+  i = bisect_right(ends, a)
+  while i < len(starts) and starts[i] < b:
+    if starts[i]-cur > tolerance:
+      pieces.append((cur, starts[i]))
+    cur = max(cur, ends[i])
+    i += 1
+  if b-cur > tolerance:
+    pieces.append((cur, b))
+  return pieces
+
+def cover(starts, ends, a, b):
+  # add a..b to the sorted, disjoint intervals starts/ends
+  i = bisect_left(ends, a)
+  j = bisect_right(starts, b)
+  if i < j:
+    a = min(a, starts[i])
+    b = max(b, ends[j-1])
+  starts[i:j] = [a]
+  ends[i:j] = [b]
+
+
+class CommonLine(object):
+  # sink collecting parts, drawn on into another sink cutting shared lines once
+  def __init__(self, tolerance=TOLERANCE):
+    self.tolerance = tolerance
+    self.parts = []       # (name, items) with items ('edge'|'hole', coords), ('circle', r, centre) or ('pattern', pattern)
+    self.runs = None
+    self.length = self.shared = 0.0
+
+  def beginPart(self, name):
+    self.part = (name, [])
+    self.parts.append(self.part)
+    self.runs = None
+
+  def endPart(self):
+    pass
+
+  def drawS(self, path):
+    self.part[1].append(('edge', path.coords))
+
+  def drawHole(self, path):
+    self.part[1].append(('hole', path.coords))
+
+  def drawCircle(self, r, centre):
+    self.part[1].append(('circle', r, centre))
+
+  def drawPattern(self, pattern):
+    self.part[1].append(('pattern', pattern))
+
+  def _line(self, x0, y0, x1, y1):
+    # (key, offset, t0, t1): the hash key of the line through a segment, its
+    # distance from the origin and the segment ends along it
+    (dx,dy) = (x1-x0, y1-y0)
+    tol = self.tolerance
+    if abs(dy) <= 1e-9*max(1.0, abs(dx)):
+      return (('h', _round(y0/tol)), y0, x0, x1)
+    if abs(dx) <= 1e-9*max(1.0, abs(dy)):
+      return (('v', _round(x0/tol)), x0, y0, y1)
+    if dx < 0:
+      (dx,dy) = (-dx,-dy)
+    length = math.hypot(dx, dy)
+    (ux,uy) = (dx/length, dy/length)
+    offset = ux*y0-uy*x0
+    return ((_round(math.atan2(uy, ux)/ANGLE_STEP), _round(offset/tol)), offset, ux*x0+uy*y0, ux*x1+uy*y1)
+
+  def _trim(self, coords, lines):
+    # runs of coords left after taking out what is already cut
+    tol = self.tolerance
+    runs = []
+    run = None
+    for i in range(2, len(coords), 2):
+      (x0,y0,x1,y1) = (coords[i-2], coords[i-1], coords[i], coords[i+1])
+      seg = math.hypot(x1-x0, y1-y0)
+      self.length += seg
+      if seg <= tol:
+        pieces = [(0.0, 1.0)]
+      else:
+        (key,offset,t0,t1) = self._line(x0, y0, x1, y1)
+        (a,b) = (t0,t1) if t0 < t1 else (t1,t0)
+        # a line is covered on its neighbours too, so that lines closer
+        # than the tolerance land in the same place whatever the rounding
+        (starts,ends) = lines.setdefault(key, ([],[]))
+        pieces = subtract(starts, ends, a, b, tol)
+        for k in (key[1]-1, key[1], key[1]+1):
+          (s,e) = lines.setdefault((key[0],k), ([],[]))
+          cover(s, e, a, b)
+        # as fractions along the segment, in its own direction
+        pieces = [((p-t0)/(t1-t0), (q-t0)/(t1-t0)) for (p,q) in pieces]
+        if t1 < t0:
+          pieces = [(q,p) for (p,q) in reversed(pieces)]
+        self.shared += seg*(1-sum([q-p for (p,q) in pieces]))
+      for (p,q) in pieces:
+        (px,py) = (x0+p*(x1-x0), y0+p*(y1-y0)) if p else (x0,y0)
+        (qx,qy) = (x0+q*(x1-x0), y0+q*(y1-y0)) if q!=1.0 else (x1,y1)
+        if run is not None and abs(run[-2]-px) < 1e-9 and abs(run[-1]-py) < 1e-9:
+          run.extend((qx,qy))
+        else:
+          run = array('d', (px,py,qx,qy))
+          runs.append(run)
+    closed = abs(coords[0]-coords[-2]) < 1e-9 and abs(coords[1]-coords[-1]) < 1e-9
+    if closed and len(runs) > 1 and runs[0][:2] == coords[:2] and runs[-1][-2:] == coords[-2:]:
+      runs[0] = runs.pop()+runs[0][2:]  # the gap is not at the start, join round
+    return runs
+
+  def _segments(self, coords):
+    # (key, a, b) of the line through each segment of coords and its span
+    # along it, for the segments longer than the tolerance
+    tol = self.tolerance
+    segments = []
+    for i in range(2, len(coords), 2):
+      (x0,y0,x1,y1) = (coords[i-2], coords[i-1], coords[i], coords[i+1])
+      if math.hypot(x1-x0, y1-y0) > tol:
+        (key,offset,t0,t1) = self._line(x0, y0, x1, y1)
+        segments.append((key, t0, t1) if t0 < t1 else (key, t1, t0))
+    return segments
+
+  def _touches(self, segments, lines):
+    # whether any of the segments lies on a stretch of line already cut
+    for (key,a,b) in segments:
+      found = lines.get(key)
+      if found is not None and subtract(found[0], found[1], a, b, self.tolerance) != [(a,b)]:
+        return True
+    return False
+
+  def _pattern(self, pattern, lines):
+    # items left of a pattern: the holes touching a cut line trimmed as
+    # ('hole', runs), the others as one ('pattern', pattern)
+    if pattern.circular:
+      self.length += len(pattern)*pattern.perimeter()
+      return [('pattern', pattern)]
+    keep = []
+    items = []
+    for (i,(x,y)) in enumerate(zip(pattern.xs, pattern.ys)):
+      coords = pattern.outline(x, y)
+      segments = self._segments(coords)
+      if self._touches(segments, lines):
+        items.append(('hole', self._trim(coords, lines)))
+        continue
+      keep.append(i)
+      for (key,a,b) in segments:
+        for k in (key[1]-1, key[1], key[1]+1):
+          (s,e) = lines.setdefault((key[0],k), ([],[]))
+          cover(s, e, a, b)
+    self.length += len(keep)*pattern.perimeter()
+    if len(keep) == len(pattern):
+      return [('pattern', pattern)]
+    if keep:
+      items.insert(0, ('pattern', pattern.reordered(keep)))
+    return items
+
+  def trim(self):
+    # work out what is left of each part: [(name, items)] with every path
+    # item replaced by the runs left of it
+    lines = {}   # line key -> (starts, ends) of the intervals cut so far
+    self.length = self.shared = 0.0
+    result = []
+    for (name,items) in self.parts:
+      left = []
+      for item in items:
+        if item[0]=='circle':
+          self.length += 2*math.pi*item[1]
+          left.append(item)
+        elif item[0]=='pattern':
+          left.extend(self._pattern(item[1], lines))
+        else:
+          left.append((item[0], self._trim(item[1], lines)))
+      result.append((name, left))
+    self.runs = result
+    return result
+
+  def draw(self, sink):
+    if self.runs is None:
+      self.trim()
+    for (name,items) in self.runs:
+      sink.beginPart(name)
+      for item in items:
+        if item[0]=='circle':
+          sink.drawCircle(item[1], item[2])
+          continue
+        if item[0]=='pattern':
+          drawPatterns(sink, [item[1]])
+          continue
+        draw = sink.drawS if item[0]=='edge' else sink.drawHole
+        for run in item[1]:
+          draw(Path(run))
+      sink.endPart()
+
+  def summary(self):
+    if self.runs is None:
+      self.trim()
+    share = 100.0*self.shared/self.length if self.length else 0.0
+    return 'cut length %.0f mm, %.0f mm shared (%.1f%%) cut once' % (self.length, self.shared, share)
@@ -0,0 +1,542 @@
+'''
+Geometry core of the tabbed box maker.
+
+Everything needed to work out the pieces of a box lives here, free of any
+Inkscape dependency. The settings that boxmaker.py used to keep in module
+globals are held by a Box, and all drawing goes through a sink object so
+the same code can feed the Inkscape effect or a headless writer. A sink
+provides beginPart(name) and endPart() around each physical part, drawS(path)
+for the edges of its outline, drawHole(path) for the divider holes and slots
+cut into it and drawCircle(r,(cx,cy)) for round holes. A sink may also
+provide drawPattern(pattern) to take a whole holes.Pattern at once; without
+it the pattern's holes come one by one through drawCircle() and
+drawHole(). generate() draws the holes and slots of keyed dividers as
+patterns too, see grid.py.
+
+Paths are kept as flat array('d') coordinate buffers and only turned into
+SVG path data once, by the sink, at a fixed number of decimals.
+'''
+import atexit,os,re
+from array import array
+
+# conversion of the supported measurement units to millimetres, the user unit
+# of every headless document
+MM_PER_UNIT = {'mm':1.0, 'cm':10.0, 'm':1000.0, 'in':25.4,
+               'pt':25.4/72, 'pc':25.4/6, 'px':25.4/96}
+
+# option name, optparse dest, type, headless default (taken from the .inx files)
+OPTIONS = [
+  ('schroff','schroff',int,0),
+  ('rail_height','rail_height',float,10.0),
+  ('rail_mount_depth','rail_mount_depth',float,17.4),
+  ('rail_mount_centre_offset','rail_mount_centre_offset',float,0.0),
+  ('rows','rows',int,1),
+  ('hp','hp',int,84),
+  ('row_spacing','row_spacing',float,0.0),
+  ('rail_slot','rail_slot',float,0.0),
+  ('vent','vent',float,0.0),
+  ('vent_pitch','vent_pitch',float,8.0),
+  ('vent_margin','vent_margin',float,10.0),
+  ('unit','unit',str,'mm'),
+  ('inside','inside',int,0),
+  ('length','length',float,180.0),
+  ('width','width',float,240.0),
+  ('depth','height',float,50.0),
+  ('tab','tab',float,6.0),
+  ('equal','equal',int,0),
+  ('hairline','hairline',int,0),
+  ('thickness','thickness',float,3.0),
+  ('kerf','kerf',float,0.1),
+  ('clearance','clearance',float,0.01),
+  ('style','style',int,1),
+  ('spacing','spacing',float,1.0),
+  ('boxtype','boxtype',int,1),
+  ('div_l','div_l',int,2),
+  ('div_w','div_w',int,3),
+  ('div_l_sizes','div_l_sizes',str,''),
+  ('div_w_sizes','div_w_sizes',str,''),
+  ('keydiv','keydiv',int,3),
+]
+
+OPTION_HELP = {
+  'schroff':'Enable Schroff mode',
+  'rail_height':'Height of rail',
+  'rail_mount_depth':'Depth at which to place hole for rail mount bolt',
+  'rail_mount_centre_offset':'How far toward row centreline to offset rail mount bolt (from rail centreline)',
+  'rows':'Number of Schroff rows',
+  'hp':'Width (TE/HP units) of Schroff rows',
+  'row_spacing':'Spacing between Schroff rows',
+  'rail_slot':'Length of rail mount slots (0 for round holes)',
+  'vent':'Diameter of ventilation holes in top and bottom (0 for none)',
+  'vent_pitch':'Spacing of ventilation holes',
+  'vent_margin':'Margin around ventilation holes',
+  'unit':'Measure Units',
+  'inside':'Int/Ext Dimension',
+  'length':'Length of Box',
+  'width':'Width of Box',
+  'depth':'Height of Box',
+  'tab':'Nominal Tab Width',
+  'equal':'Equal/Prop Tabs',
+  'hairline':'Line Thickness',
+  'thickness':'Thickness of Material',
+  'kerf':'Kerf (width) of cut',
+  'clearance':'Clearance of joints',
+  'style':'Layout/Style',
+  'spacing':'Part Spacing',
+  'boxtype':'Box type',
+  'div_l':'Dividers (Length axis)',
+  'div_w':'Dividers (Width axis)',
+  'div_l_sizes':'Compartment sizes between the length axis dividers, comma separated proportions (blank: equal)',
+  'div_w_sizes':'Compartment sizes between the width axis dividers, comma separated proportions (blank: equal)',
+  'keydiv':'Key dividers into walls/floor',
+}
+
+PRECISION = 4  # default decimals written for coordinates
+
+_ZEROS = re.compile(r'(\.\d*?)0+\b')       # trailing zeros of a decimal
+_POINT = re.compile(r'\.(?=[ ,]|$)')        # and the point left behind
+_NEGZERO = re.compile(r'-0(?=[ ,]|$)')      # values rounded to -0
+
+class BoxError(ValueError):
+  # raised for box settings failing the input checks, args are the messages
+  pass
+
+_log = None  # the open $SCHROFF_LOG file
+
+def log(text, *args):
+  # append a line to the file named by $SCHROFF_LOG, if set; text is only
+  # formatted with args when there is a log to write to
+  global _log
+  if _log is None:
+    path = os.environ.get('SCHROFF_LOG')
+    if not path:
+      return
+    _log = open(path, 'a')
+    atexit.register(_log.close)
+  _log.write((text % args if args else text)+'\n')
+
+def unitToMm(value, unit):  # headless replacement for Effect.unittouu()
+  try:
+    return float(value)*MM_PER_UNIT[unit]
+  except KeyError:
+    raise ValueError('unknown unit %r' % unit)
+
+
+class Path(object):
+  # polyline as a flat array('d') of x,y pairs, the first pair is the move to
+  __slots__ = ('coords',)
+
+  def __init__(self, coords):
+    self.coords = coords
+
+  def __len__(self):
+    return len(self.coords)//2
+
+  def d(self, precision=PRECISION):
+    # SVG path data in one formatting pass, rounded to precision decimals with
+    # trailing zeros dropped; precision None writes str() of each coordinate
+    f = '%s' if precision is None else '%%.%df' % precision
+    d = ('M '+f+','+f+(' L '+f+','+f)*(len(self.coords)//2-1)) % tuple(self.coords)
+    return d if precision is None else trimZeros(d)
+
+def _decimals(match):  # faster than the r'\1' template, which is expanded per match
+  return match.group(1)
+
+def trimZeros(text):  # drop trailing zeros from fixed precision numbers in text
+  return _NEGZERO.sub('0', _POINT.sub('', _ZEROS.sub(_decimals, text)))
+
+def number(value, precision=PRECISION):
+  # a single coordinate written the same way as in Path.d()
+  return str(value) if precision is None else trimZeros('%.*f' % (precision, value))
+
+
+_DEFAULTS = dict((dest,default) for name,dest,kind,default in OPTIONS)
+_BY_NAME = dict((name,(dest,kind)) for name,dest,kind,default in OPTIONS)
+
+class Options(object):
+  # stand-in for the optparse values Inkscape hands to the effect
+  def __init__(self, **values):
+    self.__dict__.update(_DEFAULTS)
+    self.__dict__.update(values)
+
+def optionsFromSpec(spec):
+  # build Options from a mapping of command line option names (length, depth,
+  # div_l, ...) to values; strings are converted and blank values left at default
+  values = {}
+  for key,value in spec.items():
+    if key not in _BY_NAME:
+      raise ValueError('unknown box option %r' % key)
+    if value is None or value == '':
+      continue
+    dest,kind = _BY_NAME[key]
+    try:
+      if kind is int and isinstance(value, str):
+        value = float(value)
+      values[dest] = kind(value)
+    except (TypeError,OverflowError):  # a list, a mapping or an infinite count
+      raise ValueError('%s must be a number, not %r' % (key, value))
+  return Options(**values)
+
+def boxFromSpec(spec):
+  # headless entry point: a checked Box in millimetres from a spec mapping
+  box = Box(optionsFromSpec(spec))
+  errors = box.errors()
+  if errors:
+    raise BoxError(*errors)
+  return box
+
+
+class Box(object):
+  # unit-converted settings for one box; uu(value,unit) converts to user units
+  def __init__(self, opts, uu=unitToMm):
+    unit = opts.unit
+    self.hairline = opts.hairline
+    self.schroff = opts.schroff
+    if self.schroff:
+      self.hp = opts.hp
+      self.rows = opts.rows
+      self.rail_height = uu(opts.rail_height, unit)
+      self.row_centre_spacing = uu(122.5, unit)
+      self.row_spacing = uu(opts.row_spacing, unit)
+      self.rail_mount_depth = uu(opts.rail_mount_depth, unit)
+      self.rail_mount_centre_offset = uu(opts.rail_mount_centre_offset, unit)
+      self.rail_mount_radius = uu(2.5, unit)
+      self.rail_slot = uu(opts.rail_slot, unit)
+      self.vent = uu(opts.vent, unit)
+      self.vent_pitch = uu(opts.vent_pitch, unit)
+      self.vent_margin = uu(opts.vent_margin, unit)
+
+    ## minimally different behaviour for schroffmaker.inx vs. boxmaker.inx
+    ## essentially schroffmaker.inx is just an alternate interface with different
+    ## default settings, some options removed, and a tiny amount of extra logic
+    if self.schroff:
+      ## schroffmaker.inx
+      X = uu(opts.hp * 5.08, unit)
+      # 122.5mm vertical distance between mounting hole centres of 3U Schroff panels
+      row_height = self.rows * (self.row_centre_spacing + self.rail_height)
+      # rail spacing in between rows but never between rows and case panels
+      row_spacing_total = (self.rows - 1) * self.row_spacing
+      Y = row_height + row_spacing_total
+    else:
+      ## boxmaker.inx
+      X = uu(opts.length, unit)
+      Y = uu(opts.width, unit)
+    Z = uu(opts.height, unit)
+    self.thickness = uu(opts.thickness, unit)
+    self.nomTab = uu(opts.tab, unit)
+    self.equalTabs = opts.equal
+    self.kerf = uu(opts.kerf, unit)
+    self.clearance = uu(opts.clearance, unit)
+    self.layout = opts.style
+    self.spacing = uu(opts.spacing, unit)
+    self.boxtype = opts.boxtype
+    self.divx = opts.div_l
+    self.divy = opts.div_w
+    self.divxSizes = _sizes(opts.div_l_sizes)
+    self.divySizes = _sizes(opts.div_w_sizes)
+    self.keydiv = opts.keydiv
+    self.keydivwalls = 0 if opts.keydiv == 3 or opts.keydiv == 1 else 1
+    self.keydivfloor = 0 if opts.keydiv == 3 or opts.keydiv == 2 else 1
+    self.divOffset = self.keydivwalls*self.thickness
+
+    if opts.inside: # if inside dimension selected correct values to outside dimension
+      X+=self.thickness*2
+      Y+=self.thickness*2
+      Z+=self.thickness*2
+    (self.X,self.Y,self.Z) = (X,Y,Z)
+
+    self.correction = self.kerf-self.clearance
+
+  def errors(self, docSize=None):
+    # check input values mainly to avoid python errors, docSize is the
+    # (width,height) of the target document if there is one
+    # TODO restrict values to *correct* solutions
+    # TODO restrict divisions to logical values
+    (X,Y,Z) = (self.X,self.Y,self.Z)
+    thickness = self.thickness
+    errors = []
+    if min(X,Y,Z)==0:
+      errors.append('Error: Dimensions must be non zero')
+    if docSize and max(X,Y,Z)>max(docSize)*10: # crude test
+      errors.append('Error: Dimensions Too Large')
+    if min(X,Y,Z)<3*self.nomTab:
+      errors.append('Error: Tab size too large')
+    if self.nomTab<thickness:
+      errors.append('Error: Tab size too small')
+    if thickness==0:
+      errors.append('Error: Thickness is zero')
+    if thickness>min(X,Y,Z)/3: # crude test
+      errors.append('Error: Material too thick')
+    if self.correction>min(X,Y,Z)/3: # crude test
+      errors.append('Error: Kerf/Clearence too large')
+    if self.spacing>max(X,Y,Z)*10: # crude test
+      errors.append('Error: Spacing too large')
+    if self.spacing<self.kerf:
+      errors.append('Error: Spacing too small')
+    if self.schroff and self.vent and self.vent_pitch<=self.vent:
+      errors.append('Error: Ventilation holes overlap')
+    for (sizes,count,axis) in ((self.divxSizes,self.divx,'Length'),(self.divySizes,self.divy,'Width')):
+      if sizes is None or sizes and (len(sizes)!=count+1 or min(sizes)<=0):
+        errors.append('Error: %s axis divider sizes must be %d positive numbers' % (axis, count+1))
+    return errors
+
+  def pieces(self):
+    # layout format:(rootx),(rooty),Xlength,Ylength,tabInfo,tabbed,pieceType
+    # root= (spacing,X,Y,Z) * values in tuple
+    # tabInfo= <abcd> 0=holes 1=tabs
+    # tabbed= <abcd> 0=no tabs 1=tabs on this side
+    # (sides: a=top, b=right, c=bottom, d=left)
+    # pieceType: 1=XY, 2=XZ, 3=ZY
+    # note first two pieces in each set are the X-divider template and Y-divider template respectively
+    (X,Y,Z) = (self.X,self.Y,self.Z)
+    boxtype = self.boxtype
+    layout = self.layout
+    if boxtype==2: # One side open (X,Y)
+      if   layout==1: # Diagramatic Layout
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1010,0b1101,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1110,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b0000,0b1111,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b1111,0b1011,3],
+                [(4,1,0,2),(2,0,0,1),X,Y,0b0000,0b0000,1],[(2,0,0,1),(1,0,0,0),X,Z,0b1010,0b0111,2]]
+      elif layout==2: # 3 Piece Layout
+        pieces=[[(2,0,0,1),(2,0,1,0),X,Z,0b1010,0b1101,2],[(1,0,0,0),(1,0,0,0),Z,Y,0b1111,0b1110,3],
+                [(2,0,0,1),(1,0,0,0),X,Y,0b0000,0b1111,1]]
+      elif layout==3: # Inline(compact) Layout
+        pieces=[[(5,2,0,2),(1,0,0,0),X,Z,0b1111,0b1101,2],[(3,2,0,0),(1,0,0,0),Z,Y,0b0101,0b1110,3],
+                [(4,2,0,1),(1,0,0,0),Z,Y,0b0101,0b1011,3],[(2,1,0,0),(1,0,0,0),X,Y,0b0000,0b1111,1],
+                [(6,3,0,2),(1,0,0,0),X,Z,0b1111,0b0111,2]]
+      elif layout==4: # Diagramatic Layout with Alternate Tab Arrangement
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1001,0b1101,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1100,0b1110,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b1100,0b1111,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b0110,0b1011,3],
+                [(4,1,0,2),(2,0,0,1),X,Y,0b0110,0b0000,1],[(2,0,0,1),(1,0,0,0),X,Z,0b1100,0b0111,2]]
+    elif boxtype==3: # Two sides open (X,Y and X,Z)
+      if   layout==1: # Diagramatic Layout
+        pieces=[[(2,0,0,1),(1,0,0,0),X,Z,0b1010,0b0111,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1100,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b0010,0b1101,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b1111,0b1001,3]]
+      elif layout==2: # 3 Piece Layout
+        pieces=[[(2,0,0,1),(1,0,0,0),X,Z,0b1010,0b0111,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1100,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b0010,0b1101,1]]
+      elif layout==3: # Inline(compact) Layout
+        pieces=[[(2,2,0,2),(1,0,0,0),X,Z,0b1010,0b0111,2],[(3,2,0,0),(1,0,0,0),Z,Y,0b1111,0b1100,3],
+                [(2,1,0,0),(1,0,0,0),X,Y,0b0010,0b1101,1],[(4,2,0,1),(1,0,0,0),Z,Y,0b1111,0b1001,3]]
+      elif layout==4: # Diagramatic Layout with Alternate Tab Arrangement
+        pieces=[[(2,0,0,1),(1,0,0,0),X,Z,0b1100,0b0111,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1100,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b1110,0b1101,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b0110,0b1001,3]]
+    elif boxtype==4: # Three sides open (X,Y, X,Z and Z,Y)
+      if layout==2: # 3 Piece Layout
+        pieces=[[(2,2,0,0),(2,0,1,0),X,Z,0b1111,0b1001,2],[(1,0,0,0),(1,0,0,0),Z,Y,0b1111,0b0110,3],
+                [(2,2,0,0),(1,0,0,0),X,Y,0b1100,0b0011,1]]
+      else:
+        pieces=[[(3,3,0,0),(1,0,0,0),X,Z,0b1110,0b1001,2],[(1,0,0,0),(1,0,0,0),Z,Y,0b1111,0b0110,3],
+                [(2,2,0,0),(1,0,0,0),X,Y,0b1100,0b0011,1]]
+    elif boxtype==5: # Opposite ends open (X,Y)
+      if   layout==1: # Diagramatic Layout
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1010,0b0101,2],[(3,1,0,1),(2,0,0,1),Z,Y,0b1111,0b1010,3],
+                [(2,0,0,1),(1,0,0,0),X,Z,0b1010,0b0101,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1010,3]]
+      elif layout==2: # 2 Piece Layout
+        pieces=[[(1,0,0,1),(1,0,1,1),X,Z,0b1010,0b0101,2],[(2,1,0,1),(1,0,0,1),Z,Y,0b1111,0b1010,3]]
+      elif layout==3: # Inline(compact) Layout
+        pieces=[[(1,0,0,0),(1,0,0,0),X,Z,0b1010,0b0101,2],[(3,2,0,0),(1,0,0,0),Z,Y,0b1111,0b1010,3],
+                [(2,1,0,0),(1,0,0,0),X,Z,0b1010,0b0101,2],[(4,2,0,1),(2,0,0,0),Z,Y,0b1111,0b1010,3]]
+      elif layout==4: # Diagramatic Layout with Alternate Tab Arrangement
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1011,0b0101,2],[(3,1,0,1),(2,0,0,1),Z,Y,0b0111,0b1010,3],
+                [(2,0,0,1),(1,0,0,0),X,Z,0b1110,0b0101,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1101,0b1010,3]]
+    elif boxtype==6: # 2 panels jointed (X,Y and Z,Y joined along Y)
+      pieces=[[(1,0,0,0),(1,0,0,0),X,Y,0b1011,0b0100,1],[(2,1,0,0),(1,0,0,0),Z,Y,0b1111,0b0001,3]]
+    else: # Fully enclosed
+      if   layout==1: # Diagramatic Layout
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1010,0b1111,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1111,0b1111,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b0000,0b1111,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b1111,0b1111,3],
+                [(4,1,0,2),(2,0,0,1),X,Y,0b0000,0b1111,1],[(2,0,0,1),(1,0,0,0),X,Z,0b1010,0b1111,2]]
+      elif layout==2: # 3 Piece Layout
+        pieces=[[(2,0,0,1),(2,0,1,0),X,Z,0b1010,0b1111,2],[(1,0,0,0),(1,0,0,0),Z,Y,0b1111,0b1111,3],
+                [(2,0,0,1),(1,0,0,0),X,Y,0b0000,0b1111,1]]
+      elif layout==3: # Inline(compact) Layout
+        pieces=[[(5,2,0,2),(1,0,0,0),X,Z,0b1111,0b1111,2],[(3,2,0,0),(1,0,0,0),Z,Y,0b0101,0b1111,3],
+                [(6,3,0,2),(1,0,0,0),X,Z,0b1111,0b1111,2],[(4,2,0,1),(1,0,0,0),Z,Y,0b0101,0b1111,3],
+                [(2,1,0,0),(1,0,0,0),X,Y,0b0000,0b1111,1],[(1,0,0,0),(1,0,0,0),X,Y,0b0000,0b1111,1]]
+      elif layout==4: # Diagramatic Layout with Alternate Tab Arrangement
+        pieces=[[(2,0,0,1),(3,0,1,1),X,Z,0b1001,0b1111,2],[(1,0,0,0),(2,0,0,1),Z,Y,0b1100,0b1111,3],
+                [(2,0,0,1),(2,0,0,1),X,Y,0b1100,0b1111,1],[(3,1,0,1),(2,0,0,1),Z,Y,0b0110,0b1111,3],
+                [(4,1,0,2),(2,0,0,1),X,Y,0b0110,0b1111,1],[(2,0,0,1),(1,0,0,0),X,Z,0b1100,0b1111,2]]
+    return pieces
+
+
+def _sizes(text):
+  # compartment sizes from a comma separated list, [] if blank, None if not numbers
+  try:
+    return [float(v) for v in text.split(',')] if text.strip() else []
+  except ValueError:
+    return None
+
+def dividerPositions(span, count, sizes=()):
+  # distances into span of count dividers splitting it into count+1
+  # compartments, equal or in the proportions of sizes
+  if not sizes:
+    spacing=span/(count+1)
+    return [spacing*m for m in range(1,count+1)]
+  total=float(sum(sizes))
+  positions=[]
+  done=0.0
+  for size in sizes[:count]:
+    done+=size
+    positions.append(span*done/total)
+  return positions
+
+def divisions(box,length,isTab):
+  # division count, kerf corrected gap and tab widths and first step offset
+  # for a side of the given length
+  nomTab=box.nomTab
+  correction=box.correction
+
+  divs=int(length/nomTab)  # divisions
+  if not divs%2: divs-=1   # make divs odd
+  divs=float(divs)
+  tabs=(divs-1)/2          # tabs for side
+
+  if box.equalTabs:
+    gapWidth=tabWidth=length/divs
+  else:
+    tabWidth=nomTab
+    gapWidth=(length-tabs*nomTab)/(divs-tabs)
+
+  if isTab:                 # kerf correction
+    gapWidth-=correction
+    tabWidth+=correction
+    first=correction/2
+  else:
+    gapWidth+=correction
+    tabWidth-=correction
+    first=-correction/2
+  return (divs,gapWidth,tabWidth,first)
+
+def side(box,sink,root,startOffset,endOffset,tabVec,length,direction,isTab):
+  #       root startOffset endOffset tabVec length  direction  isTab
+  # the edge alone, the divider holes along it come from grid.py
+  (rx,ry)=root
+  (sox,soy)=startOffset
+  (eox,eoy)=endOffset
+  (dirx,diry)=direction
+  thickness=box.thickness
+  (divs,gapWidth,tabWidth,first)=divisions(box,length,isTab)
+
+  firstVec=0; secondVec=tabVec
+  dirxN=0 if dirx else 1 # used to select operation on x or y
+  diryN=0 if diry else 1
+  (Vx,Vy)=(rx+sox*thickness,ry+soy*thickness)
+  s=array('d',(Vx,Vy))
+
+  if dirxN: Vy=ry # set correct line start
+  if diryN: Vx=rx
+
+  # generate line as tab or hole using:
+  #   last co-ord:Vx,Vy ; tab dir:tabVec  ; direction:dirx,diry ; thickness:thickness
+  #   divisions:divs ; gap width:gapWidth ; tab width:tabWidth
+
+  for n in range(1,int(divs)):
+    if n%2:
+      Vx=Vx+dirx*gapWidth+dirxN*firstVec+first*dirx
+      Vy=Vy+diry*gapWidth+diryN*firstVec+first*diry
+      s.extend((Vx,Vy))
+      Vx=Vx+dirxN*secondVec
+      Vy=Vy+diryN*secondVec
+      s.extend((Vx,Vy))
+    else:
+      Vx=Vx+dirx*tabWidth+dirxN*firstVec
+      Vy=Vy+diry*tabWidth+diryN*firstVec
+      s.extend((Vx,Vy))
+      Vx=Vx+dirxN*secondVec
+      Vy=Vy+diryN*secondVec
+      s.extend((Vx,Vy))
+    (secondVec,firstVec)=(-secondVec,-firstVec) # swap tab direction
+    first=0
+
+  #finish the line off
+  s.extend((rx+eox*thickness+dirx*length,ry+eoy*thickness+diry*length))
+  return Path(s)
+
+
+def generate(box,sink,side=side,grid=None):
+  # generate and draw each piece of the box, dividers and Schroff hole patterns into
+  # sink; side is the edge kernel, anything with the signature of side() above,
+  # which draws the edges while grid, grid.DividerGrid or anything with its
+  # constructor, edge() and draw(), adds the divider holes
+  if grid is None:
+    from .grid import DividerGrid as grid
+  (X,Y,Z) = (box.X,box.Y,box.Z)
+  thickness = box.thickness
+  spacing = box.spacing
+  divx = box.divx
+  divy = box.divy
+  keydivwalls = box.keydivwalls
+  keydivfloor = box.keydivfloor
+  divOffset = box.divOffset
+  xdividers=dividerPositions(X-thickness,divy,box.divySizes) # where the divy dividers cross X
+  ydividers=dividerPositions(Y-thickness,divx,box.divxSizes) # where the divx dividers cross Y
+  grid = grid(box,sink,side)
+  edge = grid.edge
+
+  for idx, piece in enumerate(box.pieces()): # generate and draw each piece of the box
+    (xs,xx,xy,xz)=piece[0]
+    (ys,yx,yy,yz)=piece[1]
+    x=xs*spacing+xx*X+xy*Y+xz*Z  # root x co-ord for piece
+    y=ys*spacing+yx*X+yy*Y+yz*Z  # root y co-ord for piece
+    dx=piece[2]
+    dy=piece[3]
+    tabs=piece[4]
+    a=tabs>>3&1; b=tabs>>2&1; c=tabs>>1&1; d=tabs&1 # extract tab status for each side
+    tabbed=piece[5]
+    atabs=tabbed>>3&1; btabs=tabbed>>2&1; ctabs=tabbed>>1&1; dtabs=tabbed&1 # extract tabbed flag for each side
+    xholes = 1 if piece[6]<3 else 0
+    yholes = 1 if piece[6]!=2 else 0
+    wall = 1 if piece[6]>1 else 0
+    floor = 1 if piece[6]==1 else 0
+
+    sink.beginPart('piece%d' % (idx+1))
+    if box.schroff:
+      from .holes import drawPatterns,schroffPatterns
+      drawPatterns(sink, schroffPatterns(box, piece[6], x, y, dx, dy, btabs, dtabs, idx))
+
+    # generate and draw the sides of each piece
+    edge((x,y),(d,a),(-b,a),atabs * (-thickness if a else thickness),dx,(1,0),a,0,ydividers[:(keydivfloor|wall) * (keydivwalls|floor) * divx*yholes*atabs],divOffset)          # side a
+    edge((x+dx,y),(-b,a),(-b,-c),btabs * (thickness if b else -thickness),dy,(0,1),b,0,xdividers[:(keydivfloor|wall) * (keydivwalls|floor) * divy*xholes*btabs],divOffset)     # side b
+    if atabs:
+      edge((x+dx,y+dy),(-b,-c),(d,-c),ctabs * (thickness if c else -thickness),dx,(-1,0),c,0,(),divOffset) # side c
+    else:
+      edge((x+dx,y+dy),(-b,-c),(d,-c),ctabs * (thickness if c else -thickness),dx,(-1,0),c,0,ydividers[:(keydivfloor|wall) * (keydivwalls|floor) * divx*yholes*ctabs],divOffset) # side c
+    if btabs:
+      edge((x,y+dy),(d,-c),(d,a),dtabs * (-thickness if d else thickness),dy,(0,-1),d,0,(),divOffset)      # side d
+    else:
+      edge((x,y+dy),(d,-c),(d,a),dtabs * (-thickness if d else thickness),dy,(0,-1),d,0,xdividers[:(keydivfloor|wall) * (keydivwalls|floor) * divy*xholes*dtabs],divOffset)      # side d
+    grid.draw()
+    sink.endPart()
+
+    if idx==0:
+      if not keydivwalls:
+        a=1;
+        b=1;
+        c=1;
+        d=1;
+        atabs=0;
+        btabs=0;
+        ctabs=0;
+        dtabs=0;
+      y=4*spacing+1*Y+2*Z  # root y co-ord for piece
+      for n in range(0,divx): # generate X dividers
+        x=n*(spacing+X)  # root x co-ord for piece
+        sink.beginPart('xdivider%d' % (n+1))
+        edge((x,y),(d,a),(-b,a),keydivfloor*atabs*(-thickness if a else thickness),dx,(1,0),a,1,(),divOffset)          # side a
+        edge((x+dx,y),(-b,a),(-b,-c),keydivwalls*btabs*(thickness if keydivwalls*b else -thickness),dy,(0,1),b,1,xdividers[:divy*xholes],divOffset)     # side b
+        edge((x+dx,y+dy),(-b,-c),(d,-c),keydivfloor*ctabs*(thickness if c else -thickness),dx,(-1,0),c,1,(),divOffset) # side c
+        edge((x,y+dy),(d,-c),(d,a),keydivwalls*dtabs*(-thickness if d else thickness),dy,(0,-1),d,1,(),divOffset)      # side d
+        grid.draw()
+        sink.endPart()
+    elif idx==1:
+      y=5*spacing+1*Y+3*Z  # root y co-ord for piece
+      for n in range(0,divy): # generate Y dividers
+        x=n*(spacing+Z)  # root x co-ord for piece
+        sink.beginPart('ydivider%d' % (n+1))
+        edge((x,y),(d,a),(-b,a),keydivwalls*atabs*(-thickness if a else thickness),dx,(1,0),a,1,ydividers[:divx*yholes],thickness)          # side a
+        edge((x+dx,y),(-b,a),(-b,-c),keydivfloor*btabs*(thickness if b else -thickness),dy,(0,1),b,1,(),thickness)     # side b
+        edge((x+dx,y+dy),(-b,-c),(d,-c),keydivwalls*ctabs*(thickness if c else -thickness),dx,(-1,0),c,1,(),thickness) # side c
+        edge((x,y+dy),(d,-c),(d,a),keydivfloor*dtabs*(-thickness if d else thickness),dy,(0,-1),d,1,(),thickness)      # side d
+        grid.draw()
+        sink.endPart()
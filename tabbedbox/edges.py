@@ -0,0 +1,75 @@
+'''
+Vectorized edge kernel: a drop-in replacement for core.side() that works out
+every vertex of a side in one NumPy pass instead of stepping through the
+divisions one at a time.
+
+The along-edge positions are a cumulative sum over the alternating gap/tab
+widths (with the kerf corrected first step), the across-edge positions a
+cumulative sum over the alternating tab vector, so each coordinate is
+accumulated in the same order as side() does and comes out the same.
+
+NumPy is optional; without it, or for sides too short to be worth it,
+sideVector() simply calls side().
+
+usage: generate(box, sink, side=sideVector)
+'''
+from array import array
+
+from .core import Path,divisions,side
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+MIN_DIVISIONS = 15  # below this the per call NumPy overhead outweighs the loop
+
+def sideVector(box,sink,root,startOffset,endOffset,tabVec,length,direction,isTab):
+  (divs,gapWidth,tabWidth,first)=divisions(box,length,isTab)
+  if numpy is None or divs<MIN_DIVISIONS:
+    return side(box,sink,root,startOffset,endOffset,tabVec,length,direction,isTab)
+  (rx,ry)=root
+  (sox,soy)=startOffset
+  (eox,eoy)=endOffset
+  (dirx,diry)=direction
+  thickness=box.thickness
+  dirxN=0 if dirx else 1
+  diryN=0 if diry else 1
+  sign=dirx or diry      # direction along the edge
+  steps=int(divs)-1      # one step per division boundary, two vertices each
+
+  (Sx,Sy)=(rx+sox*thickness,ry+soy*thickness)
+  (Vx,Vy)=(rx if diryN else Sx, ry if dirxN else Sy) # correct line start
+
+  # along: start, first gap and its kerf offset, then alternating tab and gap
+  widths=numpy.empty(steps+2)
+  widths[0]=Vx if diryN else Vy
+  widths[1]=sign*gapWidth
+  widths[2]=sign*first
+  widths[3::2]=sign*tabWidth
+  widths[4::2]=sign*gapWidth
+  along=numpy.cumsum(widths)[2:]
+  # across: start, then the tab vector with alternating sign
+  vecs=numpy.empty(steps+1)
+  vecs[0]=Vy if diryN else Vx
+  vecs[1::2]=tabVec
+  vecs[2::2]=-tabVec
+  across=numpy.cumsum(vecs)
+  secondVec=vecs[1:]
+
+  # vertices of step n are (along[n],across[n]) then (along[n],across[n+1])
+  pa=numpy.repeat(along,2)
+  pc=numpy.empty(2*steps)
+  pc[0::2]=across[:-1]
+  pc[1::2]=across[1:]
+  (px,py)=(pa,pc) if diryN else (pc,pa)
+
+  (Ex,Ey)=(rx+eox*thickness+dirx*length,ry+eoy*thickness+diry*length)
+  coords=numpy.empty(2*len(px)+4)
+  coords[:2]=(Sx,Sy)
+  coords[2:-2:2]=px
+  coords[3:-2:2]=py
+  coords[-2:]=(Ex,Ey)
+  s=Path(array('d',coords.tobytes()))
+
+  return s
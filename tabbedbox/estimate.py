@@ -0,0 +1,193 @@
+'''
+Dry-run estimates for quoting: the cut length, pierces, material and
+machine time of a box, worked out from the pieces table and the division
+math of side() without drawing a single path.
+
+Every edge side() draws runs the length of its side between the start
+and end offsets and steps across by tabVec between divisions, so its
+length is the side less or plus the offsets and (divisions-1) times the
+tab depth. The holes a divider keys into are the ones the divider grid
+(grid.py) would draw: under each of its tabs on the side, the first one
+short by the start offset, plus one from the end of the last division to
+the end of the side if the side has tabs; a crossing divider gets one
+slot half the side long. The holes are the same for every divider, so
+only their count matters, not where divider sizes put them. Schroff rail
+holes and ventilation grids are counted from their settings.
+
+This is exact for boxes with tabs wider than the material is thick. With
+narrower tabs the edges of side() double back on themselves, and the
+validator (validate.py) reports them crossing.
+
+Every closed contour is one pierce: the outline of each part and each
+hole. The material is the bounding box of the layout as drawn, also given
+as the sum of the part bounding boxes for nesting. Machine time is the
+cut length at the cutting feed plus a dwell per pierce; travel between
+cuts is left out.
+
+estimate(box) takes a few tens of microseconds, so a sheet of specs can
+be quoted without generating any of them:
+
+usage: python -m tabbedbox.batch specs.csv --dry-run [--feed mm/min] [--pierce-time s]
+'''
+import math
+
+from .core import divisions
+from .holes import ventLayout
+from .machine import FEED
+
+class Estimate(object):
+  # the cut and material of one box, in mm and mm^2
+  __slots__ = ('cut','pierces','parts','width','height','partArea')
+
+  def __init__(self, cut, pierces, parts, width, height, partArea):
+    self.cut = cut            # total cut length
+    self.pierces = pierces    # closed contours: outlines and holes
+    self.parts = parts
+    self.width = width        # of the layout bounding box
+    self.height = height
+    self.partArea = partArea  # sum of the part bounding boxes
+
+  @property
+  def area(self):  # of the layout bounding box
+    return self.width*self.height
+
+  def seconds(self, feed=FEED, pierceTime=0.0):
+    # machine time at feed mm/min, with pierceTime seconds at each pierce
+    return self.cut*60.0/feed+self.pierces*pierceTime
+
+def _schroff(box, pieceType, dx, dy):
+  # (cut length, pierces) of the Schroff holes of a piece
+  if pieceType == 3:
+    (count,r,length) = (2*box.rows, box.rail_mount_radius, box.rail_slot)
+  elif pieceType == 2 and box.vent > 0:
+    layout = ventLayout(box, dx, dy)
+    if layout is None:
+      return (0.0, 0)
+    (count,r,length) = (layout[0]*layout[1], box.vent/2, 0)
+  else:
+    return (0.0, 0)
+  return (count*(2*math.pi*r+2*length), count)
+
+def estimate(box):
+  # the Estimate of box, walking its pieces the way generate() does
+  (X,Y,Z) = (box.X,box.Y,box.Z)
+  thickness = box.thickness
+  spacing = box.spacing
+  divx = box.divx
+  divy = box.divy
+  keydivwalls = box.keydivwalls
+  keydivfloor = box.keydivfloor
+  schroff = box.schroff
+  known = {}  # length -> (tabs, divisions() without and with tabs)
+
+  def tabsOf(length):
+    d = known.get(length)
+    if d is None:
+      d = divisions(box, length, 0)
+      d = known[length] = (max(0, int(d[0]-1)//2), d, divisions(box, length, 1))
+    return d
+
+  def outline(x, y, dx, dy, xtabs, ytabs, a, b, c, d, atabs, btabs, ctabs, dtabs):
+    # (cut length, bounds) of a part's outline drawn from x,y, dx by dy, with
+    # xtabs tabs along dx and ytabs along dy, the tab flags and the sides
+    # with tabs given: each edge runs its side between the offsets of its
+    # ends and steps across by thickness twice for each tab; a flagged side
+    # without tabs runs thickness inside
+    cut = 2*(dx+dy-thickness*(a+b+c+d)+thickness*(xtabs*(atabs+ctabs)+ytabs*(btabs+dtabs)))
+    return (cut, [x+thickness*(d and not dtabs), y+thickness*(a and not atabs),
+                  x+dx-thickness*(b and not btabs), y+dy-thickness*(c and not ctabs)])
+
+  def holes(length, isTab, dividers, startX, endInset):
+    # (cut length, holes) of the joint holes for dividers keyed into a side:
+    # one under each divider tab, the first short by the x offset of the
+    # start of the side, plus one to the end of the side if it has tabs
+    (tabs,untabbed,tabbed) = tabsOf(length)
+    if not isTab:
+      return (dividers*2*tabs*(untabbed[2]+thickness), dividers*tabs)
+    (divs,gapWidth,tabWidth,first) = tabbed
+    along = walked = 0.0
+    if tabs:
+      along = abs(gapWidth+first-startX*thickness)+(tabs-1)*gapWidth
+      walked = tabs*(gapWidth+tabWidth)+first
+    along += abs(length-walked-endInset*thickness)
+    return (dividers*2*(along+(tabs+1)*thickness), dividers*(tabs+1))
+
+  def slots(length, isTab, dividers):
+    # (cut length, holes) of the slots crossing dividers fit into
+    first = tabsOf(length)[1+isTab][3]
+    return (dividers*2*(abs(first+length/2)+thickness), dividers)
+
+  cut = 0.0
+  pierces = parts = 0
+  bounds = []
+  for idx, piece in enumerate(box.pieces()):
+    (xs,xx,xy,xz)=piece[0]
+    (ys,yx,yy,yz)=piece[1]
+    x=xs*spacing+xx*X+xy*Y+xz*Z
+    y=ys*spacing+yx*X+yy*Y+yz*Z
+    dx=piece[2]
+    dy=piece[3]
+    tabs=piece[4]
+    a=tabs>>3&1; b=tabs>>2&1; c=tabs>>1&1; d=tabs&1
+    tabbed=piece[5]
+    atabs=tabbed>>3&1; btabs=tabbed>>2&1; ctabs=tabbed>>1&1; dtabs=tabbed&1
+    xholes = 1 if piece[6]<3 else 0
+    yholes = 1 if piece[6]!=2 else 0
+    wall = 1 if piece[6]>1 else 0
+    floor = 1 if piece[6]==1 else 0
+    keyed = (keydivfloor|wall)*(keydivwalls|floor)
+
+    xtabs = tabsOf(dx)[0]
+    ytabs = tabsOf(dy)[0]
+    (length,box0) = outline(x,y,dx,dy,xtabs,ytabs,a,b,c,d,atabs,btabs,ctabs,dtabs)
+    cut += length
+    pierces += 1
+    parts += 1
+    # holes for the dividers keyed into sides a to d, as generate() asks side() for them
+    ka = keyed*divx*yholes*atabs
+    kb = keyed*divy*xholes*btabs
+    kc = 0 if atabs else keyed*divx*yholes*ctabs
+    kd = 0 if btabs else keyed*divy*xholes*dtabs
+    if ka or kb or kc or kd:
+      for (k,length,isTab,startX,endInset) in ((ka,dx,a,d,b),(kb,dy,b,-b,c),(kc,dx,c,-b,d),(kd,dy,d,d,a)):
+        if k:
+          h = holes(length,isTab,k,startX,endInset)
+          cut += h[0]
+          pierces += h[1]
+      if b and kb and ytabs:  # the first hole of a vertical side starts at its corner
+        box0[1] = y
+      if d and kd and ytabs:
+        box0[3] = y+dy
+    if schroff:
+      h = _schroff(box, piece[6], dx, dy)
+      cut += h[0]
+      pierces += h[1]
+    bounds.append(box0)
+
+    # the dividers of the first two pieces' table entries, all the same shape
+    if idx==0 and divx:
+      if not keydivwalls:
+        a=b=c=d=1
+        atabs=btabs=ctabs=dtabs=0
+      (count,step,y) = (divx,spacing+X,4*spacing+Y+2*Z)
+      (length,box0) = outline(0,y,dx,dy,xtabs,ytabs,a,b,c,d,keydivfloor*atabs,keydivwalls*btabs,keydivfloor*ctabs,keydivwalls*dtabs)
+      h = slots(dy,b,divy*xholes)
+      if h[1]:  # from the bottom of side b
+        box0[1] = y
+    elif idx==1 and divy:
+      (count,step,y) = (divy,spacing+Z,5*spacing+Y+3*Z)
+      (length,box0) = outline(0,y,dx,dy,xtabs,ytabs,a,b,c,d,keydivwalls*atabs,keydivfloor*btabs,keydivwalls*ctabs,keydivfloor*dtabs)
+      h = slots(dx,a,divx*yholes)
+      if h[1]:  # from the left of side a
+        box0[0] = 0
+    else:
+      continue
+    cut += count*(length+h[0])
+    pierces += count*(1+h[1])
+    parts += count
+    (l,lo,r,hi) = box0
+    bounds.extend([box0]*(count-1)+[(l+(count-1)*step,lo,r+(count-1)*step,hi)])
+
+  partArea = sum([(r-l)*(hi-lo) for (l,lo,r,hi) in bounds])
+  (left,bottom,right,top) = zip(*bounds)
+  return Estimate(cut, pierces, parts, max(right)-min(left), max(top)-min(bottom), partArea)
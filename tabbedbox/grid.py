@@ -0,0 +1,105 @@
+'''
+Divider grid: the holes the dividers of a box key into, worked out for a
+whole panel in one pass instead of hole by hole inside the edge kernel.
+
+generate() hands each edge to DividerGrid.edge() with the distances along
+the panel of the dividers crossing it (core.dividerPositions(), equal or
+in the compartment sizes of div_l_sizes/div_w_sizes). The kernel draws
+the edge alone; holes() gives the rectangles of the joint holes (or the
+slots of a divider) for a divider at distance 0, the walk of side() over
+divisions() without the edge, and each divider shifts them across the
+edge by its position. draw() then writes the rectangles of the panel as
+one holes.RectPattern per size, dropping any drawn twice at the same
+place, before the part ends.
+
+side() drew the last joint hole of a vertical edge from the end of the
+walk to the end of the edge, without the divider offset, which crossed
+itself; here it sits at its divider like the others.
+'''
+from .core import divisions
+from .holes import RectPattern,drawPatterns
+
+def _rect(x,y,dx,dy):  # (x, y, w, h) of the rectangle from (x, y) spanning dx, dy
+  return (min(x,x+dx),min(y,y+dy),abs(dx),abs(dy))
+
+def holes(box,root,startOffset,endOffset,tabVec,length,direction,isTab,isDivider,divOffset):
+  # rectangles (x, y, w, h) of the holes of one divider at distance 0 across
+  # the edge side() would draw with the same arguments
+  (rx,ry)=root
+  (sox,soy)=startOffset
+  (eox,eoy)=endOffset
+  (dirx,diry)=direction
+  thickness=box.thickness
+  (divs,gapWidth,tabWidth,first)=divisions(box,length,isTab)
+  dirxN=0 if dirx else 1
+  diryN=0 if diry else 1
+  (Vx,Vy)=(rx+sox*thickness,ry+soy*thickness)
+  if dirxN: Vy=ry
+  if diryN: Vx=rx
+  if isDivider: # one slot halfway in from the start for the crossing divider
+    along=first+length/2
+    return [_rect(Vx-diry*divOffset,Vy-dirx*divOffset,dirx*along+dirxN*thickness,diry*along+diryN*thickness)]
+
+  rects=[]
+  secondVec=tabVec
+  for n in range(1,int(divs)):
+    if (n%2) ^ (not isTab): # a hole under each tab the divider has here
+      w=gapWidth if isTab else tabWidth
+      Dx=Vx; Dy=Vy
+      if n==1:
+        w-=sox*thickness
+        Dx+=sox*thickness
+      rects.append(_rect(Dx,Dy,dirx*(w+first)+dirxN*secondVec,diry*(w+first)+diryN*secondVec))
+    step=gapWidth+first if n%2 else tabWidth
+    Vx+=dirx*step+dirxN*secondVec
+    Vy+=diry*step+diryN*secondVec
+    secondVec=-secondVec
+    first=0
+  if isTab: # and from the end of the walk to the end of the edge
+    (Ex,Ey)=(rx+eox*thickness+dirx*length,ry+eoy*thickness+diry*length)
+    rects.append(_rect(Vx,Vy,Ex-Vx if dirx else secondVec,Ey-Vy if diry else secondVec))
+  return rects
+
+class DividerGrid(object):
+  # collects the divider holes of the part being drawn into sink; kernel
+  # draws the edges
+  def __init__(self, box, sink, kernel):
+    self.box = box
+    self.sink = sink
+    self.kernel = kernel
+    self.reset()
+
+  def reset(self):
+    self.shapes = []  # (w, h) in the order first seen
+    self.points = {}  # (w, h) -> ([x], [y])
+    self.seen = set()
+
+  def edge(self,root,startOffset,endOffset,tabVec,length,direction,isTab,isDivider,positions,divOffset):
+    # draw an edge, keeping the holes of the dividers at positions along
+    # the panel for draw()
+    box = self.box
+    self.sink.drawS(self.kernel(box,self.sink,root,startOffset,endOffset,tabVec,length,direction,isTab))
+    if not positions:
+      return
+    (dirx,diry) = direction
+    seen = self.seen
+    for (x,y,w,h) in holes(box,root,startOffset,endOffset,tabVec,length,direction,isTab,isDivider,divOffset):
+      shape = (round(w,6),round(h,6))
+      if shape not in self.points:
+        self.shapes.append(shape)
+        self.points[shape] = ([],[])
+      (xs,ys) = self.points[shape]
+      for p in positions:
+        (px,py) = (x-diry*p,y+dirx*p)
+        key = shape+(round(px,6),round(py,6))
+        if key not in seen:
+          seen.add(key)
+          xs.append(px)
+          ys.append(py)
+
+  def draw(self):
+    # draw the holes of the part as one pattern per hole size
+    patterns = [RectPattern(w,h,*self.points[(w,h)]) for (w,h) in self.shapes]
+    if patterns:
+      drawPatterns(self.sink,patterns)
+    self.reset()
@@ -0,0 +1,228 @@
+'''
+Hole patterns: all the holes of one kind on a panel, worked out in one pass
+and drawn as one element.
+
+A Pattern keeps where its holes are in two flat arrays and the shape they
+all share. A HolePattern has round holes of radius r, or slots of width 2r
+whose end centres are length apart along x, centred on its points. A
+RectPattern has w by h rectangles with their lowest corner on its points;
+the divider grid (grid.py) draws the holes and slots of keyed dividers
+with these. generate() hands each pattern to sink.drawPattern(pattern) if
+the sink has one, which can write the whole pattern as a single compound
+path from pattern.d(); other sinks get pattern.draw(sink), which calls
+drawCircle() for each round hole and drawHole() for each other outline,
+the way holes have always been drawn.
+
+schroffPatterns() gives the patterns of a Schroff rack panel:
+- the rail mounting holes of the side walls, two per row, rail_mount_depth
+  in from the open front edge of each wall, as slots rail_slot long if that
+  is set;
+- a grid of ventilation holes vent across, vent_pitch apart, on the top
+  and bottom panels if vent is set.
+'''
+import math
+from array import array
+
+from .core import Path,log,number
+
+SLOT_SEGMENTS = 16  # straight segments per slot end when drawn as a polyline
+
+class Pattern(object):
+  # holes of one shape at points xs[i],ys[i]; subclasses give the shape with
+  # shape(), outline(x, y), offset() from the point to where d() starts a hole,
+  # template(precision), the subpath of one hole after its absolute move, and
+  # perimeter(), the cut length of one hole
+  __slots__ = ('xs','ys')
+  circular = False  # round holes, drawn with drawCircle()
+
+  def __init__(self, xs, ys):
+    self.xs = array('d', xs)
+    self.ys = array('d', ys)
+
+  def __len__(self):
+    return len(self.xs)
+
+  def reordered(self, order):
+    # copy of the pattern with its holes in the order of the indices given
+    copy = object.__new__(type(self))
+    for cls in type(self).__mro__:
+      for name in getattr(cls, '__slots__', ()):
+        setattr(copy, name, getattr(self, name))
+    copy.xs = array('d', [self.xs[i] for i in order])
+    copy.ys = array('d', [self.ys[i] for i in order])
+    return copy
+
+  def draw(self, sink):
+    # draw the holes one at a time, for sinks without drawPattern()
+    for (x,y) in zip(self.xs, self.ys):
+      sink.drawHole(Path(self.outline(x, y)))
+
+  def start(self, i):  # where the subpath of hole i starts and ends in d()
+    (sx,sy) = self.offset()
+    return (self.xs[i]+sx, self.ys[i]+sy)
+
+  def d(self, precision=6):
+    # path data for every hole, one closed subpath each from an absolute move;
+    # the shape is written once and the start of each hole filled in, every
+    # distinct coordinate formatted once (a grid has few)
+    one = 'M%s,%s '+self.template(precision).replace('%', '%%')
+    (sx,sy) = self.offset()
+    xs = [x+sx for x in self.xs]
+    ys = [y+sy for y in self.ys]
+    text = dict([(v, number(v, precision)) for v in set(xs).union(ys)])
+    return ' '.join([one % (text[x], text[y]) for (x,y) in zip(xs, ys)])
+
+
+class HolePattern(Pattern):
+  # holes of one shape centred at xs[i],ys[i]; length 0 for round holes
+  __slots__ = ('r','length')
+
+  def __init__(self, r, xs, ys, length=0.0):
+    Pattern.__init__(self, xs, ys)
+    self.r = r
+    self.length = length
+
+  @property
+  def circular(self):
+    return not self.length
+
+  def shape(self):
+    return (self.r, self.length)
+
+  def extent(self):  # (maxX, maxY) of the holes
+    return (max(self.xs)+self.r+self.length/2, max(self.ys)+self.r)
+
+  def perimeter(self):  # cut length of one hole
+    return 2*math.pi*self.r+2*self.length
+
+  def draw(self, sink):
+    if self.length:
+      Pattern.draw(self, sink)
+      return
+    for (cx,cy) in zip(self.xs, self.ys):
+      sink.drawCircle(self.r, (cx,cy))
+
+  def outline(self, cx, cy):
+    # closed polyline round the slot centred on cx,cy, clockwise from the
+    # top left where its straight top edge starts
+    (r,half) = (self.r, self.length/2)
+    coords = array('d', (cx-half, cy-r))
+    for (ex,start) in ((cx+half, -math.pi/2), (cx-half, math.pi/2)):
+      for k in range(SLOT_SEGMENTS+1):
+        a = start+math.pi*k/SLOT_SEGMENTS
+        coords.extend((ex+r*math.cos(a), cy+r*math.sin(a)))
+    coords.extend((cx-half, cy-r))
+    return coords
+
+  def offset(self):
+    if self.length:
+      return (-self.length/2, -self.r)
+    return (self.r, 0.0)
+
+  def template(self, precision):
+    (r,l) = (self.r, self.length)
+    if l:
+      return 'h%s a%s,%s 0 0 1 0,%s h%s a%s,%s 0 0 1 0,%s z' % tuple(
+        [number(v, precision) for v in (l, r, r, 2*r, -l, r, r, -2*r)])
+    return 'a%s,%s 0 1 0 %s,0 a%s,%s 0 1 0 %s,0 z' % tuple(
+      [number(v, precision) for v in (r, r, -2*r, r, r, 2*r)])
+
+
+class RectPattern(Pattern):
+  # w by h rectangles, square to the axes, with their lowest x,y corner at
+  # xs[i],ys[i]
+  __slots__ = ('w','h')
+
+  def __init__(self, w, h, xs, ys):
+    Pattern.__init__(self, xs, ys)
+    self.w = w
+    self.h = h
+
+  def shape(self):
+    return ('rect', self.w, self.h)
+
+  def extent(self):
+    return (max(self.xs)+self.w, max(self.ys)+self.h)
+
+  def perimeter(self):
+    return 2*(self.w+self.h)
+
+  def outline(self, x, y):
+    # closed polyline round the rectangle, clockwise from x,y
+    (x1,y1) = (x+self.w, y+self.h)
+    return array('d', (x, y, x1, y, x1, y1, x, y1, x, y))
+
+  def offset(self):
+    return (0.0, 0.0)
+
+  def template(self, precision):
+    (w,h) = [number(v, precision) for v in (self.w, self.h)]
+    return 'h%s v%s h-%s z' % (w, h, w)
+
+
+def railHoles(box, x, y, dx, fromRight):
+  # the rail mounting holes of a side wall drawn from x,y and dx across,
+  # rail_mount_depth in from its left edge, or its right edge if fromRight
+  thickness = box.thickness
+  offset = box.rail_mount_centre_offset
+  rhxoffset = box.rail_mount_depth+thickness
+  rhx = x-rhxoffset+dx if fromRight else x+rhxoffset
+  log("rhxoffset = %g, rhx= %g", rhxoffset, rhx)
+  ys = []
+  rystart = y+(box.rail_height/2)+thickness
+  for n in range(box.rows):
+    # if holes are offset (eg. Vector T-strut rails), they should be offset
+    # toward each other, ie. toward the centreline of the Schroff row
+    rh1y = rystart+offset
+    ys.extend((rh1y, rh1y+box.row_centre_spacing-offset))
+    rystart += box.row_centre_spacing+box.row_spacing+box.rail_height
+  return HolePattern(box.rail_mount_radius, [rhx]*len(ys), ys, box.rail_slot)
+
+def ventLayout(box, dx, dy):
+  # (nx, ny, x0, y0) of the ventilation grid of a dx by dy panel: holes
+  # across and down and the first centre from the panel corner; None if
+  # none fit
+  pitch = box.vent_pitch
+  inset = box.thickness+box.vent_margin+box.vent/2
+  (w,h) = (dx-2*inset, dy-2*inset)
+  if w < 0 or h < 0 or pitch <= 0:
+    return None
+  (nx,ny) = (int(w/pitch)+1, int(h/pitch)+1)
+  return (nx, ny, inset+(w-(nx-1)*pitch)/2, inset+(h-(ny-1)*pitch)/2)
+
+def ventGrid(box, x, y, dx, dy):
+  # ventilation holes vent across on a square grid vent_pitch apart, centred
+  # on the panel drawn from x,y, dx by dy, keeping vent_margin clear inside
+  # its joints; None if none fit
+  layout = ventLayout(box, dx, dy)
+  if layout is None:
+    return None
+  (nx,ny,x0,y0) = layout
+  pitch = box.vent_pitch
+  (x0,y0) = (x+x0, y+y0)
+  xs = [x0+i*pitch for j in range(ny) for i in range(nx)]
+  ys = [y0+j*pitch for j in range(ny) for i in range(nx)]
+  return HolePattern(box.vent/2, xs, ys)
+
+def schroffPatterns(box, pieceType, x, y, dx, dy, btabs, dtabs, idx):
+  # hole patterns of a Schroff rack piece of the given type drawn from x,y;
+  # btabs and dtabs say whether its right and left edges are jointed
+  patterns = []
+  if pieceType == 3:  # side wall: rails run from its open (unjointed) edge
+    log("rail holes enabled on piece %d at (%g, %g)", idx, x+box.thickness, y+box.thickness)
+    fromRight = not btabs if btabs != dtabs else idx == 3
+    patterns.append(railHoles(box, x, y, dx, fromRight))
+  elif pieceType == 2 and box.vent > 0:  # top and bottom
+    grid = ventGrid(box, x, y, dx, dy)
+    if grid is not None:
+      patterns.append(grid)
+  return patterns
+
+def drawPatterns(sink, patterns):
+  # hand the patterns to sink.drawPattern(), or draw them hole by hole
+  drawPattern = getattr(sink, 'drawPattern', None)
+  for pattern in patterns:
+    if drawPattern is None:
+      pattern.draw(sink)
+    else:
+      drawPattern(pattern)
@@ -0,0 +1,143 @@
+'''
+Incremental regeneration: a key for every part of a box worked out from the
+arguments generate() draws it with, without computing any geometry, so that
+a document holding an earlier version of the box can keep the parts whose
+key has not changed and have only the others drawn again.
+
+A part's key covers the edge kernel settings of the box, every edge of the
+part with the positions of the dividers keyed into it, every circle and hole
+pattern of the part relative to its origin (the root of its first side) and
+a salt for anything else its output depends on, such as line style and
+precision. The divider holes are never worked out: the edge arguments and
+positions they come from are keyed instead. Moving a part leaves its key
+alone: partKeys() also gives each part's origin, so a kept part can be moved
+with a transform instead.
+
+Selective is a sink proxy, edge kernel and divider grid in one that lets
+generate() run through the whole box but only computes and draws the parts
+asked for. It saves work when few parts change; when most do, drawing the
+whole box straight into the sink is quicker.
+
+usage: keys = partKeys(box); sel = Selective(sink, changed); generate(box, sel, sel.side, sel.grid)
+'''
+import hashlib
+
+from .core import generate,side
+from .grid import DividerGrid
+from .holes import drawPatterns
+
+class _KeyRecorder(object):
+  # sink and stand-in for grid.DividerGrid keeping the arguments each part is
+  # drawn with, without drawing any edge or divider hole
+  def __init__(self):
+    self.parts = []   # [name, [('side',root,args) | ('circle',r,centre) | ('pattern',pattern)]]
+    self.positions = {}  # divider positions -> digest, worked out once for all edges
+
+  def beginPart(self, name):
+    self.part = [name, []]
+    self.parts.append(self.part)
+
+  def endPart(self):
+    pass
+
+  def grid(self, box, sink, kernel):
+    return self
+
+  def edge(self,root,startOffset,endOffset,tabVec,length,direction,isTab,isDivider,positions,divOffset):
+    positions = tuple(positions)
+    digest = self.positions.get(positions)
+    if digest is None:
+      digest = self.positions[positions] = _digest(repr(positions))
+    self.part[1].append(('side', tuple(root), (startOffset,endOffset,tabVec,length,direction,isTab,isDivider,digest,divOffset)))
+
+  def draw(self):
+    pass
+
+  def drawCircle(self, r, centre):
+    self.part[1].append(('circle', r, tuple(centre)))
+
+  def drawPattern(self, pattern):
+    self.part[1].append(('pattern', pattern))
+
+def _digest(text):
+  return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def _relative(point, origin):
+  return (round(point[0]-origin[0], 9), round(point[1]-origin[1], 9))
+
+def partKeys(box, salt=''):
+  # [(name, key, origin)] for the parts of box in drawing order; key is a hex
+  # digest, origin the (x,y) the part is drawn from
+  recorder = _KeyRecorder()
+  generate(box, recorder, grid=recorder.grid)
+  settings = (box.thickness, box.nomTab, box.equalTabs, box.correction)
+  keys = []
+  for (name,items) in recorder.parts:
+    sides = [item for item in items if item[0]=='side']
+    origin = sides[0][1] if sides else (0.0,0.0)
+    relative = []
+    for item in items:
+      if item[0]=='side':
+        relative.append(('side', _relative(item[1], origin), item[2]))
+      elif item[0]=='pattern':
+        p = item[1]
+        relative.append(('pattern',)+p.shape()+([_relative(c, origin) for c in zip(p.xs, p.ys)],))
+      else:
+        relative.append(('circle', item[1], _relative(item[2], origin)))
+    text = repr((salt, settings, relative))
+    keys.append((name, _digest(text), origin))
+  return keys
+
+
+class Selective(object):
+  # sink proxy, edge kernel and divider grid drawing only the parts named in
+  # names into sink; the edges and divider holes of the other parts are not
+  # computed at all
+  def __init__(self, sink, names, kernel=side):
+    self.sink = sink
+    self.names = set(names)
+    self.kernel = kernel
+    self.drawing = False
+
+  def side(self, box, sink, *args):
+    if self.drawing:
+      return self.kernel(box, self, *args)
+    return None
+
+  def grid(self, box, sink, kernel):
+    self.dividers = DividerGrid(box, sink, kernel)
+    return self
+
+  def edge(self, *args):
+    if self.drawing:
+      self.dividers.edge(*args)
+
+  def draw(self):
+    if self.drawing:
+      self.dividers.draw()
+
+  def beginPart(self, name):
+    self.drawing = name in self.names
+    if self.drawing:
+      self.sink.beginPart(name)
+
+  def endPart(self):
+    if self.drawing:
+      self.sink.endPart()
+    self.drawing = False
+
+  def drawS(self, path):
+    if self.drawing:
+      self.sink.drawS(path)
+
+  def drawHole(self, path):
+    if self.drawing:
+      self.sink.drawHole(path)
+
+  def drawCircle(self, r, centre):
+    if self.drawing:
+      self.sink.drawCircle(r, centre)
+
+  def drawPattern(self, pattern):
+    if self.drawing:
+      drawPatterns(self.sink, [pattern])
@@ -0,0 +1,175 @@
+'''
+Machine output: drawing sinks writing DXF or G-code straight to a file as
+each part is finished, for cutters that do not take SVG.
+
+A part is held until endPart(), then written holes and circles first and
+outline last. The outline edges a part is drawn with are joined end to end
+so that a closed outline is one contour. Only one part is ever held in
+memory. Neither writer takes placePart(), so a memo.Instancer draws repeats
+out in full.
+
+Both flip the y axis, which points down in the generated geometry, so
+parts come out the way round they look in the SVG: the layout sits below
+and right of the origin, which is its top left corner.
+
+DxfDocument writes a minimal DXF in mm, its header giving the version as
+AutoCAD 2000 (AC1015) for readers that go by it, with an LWPOLYLINE per
+contour, closed ones flagged closed, and a CIRCLE per round hole, holes on
+layer HOLES and outlines on layer OUTLINE. The slots of a hole pattern are closed
+LWPOLYLINEs with half circle (bulge) ends.
+
+GcodeDocument writes plain G-code (G21, G90) for a laser: a rapid G0 to
+the start of each contour, the beam on with M3 at the given power, G1 moves
+at the cutting feed and M5 at the end of it. Circles are full G2 arcs and
+slot ends half ones.
+
+usage: doc = DxfDocument(open('box.dxf','w')); generate(box, doc); doc.close()
+'''
+from .core import PRECISION,number
+from .holes import HolePattern,Pattern
+from .toolpath import closed,joinRuns
+
+FEED = 1000.0   # mm/min, cutting feed of G1 moves
+POWER = 1000    # S value of M3, spindle speed or laser power
+
+class ContourWriter(object):
+  # sink writing each part to out as contours at endPart(); subclasses
+  # provide contour(coords, isHole), circle(r, cx, cy), slot(cx, cy, length, r)
+  # and the file ends
+  def __init__(self, out, precision=PRECISION):
+    self.out = out
+    self.precision = precision
+    self.name = None
+    self.outline = []
+    self.holes = []
+
+  placePart = None
+
+  def beginPart(self, name):
+    self.name = name
+    self.outline = []
+    self.holes = []
+
+  def drawS(self, path):
+    self.outline.append(path.coords)
+
+  def drawHole(self, path):
+    self.holes.append(path.coords)
+
+  def drawCircle(self, r, centre):
+    self.holes.append((r, centre[0], centre[1]))
+
+  def drawPattern(self, pattern):
+    self.holes.append(pattern)
+
+  def endPart(self):
+    self.part(self.name)
+    for h in self.holes:
+      if isinstance(h, tuple):
+        self.circle(*h)
+      elif isinstance(h, HolePattern):
+        for (cx,cy) in zip(h.xs, h.ys):
+          if h.length:
+            self.slot(cx, cy, h.length, h.r)
+          else:
+            self.circle(h.r, cx, cy)
+      elif isinstance(h, Pattern):
+        for (x,y) in zip(h.xs, h.ys):
+          self.contour(h.outline(x, y), True)
+      else:
+        self.contour(h, True)
+    for run in joinRuns(self.outline):
+      self.contour(run, False)
+    self.outline = []
+    self.holes = []
+
+  def part(self, name):  # a part starts
+    pass
+
+  def xy(self, x, y):  # a point as written, y flipped
+    return (number(x, self.precision), number(-y, self.precision))
+
+
+class DxfDocument(ContourWriter):
+  def __init__(self, out, precision=PRECISION):
+    ContourWriter.__init__(self, out, precision)
+    # $ACADVER AC1015: AutoCAD 2000, the first version with LWPOLYLINE;
+    # $INSUNITS 4: millimetres
+    self.write((0,'SECTION'), (2,'HEADER'), (9,'$ACADVER'), (1,'AC1015'),
+               (9,'$INSUNITS'), (70,4), (0,'ENDSEC'),
+               (0,'SECTION'), (2,'ENTITIES'))
+
+  def write(self, *pairs):  # (group code, value) pairs
+    self.out.write(''.join(['%3d\n%s\n' % pair for pair in pairs]))
+
+  def contour(self, coords, isHole):
+    isClosed = closed(coords)
+    if isClosed:
+      coords = coords[:-2]
+    pairs = [(0,'LWPOLYLINE'), (8,'HOLES' if isHole else 'OUTLINE'), (90,len(coords)//2), (70,1 if isClosed else 0)]
+    for i in range(0, len(coords), 2):
+      (x,y) = self.xy(coords[i], coords[i+1])
+      pairs.append((10,x))
+      pairs.append((20,y))
+    self.write(*pairs)
+
+  def circle(self, r, cx, cy):
+    (x,y) = self.xy(cx, cy)
+    self.write((0,'CIRCLE'), (8,'HOLES'), (10,x), (20,y), (40,number(r, self.precision)))
+
+  def slot(self, cx, cy, length, r):
+    # straight sides along x, the ends half circles going clockwise (bulge -1)
+    half = length/2
+    pairs = [(0,'LWPOLYLINE'), (8,'HOLES'), (90,4), (70,1)]
+    for (vx,vy,end) in ((cx-half,cy-r,0), (cx+half,cy-r,1), (cx+half,cy+r,0), (cx-half,cy+r,1)):
+      (x,y) = self.xy(vx, vy)
+      pairs.extend(((10,x), (20,y)))
+      if end:
+        pairs.append((42,-1))
+    self.write(*pairs)
+
+  def close(self):
+    # finish the file; out is left open
+    self.write((0,'ENDSEC'), (0,'EOF'))
+    self.out.flush()
+
+
+class GcodeDocument(ContourWriter):
+  def __init__(self, out, precision=PRECISION, feed=FEED, power=POWER):
+    ContourWriter.__init__(self, out, precision)
+    self.feed = number(feed, 1)
+    self.power = number(power, 0)
+    out.write('G21\nG90\nM5\n')
+
+  def part(self, name):
+    self.out.write('(%s)\n' % name)
+
+  def contour(self, coords, isHole):
+    (x,y) = self.xy(coords[0], coords[1])
+    lines = ['G0 X%s Y%s' % (x,y), 'M3 S%s' % self.power]
+    for i in range(2, len(coords), 2):
+      (x,y) = self.xy(coords[i], coords[i+1])
+      lines.append('G1 X%s Y%s' % (x,y) if i > 2 else 'G1 X%s Y%s F%s' % (x,y,self.feed))
+    lines.append('M5\n')
+    self.out.write('\n'.join(lines))
+
+  def circle(self, r, cx, cy):
+    (x,y) = self.xy(cx+r, cy)
+    i = number(-r, self.precision)
+    self.out.write('G0 X%s Y%s\nM3 S%s\nG2 X%s Y%s I%s J0 F%s\nM5\n' % (x, y, self.power, x, y, i, self.feed))
+
+  def slot(self, cx, cy, length, r):
+    # from the top left corner clockwise, the ends as half circle G2 arcs
+    half = length/2
+    (x0,y0) = self.xy(cx-half, cy-r)
+    (x1,y1) = self.xy(cx+half, cy-r)
+    (x2,y2) = self.xy(cx+half, cy+r)
+    (x3,y3) = self.xy(cx-half, cy+r)
+    (up,down) = (number(r, self.precision), number(-r, self.precision))
+    self.out.write('G0 X%s Y%s\nM3 S%s\nG1 X%s Y%s F%s\nG2 X%s Y%s I0 J%s\nG1 X%s Y%s\nG2 X%s Y%s I0 J%s\nM5\n' % (
+      x0, y0, self.power, x1, y1, self.feed, x2, y2, down, x3, y3, x0, y0, up))
+
+  def close(self):
+    # finish the program, back to the origin; out is left open
+    self.out.write('G0 X0 Y0\nM2\n')
+    self.out.flush()
@@ -0,0 +1,147 @@
+'''
+Memoized edges and instanced parts.
+
+A side of a piece only depends on the root it is drawn from by translation,
+so EdgeCache works each distinct side out once, at the origin, and moves the
+stored coordinates to every root it is asked for. Opposite walls and all the
+dividers of a box share their sides this way.
+
+Instancer goes one step further: it sits between generate() and a sink,
+takes the edges from its EdgeCache as (edge,root) references and compares
+each finished part to the earlier ones by those references alone. A part
+repeating an earlier one is handed to the sink as sink.placePart(name,like,
+(dx,dy)) without any coordinates being moved; sinks without placePart() (or
+with placePart = None), or flatten=True, get the geometry drawn out in full
+as usual.
+
+usage: inst = Instancer(doc); generate(box, inst, inst.side)
+'''
+from array import array
+
+from .core import Path,side
+from .holes import drawPatterns
+
+def translate(coords, offset):
+  # copy of a flat x,y coordinate buffer moved by offset
+  (ox,oy) = offset
+  moved = array('d', coords)
+  moved[0::2] = array('d', [v+ox for v in coords[0::2]])
+  moved[1::2] = array('d', [v+oy for v in coords[1::2]])
+  return moved
+
+
+class EdgeCache(object):
+  # edge kernel with the signature of side(), computing each distinct edge once
+  def __init__(self, kernel=side):
+    self.kernel = kernel
+    self.edges = {}   # key -> (index, edge coords) at the origin
+    self.hits = self.misses = 0
+
+  def edge(self,box,sink,startOffset,endOffset,tabVec,length,direction,isTab):
+    # (index,coords) of an edge drawn from the origin, the root being the
+    # only argument of side() left out of the key
+    key = (box.thickness,box.nomTab,box.equalTabs,box.correction,
+           tuple(startOffset),tuple(endOffset),tabVec,length,tuple(direction),isTab)
+    edge = self.edges.get(key)
+    if edge is None:
+      self.misses += 1
+      path = self.kernel(box,sink,(0,0),startOffset,endOffset,tabVec,length,direction,isTab)
+      edge = self.edges[key] = (len(self.edges), path.coords)
+    else:
+      self.hits += 1
+    return edge
+
+  def __call__(self,box,sink,root,*args):
+    return Path(translate(self.edge(box,sink,*args)[1], root))
+
+  def stats(self):
+    return '%d edges computed, %d reused' % (self.misses, self.hits)
+
+
+class _Edge(object):
+  # reference to a cached edge placed at root
+  __slots__ = ('edge','root')
+
+  def __init__(self, edge, root):
+    self.edge = edge
+    self.root = root
+
+
+class Instancer(object):
+  # sink proxy drawing each distinct part once and placing the repeats
+  def __init__(self, sink, edges=None, flatten=False):
+    self.sink = sink
+    self.edges = edges or EdgeCache()
+    self.flatten = flatten or getattr(sink, 'placePart', None) is None
+    self.parts = {}     # signature -> (name, origin) of the first part drawn with it
+    self.name = None
+    self.items = []     # _Edge references, ('circle',r,(cx,cy)), ('pattern',pattern) and ('edge'|'hole',path)
+    self.placed = 0
+
+  def side(self,box,sink,root,*args):  # edge kernel to go with this sink
+    return _Edge(self.edges.edge(box,sink,*args), root)
+
+  def beginPart(self, name):
+    self.name = name
+    self.items = []
+
+  def drawS(self, edge):  # an _Edge from side() above, or a Path from another kernel
+    self.items.append(edge if isinstance(edge, _Edge) else ('edge', edge))
+
+  def drawHole(self, path):
+    self.items.append(('hole', path))
+
+  def drawCircle(self, r, centre):
+    self.items.append(('circle', r, centre))
+
+  def drawPattern(self, pattern):
+    self.items.append(('pattern', pattern))
+
+  def _signature(self, origin):
+    # the part's edges, circles and hole patterns relative to origin, None if it has paths
+    # that did not come from the edge cache
+    (ox,oy) = origin
+    sig = []
+    for item in self.items:
+      if isinstance(item, _Edge):
+        sig.append((item.edge[0], round(item.root[0]-ox, 9), round(item.root[1]-oy, 9)))
+      elif item[0]=='circle':
+        (kind,r,(cx,cy)) = item
+        sig.append((r, round(cx-ox, 9), round(cy-oy, 9)))
+      elif item[0]=='pattern':
+        p = item[1]
+        sig.append(p.shape()+(tuple([round(x-ox, 9) for x in p.xs]), tuple([round(y-oy, 9) for y in p.ys])))
+      else:
+        return None
+    return tuple(sig)
+
+  def endPart(self):
+    edges = [item for item in self.items if isinstance(item, _Edge)]
+    if not self.flatten and edges:
+      origin = edges[0].root
+      sig = self._signature(origin)
+      like = self.parts.get(sig) if sig is not None else None
+      if like is not None:
+        (name,(lx,ly)) = like
+        self.sink.placePart(self.name, name, (origin[0]-lx, origin[1]-ly))
+        self.placed += 1
+        return
+      if sig is not None:
+        self.parts[sig] = (self.name, origin)
+    self._draw()
+
+  def _draw(self):  # draw the current part out in full
+    sink = self.sink
+    sink.beginPart(self.name)
+    for item in self.items:
+      if isinstance(item, _Edge):
+        sink.drawS(Path(translate(item.edge[1], item.root)))
+      elif item[0]=='circle':
+        sink.drawCircle(item[1], item[2])
+      elif item[0]=='pattern':
+        drawPatterns(sink, [item[1]])
+      elif item[0]=='hole':
+        sink.drawHole(item[1])
+      else:
+        sink.drawS(item[1])
+    sink.endPart()
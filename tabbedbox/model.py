@@ -0,0 +1,255 @@
+'''
+Explicit geometry model: the parts of a box as Part objects made of Edges
+and Contours, every coordinate a whole number of microns in a packed array.
+
+The edge kernels work in floats, adding tab and slot lengths up one step at
+a time, so edges that should meet can end a hair apart and the same shape
+drawn twice need not compare equal. PartCollector takes what generate()
+draws and rounds each coordinate once to the micron grid. It joins the
+outline edges of every part end to end, treating ends within a micron as
+the same point, into closed Contours, and moves the part to the origin.
+Parts, Contours and Edges then compare and hash exactly, so parts of the
+same shape can be found with dedupe() or used as cache keys.
+
+Edge is an open polyline, Contour a closed one (its first point is not
+repeated at the end). Neither is changed once made, so parts of the same
+shape share them. A Part keeps its outline and holes as Contours (or
+Edges, for runs that do not close), its round holes as one packed array of
+r,cx,cy triples, where it was drawn and its size. Part.draw(sink) draws it
+back into any sink, so nesting and every writer (SVG, DXF, G-code) work
+from the model.
+
+Coordinates are stored as array('i'), 4 bytes each, which covers +-2 km.
+
+usage: parts = collectParts(box); groups = dedupe(parts); parts[0].draw(doc)
+'''
+import hashlib
+from array import array
+
+from .core import Path,generate,side
+
+SCALE = 1000   # model units per mm: microns
+TYPECODE = 'i'
+
+def microns(value):  # a coordinate in mm on the micron grid
+  return int(round(value*SCALE))
+
+if hasattr(array(TYPECODE), 'tobytes'):
+  def _bytes(coords):
+    return coords.tobytes()
+else:  # Python 2
+  def _bytes(coords):
+    return coords.tostring()
+
+
+class Edge(object):
+  # open polyline as a flat array('i') of x,y pairs in microns
+  __slots__ = ('coords',)
+
+  def __init__(self, coords):
+    self.coords = coords if isinstance(coords, array) else array(TYPECODE, coords)
+
+  def __len__(self):  # points
+    return len(self.coords)//2
+
+  def __eq__(self, other):
+    return type(self) is type(other) and self.coords == other.coords
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    return hash((type(self).__name__, _bytes(self.coords)))
+
+  def __repr__(self):
+    return '%s(%r)' % (type(self).__name__, list(self.coords))
+
+  def points(self):
+    c = self.coords
+    return zip(c[0::2], c[1::2])
+
+  def bounds(self):  # (x0, y0, x1, y1)
+    c = self.coords
+    return (min(c[0::2]), min(c[1::2]), max(c[0::2]), max(c[1::2]))
+
+  def moved(self, dx, dy):
+    c = array(TYPECODE, self.coords)
+    c[0::2] = array(TYPECODE, [v+dx for v in self.coords[0::2]])
+    c[1::2] = array(TYPECODE, [v+dy for v in self.coords[1::2]])
+    return type(self)(c)
+
+  def length(self):  # in microns, as a float
+    c = self.coords
+    return sum([((c[i+2]-c[i])**2+(c[i+3]-c[i+1])**2)**0.5 for i in range(0, len(c)-2, 2)])
+
+  def mm(self, dx=0.0, dy=0.0, rotated=0):
+    # coordinates in mm as a Path, moved by dx,dy after a quarter turn
+    # (x,y -> rotated-y,x) if rotated is the height to turn about
+    c = self.coords
+    s = float(SCALE)
+    out = array('d', c)
+    if rotated:
+      out[0::2] = array('d', [dx+(rotated-v)/s for v in c[1::2]])
+      out[1::2] = array('d', [dy+v/s for v in c[0::2]])
+    else:
+      out[0::2] = array('d', [dx+v/s for v in c[0::2]])
+      out[1::2] = array('d', [dy+v/s for v in c[1::2]])
+    return Path(out)
+
+
+class Contour(Edge):
+  # closed polyline; the closing segment back to the first point is implied
+  __slots__ = ()
+
+  def length(self):
+    c = self.coords
+    return Edge.length(self)+((c[0]-c[-2])**2+(c[1]-c[-1])**2)**0.5
+
+  def area2(self):
+    # twice the signed area in square microns, exact (shoelace)
+    c = self.coords
+    n = len(c)
+    return sum([c[i]*c[(i+3)%n]-c[(i+2)%n]*c[i+1] for i in range(0, n, 2)])
+
+  def mm(self, dx=0.0, dy=0.0, rotated=0):
+    path = Edge.mm(self, dx, dy, rotated)
+    path.coords.extend(path.coords[:2])
+    return path
+
+
+def _join(runs, tolerance=1, join=True):
+  # Edges and Contours of integer coordinate runs, joined where one ends
+  # within tolerance of the start of the next if join; a run ending on its
+  # start closes
+  joined = []
+  for pts in runs:
+    if join and joined and abs(pts[0]-joined[-1][-2]) <= tolerance and abs(pts[1]-joined[-1][-1]) <= tolerance:
+      joined[-1].extend(pts[2:])
+    else:
+      joined.append(array(TYPECODE, pts))
+  out = []
+  for pts in joined:
+    if len(pts) > 4 and abs(pts[0]-pts[-2]) <= tolerance and abs(pts[1]-pts[-1]) <= tolerance:
+      out.append(Contour(pts[:-2]))
+    else:
+      out.append(Edge(pts))
+  return out
+
+
+class Part(object):
+  # one physical part moved to the origin: outline and holes are Contours
+  # (or Edges), circles packed r,cx,cy triples, origin the (x,y) in microns it
+  # was drawn at and size its (width,height) in microns, also kept in mm as
+  # width and height for nest
+  __slots__ = ('name','outline','holes','circles','origin','size','width','height')
+
+  def __init__(self, name, outline, holes=(), circles=()):
+    # outline and holes in the coordinates drawn, circles (r,cx,cy) triples
+    circles = array(TYPECODE, circles)
+    boxes = [e.bounds() for e in list(outline)+list(holes)]
+    for i in range(0, len(circles), 3):
+      (r,cx,cy) = circles[i:i+3]
+      boxes.append((cx-r, cy-r, cx+r, cy+r))
+    (x0,y0) = (min([b[0] for b in boxes]), min([b[1] for b in boxes]))
+    self.name = name
+    self.origin = (x0, y0)
+    self.size = (max([b[2] for b in boxes])-x0, max([b[3] for b in boxes])-y0)
+    (self.width,self.height) = (self.size[0]/float(SCALE), self.size[1]/float(SCALE))
+    self.outline = tuple([e.moved(-x0, -y0) for e in outline])
+    self.holes = tuple([e.moved(-x0, -y0) for e in holes])
+    circles[1::3] = array(TYPECODE, [v-x0 for v in circles[1::3]])
+    circles[2::3] = array(TYPECODE, [v-y0 for v in circles[2::3]])
+    self.circles = circles
+
+  @property
+  def area(self):  # area inside the outline in square mm
+    return abs(sum([c.area2() for c in self.outline if isinstance(c, Contour)]))/(2.0*SCALE*SCALE)
+
+  def shape(self):
+    # exact key of the part's geometry, the same for parts of the same shape
+    # wherever they were drawn
+    return (self.outline, self.holes, _bytes(self.circles))
+
+  def placed(self, name, dx, dy):
+    # the part named name, drawn dx,dy microns from this one
+    part = Part.__new__(Part)
+    for attr in Part.__slots__:
+      setattr(part, attr, getattr(self, attr))
+    part.name = name
+    part.origin = (self.origin[0]+dx, self.origin[1]+dy)
+    return part
+
+  def key(self):  # shape() as a short hex digest, for on-disk caches
+    return hashlib.sha1(repr(self.shape()).encode('utf-8')).hexdigest()[:16]
+
+  def cutLength(self):  # in mm
+    return sum([e.length() for e in self.outline+self.holes])/SCALE
+
+  def draw(self, sink, x=None, y=None, rotated=False):
+    # draw the part into sink in mm with its bounding box at (x,y), by default
+    # where it was drawn, turned a quarter turn (x,y -> height-y,x) if rotated
+    s = float(SCALE)
+    if x is None:
+      (x,y) = (self.origin[0]/s, self.origin[1]/s)
+    h = self.size[1] if rotated else 0
+    sink.beginPart(self.name)
+    for hole in self.holes:
+      sink.drawHole(hole.mm(x, y, h))
+    c = self.circles
+    for i in range(0, len(c), 3):
+      (cx,cy) = (h-c[i+2], c[i+1]) if rotated else (c[i+1], c[i+2])
+      sink.drawCircle(c[i]/s, (x+cx/s, y+cy/s))
+    for edge in self.outline:
+      sink.drawS(edge.mm(x, y, h))
+    sink.endPart()
+
+
+class PartCollector(object):
+  # sink keeping every part drawn into it as a Part, names prefixed by prefix;
+  # a part of the same shape as an earlier one shares its geometry
+  def __init__(self, prefix=''):
+    self.prefix = prefix
+    self.parts = []
+    self.shapes = {}  # shape() -> first Part of that shape
+
+  def beginPart(self, name):
+    self.name = self.prefix+name
+    self.edges = []
+    self.holes = []
+    self.circles = []
+
+  def endPart(self):
+    part = Part(self.name, _join(self.edges), _join(self.holes, join=False), self.circles)
+    first = self.shapes.setdefault(part.shape(), part)
+    if first is not part:
+      (part.outline,part.holes,part.circles) = (first.outline, first.holes, first.circles)
+    self.parts.append(part)
+
+  def drawS(self, path):
+    self.edges.append([microns(v) for v in path.coords])
+
+  def drawHole(self, path):
+    self.holes.append([microns(v) for v in path.coords])
+
+  def drawCircle(self, r, centre):
+    self.circles.extend((microns(r), microns(centre[0]), microns(centre[1])))
+
+def collectParts(box, prefix='', kernel=side):
+  # the parts of a box as a list of Part
+  collector = PartCollector(prefix)
+  generate(box, collector, kernel)
+  return collector.parts
+
+def dedupe(parts):
+  # [(part, [names])]: one part of each shape in first drawn order, with the
+  # names of all the parts of that shape
+  groups = {}
+  order = []
+  for part in parts:
+    shape = part.shape()
+    group = groups.get(shape)
+    if group is None:
+      group = groups[shape] = (part, [])
+      order.append(group)
+    group[1].append(part.name)
+  return order
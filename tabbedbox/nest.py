@@ -0,0 +1,193 @@
+'''
+Sheet nesting: packs the parts of one or many boxes onto sheets of a given
+size instead of using the fixed layout tables of Box.pieces().
+
+The parts are drawn into a model.PartCollector, which puts each on the
+micron grid at the origin, then packed largest first with a skyline
+bottom-left packer that tries each part both ways round and puts it where
+its top ends up lowest. A part that fits on none of the open sheets starts a
+new one. Each Sheet is then drawn into a sink of its own, one document per
+sheet.
+
+usage: python -m tabbedbox.nest specs.csv --sheet 600x400 -o outdir [--spacing mm] [--no-rotate] [--compact] [--order] [--common-line] [--precision n]
+'''
+import argparse,os,sys
+
+from .core import PRECISION,BoxError,boxFromSpec,number
+from .model import collectParts,dedupe
+
+EPSILON = 1e-9
+
+class Sheet(object):
+  # one sheet of material and the parts placed on it, each with at least
+  # spacing around it and from the sheet edge
+  def __init__(self, width, height, spacing=1.0):
+    self.width = width
+    self.height = height
+    self.spacing = spacing
+    self.placements = []  # (part, x, y, rotated)
+    # skyline over the packing area, which is the sheet less spacing on the
+    # left and bottom; every part takes its size plus spacing from it
+    self.skyline = [[0.0, 0.0, width-spacing]]  # [x, y, width] segments left to right
+
+  def _fit(self, w, h):
+    # (top, x, y, segment index) of the lowest bottom-left spot for a w x h
+    # rectangle, None if there is none
+    (W,H) = (self.width-self.spacing, self.height-self.spacing)
+    sky = self.skyline
+    best = None
+    for i in range(len(sky)):
+      x = sky[i][0]
+      if x+w > W+EPSILON:
+        break
+      y = 0.0
+      j = i
+      while j < len(sky) and sky[j][0] < x+w-EPSILON:
+        if sky[j][1] > y: y = sky[j][1]
+        j += 1
+      if y+h <= H+EPSILON and (best is None or (y+h,x) < best[:2]):
+        best = (y+h, x, y, i)
+    return best
+
+  def place(self, part, rotate=True):
+    # put part on the sheet if there is room, returns whether it fitted
+    s = self.spacing
+    fit = self._fit(part.width+s, part.height+s)
+    rotated = False
+    if rotate:
+      turned = self._fit(part.height+s, part.width+s)
+      if turned is not None and (fit is None or turned[:2] < fit[:2]):
+        (fit,rotated) = (turned,True)
+    if fit is None:
+      return False
+    (top,x,y,i) = fit
+    w = (part.height if rotated else part.width)+s
+    self._raise(i, x, w, top)
+    self.placements.append((part, x+s, y+s, rotated))
+    return True
+
+  def _raise(self, i, x, w, top):
+    # put a segment x..x+w at height top into the skyline from segment i on
+    sky = self.skyline
+    end = x+w
+    j = i
+    while j < len(sky) and sky[j][0] < end-EPSILON:
+      j += 1
+    covered = sky[i:j]
+    rest = []
+    last = covered[-1]
+    if last[0]+last[2] > end+EPSILON:  # keep what sticks out on the right
+      rest.append([end, last[1], last[0]+last[2]-end])
+    sky[i:j] = [[x, top, w]]+rest
+    # merge neighbours of equal height
+    k = max(i-1, 0)
+    while k < len(sky)-1 and k <= i+1:
+      if abs(sky[k][1]-sky[k+1][1]) < EPSILON:
+        sky[k][2] += sky[k+1][2]
+        del sky[k+1]
+      else:
+        k += 1
+
+  def used(self):  # area of the parts on the sheet
+    return sum([part.area for (part,x,y,rotated) in self.placements])
+
+  def utilization(self):  # percentage of the sheet taken up by parts
+    return 100.0*self.used()/(self.width*self.height)
+
+  def draw(self, sink):
+    for (part,x,y,rotated) in self.placements:
+      part.draw(sink, x, y, rotated)
+
+
+def nest(parts, sheetSize, spacing=1.0, rotate=True):
+  # pack parts onto as many sheets of sheetSize (width,height) as needed,
+  # returns the list of Sheet; raises ValueError for a part too big for a sheet
+  (W,H) = sheetSize
+  sheets = []
+  for part in sorted(parts, key=lambda p: (-p.width*p.height, -max(p.width,p.height))):
+    for sheet in sheets:
+      if sheet.place(part, rotate):
+        break
+    else:
+      sheet = Sheet(W, H, spacing)
+      if not sheet.place(part, rotate):
+        raise ValueError('part %s (%s x %s mm) does not fit on a %s x %s mm sheet' % (
+          part.name, number(part.width,2), number(part.height,2), number(W,2), number(H,2)))
+      sheets.append(sheet)
+  return sheets
+
+
+def main(argv=None):
+  from .batch import outputName,readSpecs
+  from .svg import CompactSvgDocument,SvgDocument
+  from .commonline import CommonLine
+  from .toolpath import Toolpath
+  parser = argparse.ArgumentParser(prog='tabbedbox.nest', description='Nest the parts of tabbed boxes onto sheets')
+  parser.add_argument('specs', help='CSV or JSONL file of box specs')
+  parser.add_argument('--sheet', required=True, help='sheet size in mm, WIDTHxHEIGHT')
+  parser.add_argument('-o', '--output', default='.', help='output directory')
+  parser.add_argument('--spacing', type=float, default=None, help='gap between parts in mm (default: largest box spacing)')
+  parser.add_argument('--no-rotate', dest='rotate', action='store_false', help='keep parts the way round they are drawn')
+  parser.add_argument('--compact', action='store_true', help='one compound path per part')
+  parser.add_argument('--order', action='store_true', help='draw parts and holes in cutting order, reporting the travel saved')
+  parser.add_argument('--common-line', dest='commonLine', action='store_true', help='cut lines shared by parts only once, reporting the length saved')
+  parser.add_argument('--precision', type=int, default=PRECISION, help='decimals written for coordinates (default: %d)' % PRECISION)
+  args = parser.parse_args(argv)
+  try:
+    sheetSize = tuple([float(v) for v in args.sheet.lower().split('x')])
+    (W,H) = sheetSize
+  except ValueError:
+    parser.error('--sheet must be WIDTHxHEIGHT in mm')
+
+  specs = readSpecs(args.specs)
+  parts = []
+  boxes = []
+  failed = 0
+  for (index,spec) in enumerate(specs):
+    spec = dict(spec)
+    name = outputName(index, spec)
+    spec.pop('name', None)
+    try:
+      box = boxFromSpec(spec)
+    except (BoxError,ValueError) as e:
+      sys.stderr.write('%s: %s\n' % (name, '; '.join([str(a) for a in e.args])))
+      failed += 1
+      continue
+    boxes.append(box)
+    parts.extend(collectParts(box, name+'-' if len(specs)>1 else ''))
+  if not boxes:
+    return 1
+  spacing = args.spacing if args.spacing is not None else max([box.spacing for box in boxes])
+  try:
+    sheets = nest(parts, sheetSize, spacing, args.rotate)
+  except ValueError as e:
+    sys.stderr.write('%s\n' % e)
+    return 1
+
+  if not os.path.isdir(args.output):
+    os.makedirs(args.output)
+  for (n,sheet) in enumerate(sheets):
+    doc = (CompactSvgDocument if args.compact else SvgDocument)(boxes[0].hairline, 0, args.precision, sheetSize)
+    name = 'sheet-%02d.svg' % (n+1)
+    report = '%s: %d parts, %.1f%% used' % (name, len(sheet.placements), sheet.utilization())
+    draw = sheet.draw
+    if args.order:
+      tp = Toolpath()
+      draw(tp)
+      draw = tp.draw
+      report += ', '+tp.summary()
+    if args.commonLine:
+      cl = CommonLine()
+      draw(cl)
+      draw = cl.draw
+      report += ', '+cl.summary()
+    draw(doc)
+    doc.write(os.path.join(args.output, name))
+    sys.stdout.write(report+'\n')
+  used = sum([sheet.used() for sheet in sheets])
+  sys.stdout.write('%d parts (%d shapes) on %d sheets, %.1f%% used\n' % (
+    len(parts), len(dedupe(parts)), len(sheets), 100.0*used/(len(sheets)*W*H)))
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,422 @@
+'''
+HTTP service generating boxes on demand: POST a box spec as JSON and get
+the SVG, DXF or G-code back. Boxes are generated in a pool of worker
+processes started, and warmed up with a box each, when the service starts,
+so a request costs the geometry rather than the start of an interpreter.
+
+Requests wait for a worker in a queue of --queue places. When it is full
+the service answers 503 with Retry-After at once rather than letting work
+pile up, so a client learns of overload straight away and the latency of
+the requests taken stays bounded by the queue length.
+
+  POST /box[?format=svg|dxf|gcode&compact=1&memo=1&order=1&common_line=1&precision=n&feed=f&power=s&validate=0]
+       body: one JSON object of spec fields, like a line of a batch JSONL
+       sheet (see batch.py). 200 with the file, with the number of problems
+       validate.py found in the X-Geometry-Problems header; 400 with
+       {"errors":[...]} for settings the box rejects; 503 when the queue is full
+  GET /metrics       Prometheus text: requests by status, latency quantiles
+                     of queue wait, generation and the whole request, queue
+                     depth and busy workers
+  GET /metrics.json  the same as JSON
+  GET /health        ok
+
+Latency quantiles are over the last WINDOW requests that got a worker.
+Connections are kept alive between requests (HTTP/1.1). This module needs
+Python 3.7+; the rest of the package still runs on Python 2.
+
+usage: python -m tabbedbox.service [--host 127.0.0.1] [--port 8080] [-j jobs] [--queue n] [--vector]
+'''
+import argparse,asyncio,collections,json,multiprocessing,signal,sys,time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from urllib.parse import parse_qsl,urlsplit
+
+from .batch import EXTENSIONS,outputName,renderMachine,renderSvg
+from .core import BoxError,side
+from .validate import describe
+
+PORT = 8080
+QUEUE = 64          # requests waiting for a worker before 503
+WINDOW = 10000      # latencies kept for the quantiles
+QUANTILES = (0.5, 0.9, 0.99)
+MAX_BODY = 64*1024  # bytes of JSON a request may send
+IDLE = 30.0         # seconds a kept alive connection may wait for its next request
+
+CONTENT_TYPES = {'svg':'image/svg+xml', 'dxf':'application/dxf', 'gcode':'text/plain; charset=utf-8'}
+FLAGS = {'compact':'compact', 'memo':'memo', 'order':'order', 'common_line':'commonLine', 'validate':'validate'}
+NUMBERS = {'precision':int, 'feed':float, 'power':float}
+WARM = {'length':180, 'width':240, 'depth':50, 'div_l':2, 'div_w':2}  # box each worker makes first
+
+class HttpError(Exception):
+  # a request answered with status and a message; close ends the connection,
+  # for requests that cannot be read to the end
+  def __init__(self, status, message, close=False):
+    Exception.__init__(self, message)
+    self.status = status
+    self.close = close
+
+def _flag(name, value):
+  if value.lower() in ('1','true','yes','on'):
+    return True
+  if value.lower() in ('0','false','no','off'):
+    return False
+  raise HttpError(400, '%s must be 0 or 1, not %r' % (name, value))
+
+def outputOptions(query):
+  # (format, renderer options) from the query string of a /box request
+  format = 'svg'
+  options = {'validate':True}
+  for (name,value) in parse_qsl(query, keep_blank_values=True):
+    if name == 'format':
+      if value not in EXTENSIONS:
+        raise HttpError(400, 'format must be one of %s, not %r' % (', '.join(sorted(EXTENSIONS)), value))
+      format = value
+    elif name in FLAGS:
+      options[FLAGS[name]] = _flag(name, value)
+    elif name in NUMBERS:
+      try:
+        options[name] = NUMBERS[name](value)
+      except ValueError:
+        raise HttpError(400, '%s must be a number, not %r' % (name, value))
+    else:
+      raise HttpError(400, 'unknown output option %r' % name)
+  if format == 'svg':
+    for name in ('feed','power'):
+      options.pop(name, None)
+  else:
+    options.pop('compact', None)
+    if format == 'dxf':
+      for name in ('feed','power'):
+        options.pop(name, None)
+  return (format, options)
+
+
+_kernel = side  # edge kernel of this worker process
+
+def _start(vector):
+  # pool initializer: pick the kernel, then make one box so the first request
+  # finds every module imported and warm
+  global _kernel
+  if vector:
+    from .edges import sideVector as _kernel
+  _generate(WARM, 'svg', {'validate':True})
+
+def _ready():
+  return True
+
+def _generate(spec, format, options):
+  # pool worker: (text, [problem descriptions]) for spec, or (None, [errors])
+  # if the box rejects its settings
+  spec = dict(spec)
+  spec.pop('name', None)
+  options = dict(options)
+  problems = [] if options.pop('validate') else None
+  try:
+    if format == 'svg':
+      text = renderSvg(spec, _kernel, problems=problems, **options)
+    else:
+      text = renderMachine(spec, format, _kernel, problems=problems, **options)
+  except (BoxError,ValueError) as e:
+    return (None, [str(a) for a in e.args])
+  return (text, [describe(p) for p in problems or ()])
+
+
+class Metrics(object):
+  # request counts by status and a window of latencies per stage ('queue',
+  # 'generate' and 'total'), with running counts and sums
+  STAGES = ('queue','generate','total')
+
+  def __init__(self, window=WINDOW):
+    self.requests = collections.Counter()
+    self.latencies = dict([(stage, collections.deque(maxlen=window)) for stage in self.STAGES])
+    self.sums = dict([(stage, [0, 0.0]) for stage in self.STAGES])
+    self.peak = 0  # most requests queued at once
+    self.restarts = 0  # pools replaced after a worker died
+
+  def count(self, status):
+    self.requests[status] += 1
+
+  def observe(self, stage, seconds):
+    self.latencies[stage].append(seconds)
+    total = self.sums[stage]
+    total[0] += 1
+    total[1] += seconds
+
+  def queued(self, depth):
+    if depth > self.peak:
+      self.peak = depth
+
+  def quantiles(self, stage):
+    # [(q, seconds)] over the window, nearest rank; None for no requests yet
+    values = sorted(self.latencies[stage])
+    return [(q, values[min(len(values)-1, int(q*len(values)))] if values else None) for q in QUANTILES]
+
+  def data(self, depth, capacity, busy, workers):
+    # everything as plain dicts, ready for json
+    latency = {}
+    for stage in self.STAGES:
+      (count,seconds) = self.sums[stage]
+      latency[stage] = dict([('p%g' % (q*100), value) for (q,value) in self.quantiles(stage)],
+                            count=count, seconds=seconds, max=max(self.latencies[stage] or [None]))
+    return {'requests':dict([(str(k),v) for (k,v) in self.requests.items()]),
+            'queue':{'depth':depth, 'peak':self.peak, 'capacity':capacity},
+            'workers':{'busy':busy, 'count':workers, 'restarts':self.restarts}, 'latency':latency}
+
+  def prometheus(self, depth, capacity, busy, workers):
+    # Prometheus text exposition format
+    lines = []
+    def metric(name, kind, text, samples):
+      lines.append('# HELP tabbedbox_%s %s' % (name, text))
+      lines.append('# TYPE tabbedbox_%s %s' % (name, kind))
+      for (labels,value) in samples:
+        lines.append('tabbedbox_%s%s %s' % (name, labels, repr(value)))
+    metric('requests_total', 'counter', 'Requests answered, by status code.',
+           [('{code="%d"}' % k, v) for (k,v) in sorted(self.requests.items())])
+    samples = []
+    for stage in self.STAGES:
+      samples.extend([('{stage="%s",quantile="%g"}' % (stage, q), value) for (q,value) in self.quantiles(stage) if value is not None])
+      samples.append(('_sum{stage="%s"}' % stage, self.sums[stage][1]))
+      samples.append(('_count{stage="%s"}' % stage, self.sums[stage][0]))
+    lines.append('# HELP tabbedbox_request_seconds Seconds a box request spent queued, generating and in all.')
+    lines.append('# TYPE tabbedbox_request_seconds summary')
+    lines.extend(['tabbedbox_request_seconds%s %s' % (labels, repr(value)) for (labels,value) in samples])
+    metric('queue_depth', 'gauge', 'Requests waiting for a worker.', [('', depth)])
+    metric('queue_peak', 'gauge', 'Most requests waiting for a worker at once.', [('', self.peak)])
+    metric('queue_capacity', 'gauge', 'Requests that may wait before 503.', [('', capacity)])
+    metric('workers_busy', 'gauge', 'Workers generating a box.', [('', busy)])
+    metric('workers', 'gauge', 'Worker processes.', [('', workers)])
+    metric('pool_restarts_total', 'counter', 'Worker pools replaced after a worker died.', [('', self.restarts)])
+    return '\n'.join(lines)+'\n'
+
+
+class Service(object):
+  # the HTTP front end, request queue and worker pool
+  def __init__(self, jobs=None, queue=QUEUE, vector=False, window=WINDOW):
+    self.jobs = jobs or multiprocessing.cpu_count()
+    self.capacity = queue
+    self.vector = vector
+    self.metrics = Metrics(window)
+    self.busy = 0
+    self.pool = None
+
+  def _newPool(self):
+    return ProcessPoolExecutor(self.jobs, initializer=_start, initargs=(self.vector,))
+
+  def _restart(self):
+    # replace the broken pool, letting go of its threads and any live workers
+    (old,self.pool) = (self.pool,self._newPool())
+    if sys.version_info >= (3,9):
+      old.shutdown(wait=False, cancel_futures=True)
+    else:
+      old.shutdown(wait=False)
+    self.metrics.restarts += 1
+
+  async def start(self, host='127.0.0.1', port=PORT):
+    # start and warm up the workers, then listen; returns the asyncio server
+    loop = asyncio.get_running_loop()
+    self.pool = self._newPool()
+    # one call per worker at once makes the pool start every worker now
+    await asyncio.gather(*[loop.run_in_executor(self.pool, _ready) for i in range(self.jobs)])
+    self.queue = asyncio.Queue(self.capacity)
+    self.dispatchers = [loop.create_task(self._dispatch()) for i in range(self.jobs)]
+    self.server = await asyncio.start_server(self._connection, host, port)
+    return self.server
+
+  def address(self):  # (host, port) listened on
+    return self.server.sockets[0].getsockname()[:2]
+
+  async def close(self):
+    self.server.close()
+    await self.server.wait_closed()
+    for task in self.dispatchers:
+      task.cancel()
+    self.pool.shutdown()
+
+  async def _dispatch(self):
+    # take queued requests one at a time and generate them in the pool
+    loop = asyncio.get_running_loop()
+    while True:
+      (spec,format,options,future,queued) = await self.queue.get()
+      start = time.time()
+      self.metrics.observe('queue', start-queued)
+      self.busy += 1
+      pool = self.pool
+      try:
+        result = await loop.run_in_executor(pool, _generate, spec, format, options)
+      except BrokenProcessPool as e:  # a worker died; later requests get a new pool
+        if pool is self.pool:  # not replaced yet by another dispatcher
+          self._restart()
+        result = e
+      except Exception as e:
+        result = e
+      finally:
+        self.busy -= 1
+      self.metrics.observe('generate', time.time()-start)
+      if not future.done():
+        if isinstance(result, Exception):
+          future.set_exception(result)
+        else:
+          future.set_result(result)
+
+  async def box(self, spec, format, options):
+    # (text, problems) or (None, errors) for spec, generated by a worker;
+    # raises HttpError 503 if the queue is full
+    future = asyncio.get_running_loop().create_future()
+    try:
+      self.queue.put_nowait((spec, format, options, future, time.time()))
+    except asyncio.QueueFull:
+      raise HttpError(503, 'all %d workers busy and %d requests queued, retry later' % (self.jobs, self.capacity))
+    self.metrics.queued(self.queue.qsize())
+    return await future
+
+  async def _connection(self, reader, writer):
+    # answer the requests of one connection until either side closes it
+    try:
+      while True:
+        try:
+          request = await asyncio.wait_for(_readRequest(reader), IDLE)
+        except asyncio.TimeoutError:
+          break
+        except HttpError as e:
+          self.metrics.count(e.status)
+          writer.write(_errorResponse(e, True))
+          break
+        if request is None:
+          break
+        (method,target,version,headers,body) = request
+        close = headers.get('connection', '').lower() == 'close' or (
+          version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive')
+        writer.write(await self._respond(method, target, body, close))
+        await writer.drain()
+        if close:
+          break
+    except (ConnectionError,asyncio.IncompleteReadError):
+      pass
+    finally:
+      writer.close()
+
+  async def _respond(self, method, target, body, close):
+    # the bytes of the response to one request
+    (path,query) = urlsplit(target)[2:4]
+    try:
+      if path == '/box':
+        if method != 'POST':
+          raise HttpError(405, 'use POST for /box')
+        return await self._boxResponse(query, body, close)
+      if method != 'GET':
+        raise HttpError(405, 'use GET for %s' % path)
+      args = (self.queue.qsize(), self.capacity, self.busy, self.jobs)
+      if path == '/metrics':
+        return _response(200, self.metrics.prometheus(*args), 'text/plain; version=0.0.4', close=close)
+      if path == '/metrics.json':
+        return _response(200, json.dumps(self.metrics.data(*args), sort_keys=True), 'application/json', close=close)
+      if path == '/health':
+        return _response(200, 'ok\n', 'text/plain', close=close)
+      raise HttpError(404, 'no such path %r' % path)
+    except HttpError as e:
+      self.metrics.count(e.status)
+      return _errorResponse(e, close)
+
+  async def _boxResponse(self, query, body, close):
+    start = time.time()
+    (format,options) = outputOptions(query)
+    try:
+      spec = json.loads(body.decode('utf-8'))
+    except ValueError as e:
+      raise HttpError(400, 'body is not JSON: %s' % e)
+    if not isinstance(spec, dict):
+      raise HttpError(400, 'body must be a JSON object of box settings')
+    try:
+      (text,notes) = await self.box(spec, format, options)
+    except HttpError:
+      raise
+    except Exception as e:
+      raise HttpError(500, '%s: %s' % (type(e).__name__, e))
+    self.metrics.observe('total', time.time()-start)
+    if text is None:
+      raise HttpError(400, notes)
+    self.metrics.count(200)
+    name = outputName(0, {'name':spec.get('name') or 'box'})+EXTENSIONS[format]
+    headers = [('Content-Disposition', 'attachment; filename="%s"' % name), ('X-Geometry-Problems', str(len(notes)))]
+    return _response(200, text, CONTENT_TYPES[format], headers, close)
+
+
+async def _readRequest(reader):
+  # (method, target, version, headers, body) of the next request, or None at
+  # the end of the connection; header names are lower case
+  try:
+    line = await reader.readline()
+    if not line:
+      return None
+    words = line.decode('latin-1').split()
+    if len(words) != 3:
+      raise HttpError(400, 'bad request line', True)
+    headers = {}
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+      (name,colon,value) = line.decode('latin-1').partition(':')
+      headers[name.strip().lower()] = value.strip()
+  except ValueError:  # a line over the StreamReader limit
+    raise HttpError(431, 'request line or header too long', True)
+  if 'transfer-encoding' in headers:
+    raise HttpError(411, 'send a Content-Length', True)
+  try:
+    length = int(headers.get('content-length') or 0)
+  except ValueError:
+    raise HttpError(400, 'bad Content-Length', True)
+  if length > MAX_BODY:
+    raise HttpError(413, 'body over %d bytes' % MAX_BODY, True)
+  body = await reader.readexactly(length) if length else b''
+  return (words[0], words[1], words[2], headers, body)
+
+def _response(status, text, contentType, headers=(), close=False):
+  body = text.encode('utf-8')
+  lines = ['HTTP/1.1 %d %s' % (status, HTTPStatus(status).phrase),
+           'Content-Type: %s' % contentType, 'Content-Length: %d' % len(body)]
+  lines.extend(['%s: %s' % header for header in headers])
+  if close:
+    lines.append('Connection: close')
+  return ('\r\n'.join(lines)+'\r\n\r\n').encode('latin-1')+body
+
+def _errorResponse(error, close):
+  errors = error.args[0] if isinstance(error.args[0], list) else [error.args[0]]
+  headers = [('Retry-After', '1')] if error.status == 503 else []
+  return _response(error.status, json.dumps({'errors':errors}), 'application/json', headers, close or error.close)
+
+
+async def serve(service, host, port):
+  # run service until cancelled, or sent SIGTERM, then stop the workers
+  await service.start(host, port)
+  try:
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+  except NotImplementedError:  # Windows
+    pass
+  (host,port) = service.address()
+  sys.stdout.write('serving on http://%s:%d/ with %d workers\n' % (host, port, service.jobs))
+  sys.stdout.flush()
+  try:
+    await service.server.serve_forever()
+  finally:
+    await service.close()
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='tabbedbox.service', description='Serve tabbed boxes over HTTP')
+  parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+  parser.add_argument('--port', type=int, default=PORT, help='port to listen on, 0 for any free one (default: %d)' % PORT)
+  parser.add_argument('-j', '--jobs', type=int, default=0, help='worker processes (default: one per cpu)')
+  parser.add_argument('--queue', type=int, default=QUEUE, help='requests that may wait for a worker before 503 (default: %d)' % QUEUE)
+  parser.add_argument('--vector', action='store_true', help='use the NumPy edge kernel')
+  args = parser.parse_args(argv)
+  if args.queue < 1:
+    parser.error('--queue must be at least 1')
+  try:
+    asyncio.run(serve(Service(args.jobs, args.queue, args.vector), args.host, args.port))
+  except (KeyboardInterrupt,asyncio.CancelledError):
+    pass
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,336 @@
+'''
+Headless SVG output: a drawing sink that collects the box pieces and writes
+a standalone SVG document with millimetres as the user unit.
+
+Paths are held as their coordinate buffers and only written out, at the
+document's precision, when the document is serialized.
+
+SvgDocument writes every edge and hole as an element of its own, the way the
+extension draws them, but each hole pattern as one path of all its holes.
+CompactSvgDocument writes one compound path per part instead (holes then
+outline, relative commands, a shared CSS class), which makes for a much
+smaller file that loads faster.
+
+Both take placePart(name,like,(dx,dy)) from a memo.Instancer: a part that
+other parts are copies of goes into <defs> once and every occurrence of it
+is a <use> with a translate() transform.
+
+StreamingSvgDocument and StreamingCompactSvgDocument write each part to a
+file or socket as soon as it has been drawn, so memory use is bounded by one
+part rather than the whole document.
+'''
+from .core import PRECISION,number,trimZeros
+from .holes import Pattern
+
+HAIRLINE = 0.002*25.4     # 0.002in, as used for Epilog lasers
+LINETHICKNESS = 25.4/96   # one Inkscape px
+
+class Placement(object):
+  # a part drawn as a copy of an earlier part like, moved by offset
+  __slots__ = ('name','like','offset')
+
+  def __init__(self, name, like, offset):
+    self.name = name
+    self.like = like
+    self.offset = offset
+
+
+class SvgDocument(object):
+  # drawing sink collecting path and circle elements for one document; size
+  # fixes the document size in mm, otherwise it is fitted to the drawing
+  def __init__(self, hairline=0, margin=1.0, precision=PRECISION, size=None):
+    self.margin = margin
+    self.fixedSize = size
+    self.precision = precision
+    self.linethickness = HAIRLINE if hairline else LINETHICKNESS
+    self.style = 'stroke:#000000;stroke-width:%s;fill:none' % number(self.linethickness, 6)
+    self.parts = []       # (name, elements) in drawing order, or Placements
+    self.part = None
+    self.extents = {}     # part name -> (maxX, maxY)
+    self.used = set()     # names of the parts that others are copies of
+    self.maxX = self.maxY = 0.0
+    self.extent = (0.0, 0.0)
+
+  def _extend(self, x, y):
+    if x>self.maxX: self.maxX=x
+    if y>self.maxY: self.maxY=y
+    (px,py) = self.extent
+    self.extent = (max(px,x), max(py,y))
+
+  def beginPart(self, name):
+    self.part = self.newPart(name)
+    self.parts.append(self.part)
+    self.extent = (0.0, 0.0)
+
+  def newPart(self, name):  # elements are Paths, (r,cx,cy) circles and holes.Patterns
+    return (name, [])
+
+  def endPart(self):
+    self.extents[self.part[0]] = self.extent
+    self.part = None
+
+  def placePart(self, name, like, offset):  # part name is part like moved by offset
+    (dx,dy) = offset
+    (px,py) = self.extents[like]
+    if px+dx>self.maxX: self.maxX=px+dx
+    if py+dy>self.maxY: self.maxY=py+dy
+    self.used.add(like)
+    self.parts.append(Placement(name, like, offset))
+
+  def drawS(self, path):  # Draw lines from a list
+    self._extend(max(path.coords[0::2]), max(path.coords[1::2]))
+    self.part[1].append(path)
+
+  drawHole = drawS
+
+  def drawCircle(self, r, centre):
+    (cx,cy) = centre
+    self._extend(cx+r, cy+r)
+    self.part[1].append((r,cx,cy))
+
+  def drawPattern(self, pattern):
+    if len(pattern):
+      self._extend(*pattern.extent())
+      self.part[1].append(pattern)
+
+  def size(self):  # document size in mm, leaving the part spacing as margin right and below
+    if self.fixedSize:
+      return self.fixedSize
+    return (self.maxX+self.margin, self.maxY+self.margin)
+
+  def partLines(self, part):  # every edge and hole is an element of its own
+    p = self.precision
+    path = '<path style="%s" inkscape:label="part" d="%%s"/>' % self.style
+    circle = '<circle style="%s" cx="%%s" cy="%%s" r="%%s"/>' % self.style
+    holes = '<path style="%s" inkscape:label="holes" d="%%s"/>' % self.style
+    for e in part[1]:
+      if isinstance(e, tuple):
+        (r,cx,cy) = e
+        yield circle % (number(cx,p), number(cy,p), number(r,p))
+      elif isinstance(e, Pattern):
+        yield holes % e.d(6 if p is None else p)
+      else:
+        yield path % e.d(p)
+
+  def definition(self, part):  # a part copied elsewhere, for <defs>
+    return '<g id="%s">\n%s\n</g>' % (part[0], '\n'.join(self.partLines(part)))
+
+  def use(self, like, offset=None):
+    if offset is None:
+      return '<use xlink:href="#%s"/>' % like
+    return '<use xlink:href="#%s" transform="translate(%s,%s)"/>' % (
+      like, number(offset[0], self.precision), number(offset[1], self.precision))
+
+  def lines(self):
+    # the serialized elements, one per line; parts that are copied elsewhere
+    # are placed with <use> like their copies
+    for part in self.parts:
+      if isinstance(part, Placement):
+        yield self.use(part.like, part.offset)
+      elif part[0] in self.used:
+        yield self.use(part[0])
+      else:
+        for line in self.partLines(part):
+          yield line
+
+  def defs(self):
+    if not self.used:
+      return ''
+    return '<defs>\n%s\n</defs>\n' % '\n'.join(
+      [self.definition(part) for part in self.parts if not isinstance(part, Placement) and part[0] in self.used])
+
+  def sizeAttributes(self, size):
+    (w,h) = [number(v, self.precision) for v in size]
+    return 'width="%smm" height="%smm" viewBox="0 0 %s %s"' % (w, h, w, h)
+
+  def header(self, sizeAttributes, xlink=False):
+    # everything up to the first element
+    return ''.join([
+      '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n',
+      '<svg xmlns="http://www.w3.org/2000/svg" ',
+      'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" ',
+      'xmlns:xlink="http://www.w3.org/1999/xlink" ' if xlink else '',
+      sizeAttributes,
+      '>\n',
+      self.defs(),
+      '<g inkscape:label="newlayer" inkscape:groupmode="layer">\n'])
+
+  def tostring(self):
+    return ''.join([self.header(self.sizeAttributes(self.size()), self.used),
+      '\n'.join(self.lines()),
+      '\n</g>\n</svg>\n'])
+
+  def write(self, path):
+    f = open(path, 'w')
+    try:
+      f.write(self.tostring())
+    finally:
+      f.close()
+
+
+class CompactSvgDocument(SvgDocument):
+  # drawing sink writing one closed compound path per part
+
+  def newPart(self, name):
+    return (name, [], [])  # name, outline edges, holes
+
+  def drawS(self, path):
+    self._extend(max(path.coords[0::2]), max(path.coords[1::2]))
+    self.part[1].append(path)
+
+  def drawHole(self, path):
+    self.part[2].append(path)
+
+  def drawCircle(self, r, centre):
+    (cx,cy) = centre
+    self._extend(cx+r, cy+r)
+    self.part[2].append((r,cx,cy))
+
+  def drawPattern(self, pattern):
+    if len(pattern):
+      self._extend(*pattern.extent())
+      self.part[2].append(pattern)
+
+  def defs(self):
+    return '<defs><style type="text/css">.cut{%s;fill-rule:evenodd}</style>%s</defs>\n' % (self.style,
+      ''.join(['\n'+self.definition(part) for part in self.parts if not isinstance(part, Placement) and part[0] in self.used]))
+
+  def definition(self, part):
+    return self.partLines(part)[0]
+
+  def partLines(self, part):
+    (name,outline,holes) = part
+    precision = 6 if self.precision is None else self.precision
+    return ['<path id="%s" class="cut" d="%s"/>' % (name, compoundPath(outline, holes, precision))]
+
+
+def compoundPath(outline, holes, precision=PRECISION):
+  # path data for a part: its holes, then its outline joined up from the edges,
+  # so that a cutter going through the subpaths in order does not cut the part
+  # free before its holes. Coordinates are rounded to whole steps of the
+  # precision before taking the relative moves, so those add up exactly
+  # instead of drifting. A hole Pattern among the holes is written as its own
+  # path data, absolute moves and all
+  scale = 10**precision
+  f = '%%.%df' % precision
+  cmds = []
+  nums = []
+  cur = (0,0)
+  for hole in holes:
+    if isinstance(hole, tuple):
+      (r,cx,cy) = [int(round(v*scale)) for v in hole]
+      cmds.append(' m'+f+','+f+' a'+f+','+f+' 0 1 0 '+f+',0 a'+f+','+f+' 0 1 0 '+f+',0 z')
+      nums.extend((cx+r-cur[0], cy-cur[1], r, r, -2*r, r, r, 2*r))
+      cur = (cx+r, cy)
+    elif isinstance(hole, Pattern):
+      if len(hole):
+        cmds.append(' '+hole.d(precision))
+        # carry on from the start of its last hole, as written
+        cur = tuple([int(round(float(f % v)*scale)) for v in hole.start(len(hole)-1)])
+    else:
+      cur = _polyline(cmds, nums, [int(round(v*scale)) for v in hole.coords], cur, f)
+  run = []
+  for path in outline:
+    pts = [int(round(v*scale)) for v in path.coords]
+    if run and abs(pts[0]-run[-2])<=1 and abs(pts[1]-run[-1])<=1: # edges meet
+      run.extend(pts[2:])
+    else:
+      if run:
+        cur = _polyline(cmds, nums, run, cur, f)
+      run = pts
+  if run:
+    cur = _polyline(cmds, nums, run, cur, f)
+  d = ''.join(cmds) % tuple([n/float(scale) for n in nums])
+  return trimZeros(d).lstrip()
+
+def _polyline(cmds, nums, pts, cur, f):
+  # relative commands for integer points pts (flat x,y list) starting from the
+  # current point cur, closed with z if it ends where it started; runs of moves
+  # in the same direction along an axis are merged. Returns the new current point
+  closed = len(pts)>4 and abs(pts[0]-pts[-2])<=1 and abs(pts[1]-pts[-1])<=1
+  if closed:
+    pts = pts[:-2]
+  (x,y) = (pts[0],pts[1])
+  cmds.append(' m'+f+','+f)
+  nums.extend((x-cur[0], y-cur[1]))
+  (rx,ry) = (0,0) # pending run
+  for i in range(2, len(pts), 2):
+    (dx,dy) = (pts[i]-x, pts[i+1]-y)
+    (x,y) = (pts[i],pts[i+1])
+    if not (dx or dy):
+      continue
+    if (not dy and not ry and rx and (dx>0)==(rx>0)) or (not dx and not rx and ry and (dy>0)==(ry>0)):
+      (rx,ry) = (rx+dx,ry+dy)
+      continue
+    _move(cmds, nums, rx, ry, f)
+    (rx,ry) = (dx,dy)
+  _move(cmds, nums, rx, ry, f)
+  if closed:
+    cmds.append(' z')
+    return (pts[0],pts[1])
+  return (x,y)
+
+def _move(cmds, nums, dx, dy, f):
+  if not dy:
+    if dx:
+      cmds.append(' h'+f)
+      nums.append(dx)
+  elif not dx:
+    cmds.append(' v'+f)
+    nums.append(dy)
+  else:
+    cmds.append(' l'+f+','+f)
+    nums.extend((dx,dy))
+
+
+class StreamingSvgDocument(SvgDocument):
+  # SvgDocument writing each part to out, a file or socket file object, as
+  # soon as it is finished and then dropping it, so only the part being drawn
+  # is held in memory.
+  #
+  # The document size is only known at the end: it is written into a blank
+  # stretch of the header by close() if out can seek, otherwise it has to be
+  # given up front.
+  SIZE_FIELD = 120  # characters kept for the size attributes
+
+  def __init__(self, out, hairline=0, margin=1.0, precision=PRECISION, size=None):
+    SvgDocument.__init__(self, hairline, margin, precision, size)
+    self.out = out
+    self.sizeAt = None
+    xlink = self.placePart is not None
+    if size:
+      out.write(self.header(self.sizeAttributes(size), xlink))
+      return
+    (before,after) = self.header('\0', xlink).split('\0')
+    out.write(before)
+    try:
+      self.sizeAt = out.tell()
+    except (AttributeError,IOError,OSError):
+      raise ValueError('document size needed for streaming to an output that cannot seek')
+    out.write(' '*self.SIZE_FIELD+after)
+
+  def endPart(self):
+    SvgDocument.endPart(self)
+    self.out.write(''.join([line+'\n' for line in self.partLines(self.parts.pop())]))
+
+  placePart = None  # the elements of a part carry no id for a <use> to refer to
+
+  def close(self):
+    # finish the document, filling in its size; out is left open
+    out = self.out
+    out.write('</g>\n</svg>\n')
+    if self.sizeAt is not None:
+      end = out.tell()
+      out.seek(self.sizeAt)
+      out.write(self.sizeAttributes(self.size()).ljust(self.SIZE_FIELD))
+      out.seek(end)
+    out.flush()
+
+
+class StreamingCompactSvgDocument(StreamingSvgDocument, CompactSvgDocument):
+  # CompactSvgDocument written part by part; a repeated part is a <use> of the
+  # first path drawn with it rather than of a copy in <defs>
+  def placePart(self, name, like, offset):
+    SvgDocument.placePart(self, name, like, offset)
+    part = self.parts.pop()
+    self.out.write(self.use(part.like, part.offset)+'\n')
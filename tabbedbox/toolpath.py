@@ -0,0 +1,257 @@
+'''
+Toolpath ordering: a sink that collects the parts drawn into it and draws
+them on into another sink in an order that is quicker to cut.
+
+Within a part, the holes and circles are cut first, nearest one next, and
+the outline last, joined up into a single closed contour, so that a part
+never drops out before its holes are cut. A hole pattern (holes.Pattern) is
+kept whole and cut as one unit, its holes put in nearest first order from
+where the head comes in, so its sink can still draw it as one element.
+Closed contours start at the vertex closest to where the head is. The parts
+are visited nearest neighbour first from the start point, then the tour is
+improved with 2-opt passes.
+
+Travel is the straight distance the head moves between the end of one cut
+and the start of the next, from the start point, for the order the parts
+were drawn in and for the new order.
+
+usage: tp = Toolpath(); generate(box, tp); tp.draw(doc); print(tp.summary())
+'''
+import math
+from array import array
+
+from .core import Path
+from .holes import Pattern,drawPatterns
+
+TWO_OPT_PASSES = 8    # upper bound on 2-opt passes over the part tour
+GRID_MIN = 32         # below this many points a nearest search is brute force
+
+def _dist(a, b):
+  return math.hypot(a[0]-b[0], a[1]-b[1])
+
+def nearestOrder(points, start):
+  # order to visit points (list of (x,y)) in, always going to the nearest one
+  # left, found through a uniform grid of buckets
+  n = len(points)
+  if n <= GRID_MIN:
+    return _bruteOrder(points, start)
+  xs = [p[0] for p in points]
+  ys = [p[1] for p in points]
+  (x0,y0) = (min(xs),min(ys))
+  cell = max(max(xs)-x0, max(ys)-y0)/math.sqrt(n) or 1.0
+  grid = {}
+  for (i,(x,y)) in enumerate(points):
+    grid.setdefault((int((x-x0)/cell),int((y-y0)/cell)), []).append(i)
+  span = int(max(max(xs)-x0, max(ys)-y0)/cell)+1
+  left = n
+  order = []
+  p = start
+  while left:
+    if left <= GRID_MIN:  # few left, the rings would mostly be empty
+      rest = [i for bucket in grid.values() for i in bucket]
+      order.extend([rest[i] for i in _bruteOrder([points[i] for i in rest], p)])
+      break
+    (ci,cj) = (int((p[0]-x0)//cell), int((p[1]-y0)//cell))
+    best = None
+    r = 0
+    while True:
+      for i in range(ci-r, ci+r+1):
+        for j in range(cj-r, cj+r+1):
+          if r and abs(i-ci)!=r and abs(j-cj)!=r:  # ring r only
+            continue
+          for k in grid.get((i,j), ()):
+            d = _dist(p, points[k])
+            if best is None or d < best[0]:
+              best = (d, k)
+      # anything outside ring r is at least r cells away
+      if best is not None and (best[0] <= r*cell or r > span+abs(ci)+abs(cj)):
+        break
+      r += 1
+    k = best[1]
+    key = (int((points[k][0]-x0)/cell),int((points[k][1]-y0)/cell))
+    grid[key].remove(k)
+    if not grid[key]:
+      del grid[key]
+    order.append(k)
+    p = points[k]
+    left -= 1
+  return order
+
+def _bruteOrder(points, start):
+  left = list(range(len(points)))
+  order = []
+  p = start
+  while left:
+    k = min(left, key=lambda i: _dist(p, points[i]))
+    left.remove(k)
+    order.append(k)
+    p = points[k]
+  return order
+
+def twoOpt(points, order, start, passes=TWO_OPT_PASSES):
+  # improve an open tour from start through points in order by reversing
+  # stretches of it while that shortens it; returns the new order
+  tour = [start]+[points[i] for i in order]
+  order = list(order)
+  n = len(tour)
+  for sweep in range(passes):
+    improved = False
+    for i in range(1, n-1):
+      a = tour[i-1]
+      b = tour[i]
+      ab = _dist(a, b)
+      for j in range(i+1, n):
+        c = tour[j]
+        d = tour[j+1] if j+1 < n else None
+        before = ab+(_dist(c, d) if d else 0.0)
+        after = _dist(a, c)+(_dist(b, d) if d else 0.0)
+        if after < before-1e-9:
+          tour[i:j+1] = tour[i:j+1][::-1]
+          order[i-1:j] = order[i-1:j][::-1]
+          b = tour[i]
+          ab = _dist(a, b)
+          improved = True
+    if not improved:
+      break
+  return order
+
+def joinRuns(paths):
+  # coordinate lists for paths joined where one ends at the start of the next
+  runs = []
+  for coords in paths:
+    if runs and abs(coords[0]-runs[-1][-2]) < 1e-6 and abs(coords[1]-runs[-1][-1]) < 1e-6:
+      runs[-1].extend(coords[2:])
+    else:
+      runs.append(array('d', coords))
+  return runs
+
+def _entry(hole):
+  # where the cut of a hole, circle (r,cx,cy) or pattern starts
+  if isinstance(hole, tuple):
+    return (hole[1]+hole[0],hole[2])
+  if isinstance(hole, Pattern):
+    return hole.start(0)
+  return (hole[0],hole[1])
+
+def closed(coords):
+  return len(coords) > 4 and abs(coords[0]-coords[-2]) < 1e-6 and abs(coords[1]-coords[-1]) < 1e-6
+
+def startNearest(coords, p):
+  # closed contour coords rotated to start at the vertex nearest p
+  pts = coords[:-2]
+  k = min(range(0, len(pts), 2), key=lambda i: (pts[i]-p[0])**2+(pts[i+1]-p[1])**2)
+  if not k:
+    return coords
+  return pts[k:]+pts[:k]+pts[k:k+2]
+
+
+class Toolpath(object):
+  # sink collecting parts, drawn on into another sink in cutting order
+  def __init__(self, start=(0.0,0.0), passes=TWO_OPT_PASSES):
+    self.start = start
+    self.passes = passes
+    self.parts = []     # [name, outline edge coords, holes] in drawing order
+    self.drawn = []     # (start, end) of every cut in drawing order
+    self.plan = None
+    self.travelBefore = self.travelAfter = 0.0
+
+  def beginPart(self, name):
+    self.part = [name, [], []]
+    self.parts.append(self.part)
+    self.plan = None
+
+  def endPart(self):
+    pass
+
+  def drawS(self, path):
+    c = path.coords
+    self.part[1].append(c)
+    self.drawn.append(((c[0],c[1]), (c[-2],c[-1])))
+
+  def drawHole(self, path):
+    c = path.coords
+    self.part[2].append(c)
+    self.drawn.append(((c[0],c[1]), (c[-2],c[-1])))
+
+  def drawCircle(self, r, centre):
+    (cx,cy) = centre
+    self.part[2].append((r,cx,cy))
+    self.drawn.append(((cx+r,cy),)*2)  # circles start and end on the right
+
+  def drawPattern(self, pattern):
+    self.part[2].append(pattern)
+    self.drawn.extend([(pattern.start(i),)*2 for i in range(len(pattern))])
+
+  def order(self):
+    # work out the cutting order: [(name, [holes], [outline runs])]
+    p = self.start
+    travel = 0.0
+    for (a,b) in self.drawn:
+      travel += _dist(p, a)
+      p = b
+    self.travelBefore = travel
+
+    centres = []
+    for (name,outline,holes) in self.parts:
+      xs = [v for c in outline for v in c[0::2]]
+      ys = [v for c in outline for v in c[1::2]]
+      centres.append(((min(xs)+max(xs))/2, (min(ys)+max(ys))/2) if xs else self.start)
+    tour = twoOpt(centres, nearestOrder(centres, self.start), self.start, self.passes)
+
+    plan = []
+    p = self.start
+    travel = 0.0
+    for k in tour:
+      (name,outline,holes) = self.parts[k]
+      cuts = []
+      for i in nearestOrder([_entry(h) for h in holes], p):
+        h = holes[i]
+        if isinstance(h, Pattern):  # each hole starts and ends at start()
+          starts = [h.start(j) for j in range(len(h))]
+          inner = nearestOrder(starts, p)
+          for j in inner:
+            travel += _dist(p, starts[j])
+            p = starts[j]
+          cuts.append(h.reordered(inner))
+          continue
+        if not isinstance(h, tuple) and closed(h):
+          h = startNearest(h, p)
+        a = _entry(h)
+        travel += _dist(p, a)
+        p = a if isinstance(h, tuple) else (h[-2],h[-1])
+        cuts.append(h)
+      runs = []
+      for run in joinRuns(outline):
+        if closed(run):
+          run = startNearest(run, p)
+        travel += _dist(p, (run[0],run[1]))
+        p = (run[-2],run[-1])
+        runs.append(run)
+      plan.append((name, cuts, runs))
+    self.plan = plan
+    self.travelAfter = travel
+    return plan
+
+  def draw(self, sink):
+    # draw the parts into sink in cutting order
+    if self.plan is None:
+      self.order()
+    for (name,holes,runs) in self.plan:
+      sink.beginPart(name)
+      for h in holes:
+        if isinstance(h, tuple):
+          (r,cx,cy) = h
+          sink.drawCircle(r, (cx,cy))
+        elif isinstance(h, Pattern):
+          drawPatterns(sink, [h])
+        else:
+          sink.drawHole(Path(h))
+      for run in runs:
+        sink.drawS(Path(run))
+      sink.endPart()
+
+  def summary(self):
+    if self.plan is None:
+      self.order()
+    saved = 100.0*(1-self.travelAfter/self.travelBefore) if self.travelBefore else 0.0
+    return 'travel %.0f mm before, %.0f mm after (%.0f%% less)' % (self.travelBefore, self.travelAfter, saved)
@@ -0,0 +1,211 @@
+'''
+Instrumentation: timing spans and per-part counters for a generation run,
+written out as JSON or as Prometheus text.
+
+A Recorder only sees what is routed through it: kernel(side) gives an edge
+kernel timing every call, sink(doc) a sink proxy counting the segments,
+holes, circles and elements each part is drawn with and timing each part
+from beginPart() to endPart(), and span(name) times any other stage in a
+with block. Nothing is wrapped when no Recorder is used, so a run without
+one costs the same as before.
+
+Spans used by the generators: options (parsing and checking the settings),
+generate (all of generation, including any ordering or common-line stage),
+side (each edge kernel call that computes an edge) and serialize (turning
+the document into text or writing it out).
+
+usage: rec = Recorder(); generate(box, rec.sink(doc), rec.kernel(side)); rec.write('trace.json')
+'''
+import json,os,time
+
+clock = getattr(time, 'perf_counter', time.time)
+
+COUNTERS = ('segments','holes','circles','elements','placed')
+TRACE_ENV = 'TABBEDBOX_TRACE'  # file the extension writes its trace to, if set
+
+class _Span(object):
+  # with block adding its duration to a span of a Recorder
+  __slots__ = ('recorder','name','start')
+
+  def __init__(self, recorder, name):
+    self.recorder = recorder
+    self.name = name
+
+  def __enter__(self):
+    self.start = clock()
+    return self
+
+  def __exit__(self, *exc):
+    self.recorder.add(self.name, clock()-self.start)
+    return False
+
+
+class _NoSpan(object):
+  # with block doing nothing, for code that only sometimes has a Recorder
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+NOSPAN = _NoSpan()
+
+
+class Recorder(object):
+  # spans: name -> [calls, seconds, longest]; parts: name -> {counter: value},
+  # with the seconds spent on the part under 'seconds'
+  def __init__(self):
+    self.spans = {}
+    self.parts = {}
+
+  def span(self, name):
+    return _Span(self, name)
+
+  def add(self, name, seconds, calls=1):
+    span = self.spans.get(name)
+    if span is None:
+      span = self.spans[name] = [0, 0.0, 0.0]
+    span[0] += calls
+    span[1] += seconds
+    if seconds > span[2]:
+      span[2] = seconds
+
+  def part(self, name):
+    counts = self.parts.get(name)
+    if counts is None:
+      counts = self.parts[name] = dict([(c,0) for c in COUNTERS], seconds=0.0)
+    return counts
+
+  def kernel(self, side):
+    # side wrapped to time every call under the span 'side'
+    add = self.add
+    def traced(*args):
+      start = clock()
+      path = side(*args)
+      add('side', clock()-start)
+      return path
+    return traced
+
+  def sink(self, sink):
+    return TracingSink(sink, self)
+
+  def merge(self, data):
+    # add the spans and parts of data(), from another Recorder, to these
+    for (name,span) in data['spans'].items():
+      mine = self.spans.setdefault(name, [0, 0.0, 0.0])
+      mine[0] += span['calls']
+      mine[1] += span['seconds']
+      mine[2] = max(mine[2], span['max'])
+    for (name,counts) in data['parts'].items():
+      mine = self.part(name)
+      for (key,value) in counts.items():
+        mine[key] = mine.get(key, 0)+value
+
+  def totals(self):
+    totals = dict([(c,0) for c in COUNTERS], seconds=0.0)
+    for counts in self.parts.values():
+      for (key,value) in counts.items():
+        totals[key] += value
+    return totals
+
+  def data(self):
+    # everything recorded as plain dicts, ready for json
+    spans = dict([(name, {'calls':calls, 'seconds':seconds, 'max':longest})
+                  for (name,(calls,seconds,longest)) in self.spans.items()])
+    return {'spans':spans, 'parts':self.parts, 'totals':self.totals()}
+
+  def json(self):
+    return json.dumps(self.data(), indent=1, sort_keys=True)
+
+  def prometheus(self):
+    # Prometheus text exposition format
+    lines = []
+    def metric(name, kind, text, samples):
+      lines.append('# HELP tabbedbox_%s %s' % (name, text))
+      lines.append('# TYPE tabbedbox_%s %s' % (name, kind))
+      for (label,key,value) in samples:
+        lines.append('tabbedbox_%s{%s="%s"} %s' % (name, label, _escape(key), repr(value)))
+    spans = sorted(self.spans.items())
+    metric('span_calls_total', 'counter', 'Times each span was entered.', [('span',n,s[0]) for (n,s) in spans])
+    metric('span_seconds_total', 'counter', 'Seconds spent in each span.', [('span',n,s[1]) for (n,s) in spans])
+    metric('span_max_seconds', 'gauge', 'Longest single time in each span.', [('span',n,s[2]) for (n,s) in spans])
+    parts = sorted(self.parts.items())
+    for c in COUNTERS+('seconds',):
+      metric('part_%s_total' % c, 'counter', 'Part %s, per part name.' % c, [('part',n,counts[c]) for (n,counts) in parts])
+    return '\n'.join(lines)+'\n'
+
+  def write(self, path):
+    # write to path, as JSON for a .json file and Prometheus text otherwise
+    text = self.json()+'\n' if path.lower().endswith('.json') else self.prometheus()
+    f = open(path, 'w')
+    try:
+      f.write(text)
+    finally:
+      f.close()
+
+def _escape(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def fromEnvironment():
+  # (Recorder, path) if $TABBEDBOX_TRACE names a file, else (None, None)
+  path = os.environ.get(TRACE_ENV)
+  return (Recorder(), path) if path else (None, None)
+
+
+class TracingSink(object):
+  # sink proxy counting what each part is drawn with and timing each part
+  def __init__(self, sink, recorder):
+    self.sink = sink
+    self.recorder = recorder
+    self.counts = None
+    # only offer placePart() if the sink takes it, see memo.Instancer
+    self.placePart = self._placePart if getattr(sink, 'placePart', None) is not None else None
+    # and drawPattern(), so that the holes of a pattern are counted one by one
+    # when the sink draws them that way
+    self.drawPattern = self._drawPattern if getattr(sink, 'drawPattern', None) is not None else None
+
+  def beginPart(self, name):
+    self.counts = self.recorder.part(name)
+    self.start = clock()
+    self.sink.beginPart(name)
+
+  def endPart(self):
+    self.sink.endPart()
+    self.counts['seconds'] += clock()-self.start
+
+  def drawS(self, path):
+    counts = self.counts
+    counts['segments'] += len(path)-1
+    counts['elements'] += 1
+    self.sink.drawS(path)
+
+  def drawHole(self, path):
+    counts = self.counts
+    counts['segments'] += len(path)-1
+    counts['holes'] += 1
+    counts['elements'] += 1
+    self.sink.drawHole(path)
+
+  def drawCircle(self, r, centre):
+    counts = self.counts
+    counts['circles'] += 1
+    counts['elements'] += 1
+    self.sink.drawCircle(r, centre)
+
+  def _drawPattern(self, pattern):
+    counts = self.counts
+    if pattern.circular:
+      counts['circles'] += len(pattern)
+    else:
+      # as many segments as drawHole() counts for each hole drawn singly
+      each = len(pattern.outline(pattern.xs[0], pattern.ys[0]))//2-1 if len(pattern) else 0
+      counts['segments'] += len(pattern)*each
+      counts['holes'] += len(pattern)
+    counts['elements'] += 1
+    self.sink.drawPattern(pattern)
+
+  def _placePart(self, name, like, offset):
+    counts = self.recorder.part(name)
+    counts['placed'] += 1
+    counts['elements'] += 1
+    self.sink.placePart(name, like, offset)
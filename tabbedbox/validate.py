@@ -0,0 +1,469 @@
+'''
+Geometric validity check of a generated box, run on the parts as the model
+has them (see model.py), every coordinate a whole number of microns, so the
+tests are exact.
+
+The settings checks of Box are rough rules of thumb, so some combinations of
+box type, divider count and keying they let through still draw slots that
+run into each other, holes that cross themselves or parts laid out on top
+of each other. validateBox(box) draws the box and reports
+- 'self-intersection': a contour touching or crossing itself,
+- 'hole crosses outline': a hole crossing its part's outline, or running
+  along it from outside the part,
+- 'hole outside outline': a hole lying wholly outside its part,
+- 'holes overlap': two holes of a part crossing, or running along each
+  other from the same side,
+- 'parts overlap': two parts crossing, running along each other from the
+  same side, or one lying inside the other.
+Holes and parts that only touch are fine: a divider slot may open onto the
+notch next to it, and parts laid out with spacing 0 share their edges. A
+hole that reaches the edge of its part's bounding box is a slot cut in from
+the edge, like the slots that let dividers cross, so it may cross the
+outline.
+
+The segments are checked in a sweep along x. Horizontal segments are kept
+in a list sorted by y while the sweep is within them, so each vertical
+segment finds the horizontal ones it meets by bisection; collinear segments
+are matched per line, and the segments at other angles (slot ends) and the
+round holes, kept in a list sorted by their lowest y, are checked exactly
+against whatever their bounding box meets. A point is found inside or
+outside the outline by bisection too, among the segments crossing its
+height sorted left to right. That is O(n log n) in the segments plus the
+contacts found, as long as the slot ends and round holes are small
+against the box. Parts of
+the same shape share their geometry, so each shape is checked once, and
+only the outlines of parts whose bounding boxes overlap are swept together.
+
+ValidatingSink(sink) passes everything drawn on to sink and keeps the parts,
+so a box can be checked as it is written out without drawing it twice.
+
+usage: for problem in validateBox(box): print(describe(problem))
+'''
+from bisect import bisect_left,bisect_right,insort
+
+from .core import side
+from .model import SCALE,Contour,PartCollector,collectParts,microns
+
+OUTLINE, HOLE = 0, 1
+TOUCH, ALONG, CROSS = 0, 1, 2   # how two segments meet: at a point, along a stretch, crossing
+
+class _Segments(object):
+  # segments in microns, one per index in the parallel lists, with the
+  # contours and parts they belong to
+  def __init__(self):
+    (self.x0,self.y0,self.x1,self.y1) = ([], [], [], [])
+    self.contour = []   # segment -> contour index
+    self.next = []      # segment -> the segment after it in its contour, or -1
+    self.start = []     # contour -> index of its first segment
+    self.count = []     # contour -> number of segments
+    self.turn = []      # contour -> 1 if counterclockwise (y up), -1 if not, 0 if open
+    self.role = []      # contour -> OUTLINE or HOLE
+    self.part = []      # contour -> part index
+    self.circles = []   # (r,cx,cy,part index)
+
+  def add(self, edge, ox, oy, role, p):
+    # an Edge or Contour moved by ox,oy, dropping zero length segments
+    c = edge.coords
+    (xs,ys) = (c[0::2], c[1::2])
+    closed = isinstance(edge, Contour)
+    if closed:
+      xs.append(xs[0])
+      ys.append(ys[0])
+    if ox or oy:
+      xs = [v+ox for v in xs]
+      ys = [v+oy for v in ys]
+    segments = [seg for seg in zip(xs, ys, xs[1:], ys[1:]) if seg[0] != seg[2] or seg[1] != seg[3]]
+    index = len(self.start)
+    first = len(self.x0)
+    k = first+len(segments)
+    if segments:
+      (x0,y0,x1,y1) = zip(*segments)
+      self.x0.extend(x0); self.y0.extend(y0)
+      self.x1.extend(x1); self.y1.extend(y1)
+      self.contour.extend([index]*len(segments))
+      self.next.extend(range(first+1, k))
+      self.next.append(first if closed and len(segments) > 2 else -1)
+    self.start.append(first)
+    self.count.append(k-first)
+    area = closed and edge.area2()
+    self.turn.append((area > 0)-(area < 0))
+    self.role.append(role)
+    self.part.append(p)
+
+  def addPart(self, part, p, ox, oy, holes=True):
+    for edge in part.outline:
+      self.add(edge, ox, oy, OUTLINE, p)
+    if holes:
+      for edge in part.holes:
+        self.add(edge, ox, oy, HOLE, p)
+      c = part.circles
+      for i in range(0, len(c), 3):
+        self.circles.append((c[i], c[i+1]+ox, c[i+2]+oy, p))
+
+  def sameSide(self, a, b):
+    # whether the insides of the contours of segments a and b, running along
+    # each other, are on the same side; None if either contour is open
+    (ta,tb) = (self.turn[self.contour[a]], self.turn[self.contour[b]])
+    if not (ta and tb):
+      return None
+    # inside is to the left of a counterclockwise contour
+    dot = (self.x1[a]-self.x0[a])*(self.x1[b]-self.x0[b])+(self.y1[a]-self.y0[a])*(self.y1[b]-self.y0[b])
+    return dot*ta*tb > 0
+
+  def outlines(self):  # {part index: [closed outline contours]}
+    found = {}
+    for c in range(len(self.start)):
+      if self.role[c] == OUTLINE and self.turn[c]:
+        found.setdefault(self.part[c], []).append(c)
+    return found
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+  v = (bx-ax)*(cy-ay)-(by-ay)*(cx-ax)
+  return (v > 0)-(v < 0)
+
+def _within(ax, ay, bx, by, cx, cy):
+  # whether c, collinear with ab, lies on it
+  return min(ax,bx) <= cx <= max(ax,bx) and min(ay,by) <= cy <= max(ay,by)
+
+def _meet(ax, ay, bx, by, cx, cy, dx, dy):
+  # how segments ab and cd meet, TOUCH, ALONG or CROSS (at a point inside
+  # both), or None if they do not
+  o1 = _orient(ax, ay, bx, by, cx, cy)
+  o2 = _orient(ax, ay, bx, by, dx, dy)
+  o3 = _orient(cx, cy, dx, dy, ax, ay)
+  o4 = _orient(cx, cy, dx, dy, bx, by)
+  if o1*o2 < 0 and o3*o4 < 0:
+    return CROSS
+  if o1 == o2 == 0:
+    # collinear: along a stretch if their extents overlap by more than a point
+    (lo,hi) = ((ax,bx), (cx,dx)) if ax != bx else ((ay,by), (cy,dy))
+    overlap = min(max(lo), max(hi))-max(min(lo), min(hi))
+    return None if overlap < 0 else ALONG if overlap > 0 else TOUCH
+  if ((o1 == 0 and _within(ax, ay, bx, by, cx, cy)) or (o2 == 0 and _within(ax, ay, bx, by, dx, dy)) or
+      (o3 == 0 and _within(cx, cy, dx, dy, ax, ay)) or (o4 == 0 and _within(cx, cy, dx, dy, bx, by))):
+    return TOUCH
+  return None
+
+def _distance2(px, py, ax, ay, bx, by):
+  # squared distance from p to segment ab
+  (dx,dy) = (bx-ax, by-ay)
+  t = ((px-ax)*dx+(py-ay)*dy)/float(dx*dx+dy*dy)
+  t = max(0.0, min(1.0, t))
+  (qx,qy) = (ax+t*dx-px, ay+t*dy-py)
+  return qx*qx+qy*qy
+
+
+def _contacts(s):
+  # [(a, b, TOUCH ALONG or CROSS, x, y)] for every pair of segments that meet,
+  # but for the ends of segments following each other in a contour; items
+  # are segment indices, round holes -1-(index in circles)
+  (X0,Y0,X1,Y1,nxt) = (s.x0, s.y0, s.x1, s.y1, s.next)
+  pairs = []
+  hs = []      # horizontal segments (y, x0, x1, index)
+  vs = []      # vertical segments (x, y0, y1, index)
+  others = []  # (x0, y0, x1, y1, item)
+  for (k,(ax,ay,bx,by)) in enumerate(zip(X0, Y0, X1, Y1)):
+    if ay == by:
+      hs.append((ay, ax, bx, k) if ax < bx else (ay, bx, ax, k))
+    elif ax == bx:
+      vs.append((ax, ay, by, k) if ay < by else (ax, by, ay, k))
+    else:
+      others.append((min(ax,bx), min(ay,by), max(ax,bx), max(ay,by), k))
+  for (i,(r,cx,cy,p)) in enumerate(s.circles):
+    others.append((cx-r, cy-r, cx+r, cy+r, -1-i))
+
+  # collinear segments on the same line that overlap or meet end to end:
+  # those before on the line still reaching lo, kept sorted by where they end
+  for (runs,vertical) in ((hs,False), (vs,True)):
+    runs.sort()
+    active = []
+    line = None
+    for (c,lo,hi,k) in runs:
+      if c != line:
+        (line,active) = (c, [])
+      elif active:
+        del active[:bisect_left(active, (lo, -1))]
+        for (ahi,a) in active:
+          if nxt[a] != k and nxt[k] != a:
+            pairs.append((a, k, ALONG if ahi > lo else TOUCH, c if vertical else lo, lo if vertical else c))
+      insort(active, (hi, k))
+
+  def exact(a, b):
+    # record a and b if they meet; either may be a round hole
+    if a < 0 and b < 0:
+      (r1,x1,y1,p) = s.circles[-1-a]
+      (r2,x2,y2,p) = s.circles[-1-b]
+      d2 = (x1-x2)**2+(y1-y2)**2
+      if d2 <= (r1+r2)**2:
+        pairs.append((a, b, CROSS if d2 > (r1-r2)**2 else TOUCH, (x1+x2)//2, (y1+y2)//2))
+    elif a < 0 or b < 0:
+      (a,b) = (b, a) if a < 0 else (a, b)
+      (r,cx,cy,p) = s.circles[-1-b]
+      if _distance2(cx, cy, X0[a], Y0[a], X1[a], Y1[a]) <= r*r:
+        pairs.append((a, b, CROSS, cx, cy))
+    elif nxt[a] != b and nxt[b] != a:
+      how = _meet(X0[a], Y0[a], X1[a], Y1[a], X0[b], Y0[b], X1[b], Y1[b])
+      if how is not None:
+        pairs.append((a, b, how, X0[b], Y0[b]))
+
+  # the sweep, at each x: horizontal and other items start, vertical
+  # segments meet what is there, then horizontal and other items end
+  START, MEET, END = 0, 1, 2
+  events = [(h[1], START, h) for h in hs]+[(h[2], END, h) for h in hs]+[(v[0], MEET, v) for v in vs]
+  events.extend([(o[0], START, o) for o in others]+[(o[2], END, o) for o in others])
+  events.sort()
+  ys = []       # (y, index) of the horizontal segments the sweep is within
+  active = []   # (y0, y1, item) of the other items the sweep is within
+  top = len(X0)
+  # the other items reaching y0..y1 start at most tallest below y0
+  tallest = max([o[3]-o[1] for o in others] or [0])
+
+  def near(y0, y1):
+    return [o[2] for o in active[bisect_left(active, (y0-tallest,)):bisect_right(active, (y1, top, top))]
+            if o[1] >= y0]
+
+  for (x,kind,item) in events:
+    if kind == MEET:
+      (vx,y0,y1,v) = item
+      for (y,h) in ys[bisect_left(ys, (y0, -1)):bisect_right(ys, (y1, top))]:
+        if nxt[h] != v and nxt[v] != h:
+          crosses = y0 < y < y1 and X0[h] != vx != X1[h]
+          pairs.append((h, v, CROSS if crosses else TOUCH, vx, y))
+      if active:
+        for o in near(y0, y1):
+          exact(v, o)
+    elif len(item) == 4:  # horizontal
+      if kind == START:
+        insort(ys, (item[0], item[3]))
+        if active:
+          for o in near(item[0], item[0]):
+            exact(item[3], o)
+      else:
+        del ys[bisect_left(ys, (item[0], item[3]))]
+    elif kind == START:
+      (x0,y0,x1,y1,k) = item
+      for (y,h) in ys[bisect_left(ys, (y0, -1)):bisect_right(ys, (y1, top))]:
+        exact(k, h)
+      if active:
+        for o in near(y0, y1):
+          exact(k, o)
+      insort(active, (y0, y1, k))
+    else:
+      del active[bisect_left(active, (item[1], item[3], item[4]))]
+  return pairs
+
+
+def _cross(seg, y):
+  # x where segment seg, not horizontal, is at height y
+  (ax,ay,bx,by) = seg
+  return ax+(y-ay)*float(bx-ax)/(by-ay)
+
+class _Slabs(object):
+  # even-odd point in polygon tests against the same closed contours, the
+  # segments that cross each horizontal slab between their vertices listed
+  # once, put left to right when a test first needs them, so a test finds
+  # how many of its slab are to the right of it by bisection
+  def __init__(self, s, contours):
+    segments = [(s.x0[k], s.y0[k], s.x1[k], s.y1[k]) for c in contours
+                for k in range(s.start[c], s.start[c]+s.count[c]) if s.y0[k] != s.y1[k]]
+    self.ys = sorted(set([seg[1] for seg in segments]+[seg[3] for seg in segments]))
+    where = dict([(y, i) for (i,y) in enumerate(self.ys)])
+    self.slabs = [[] for y in self.ys]
+    for seg in segments:
+      for i in range(where[min(seg[1],seg[3])], where[max(seg[1],seg[3])]):
+        self.slabs[i].append(seg)
+    self.sorted = set()  # slabs put in order so far
+
+  def inside(self, x, y):
+    # 1 if x,y is inside the contours, 0 if outside, None if it may be on one
+    i = bisect_right(self.ys, y)-1
+    if i < 0 or i >= len(self.ys)-1:
+      return None if y in self.ys else 0
+    if y == self.ys[i]:
+      return None  # at the height of a vertex, where horizontal segments are
+    slab = self.slabs[i]
+    if i not in self.sorted:
+      # segments that do not cross keep their order across a slab, as they
+      # only meet at its ends
+      mid = (self.ys[i]+self.ys[i+1])/2.0
+      slab.sort(key=lambda seg: _cross(seg, mid))
+      self.sorted.add(i)
+    (lo,hi) = (0, len(slab))
+    while lo < hi:
+      mid = (lo+hi)//2
+      cross = _cross(slab[mid], y)
+      if cross < x:
+        lo = mid+1
+      elif cross > x:
+        hi = mid
+      else:
+        return None
+    return (len(slab)-lo) & 1
+
+
+def _shapeProblems(part):
+  # [(kind, x, y)] of the problems within part, in microns from its origin
+  s = _Segments()
+  s.addPart(part, 0, 0, 0)
+  # holes cut in from the edge of the part's bounding box
+  (w,h) = part.size
+  slots = set()
+  for (c,edge) in enumerate(part.holes):
+    (x0,y0,x1,y1) = edge.bounds()
+    if not (x0 and y0) or x1 == w or y1 == h:
+      slots.add(len(part.outline)+c)
+  found = []
+  touching = set()  # holes meeting the outline, by contour or circle item
+  for (a,b,how,x,y) in _contacts(s):
+    ca = s.contour[a] if a >= 0 else None
+    cb = s.contour[b] if b >= 0 else None
+    if ca is not None and ca == cb:
+      found.append(('self-intersection', x, y))
+      continue
+    (ra,rb) = (HOLE if ca is None else s.role[ca], HOLE if cb is None else s.role[cb])
+    # the insides of two contours overlap where they cross or run along each
+    # other from the same side; a hole should be on the outline's inside
+    side = s.sameSide(a, b) if how == ALONG and a >= 0 and b >= 0 else None
+    if ra != rb:
+      hole = (a if ca is None else ca) if ra == HOLE else (b if cb is None else cb)
+      touching.add(hole)
+      if (how == CROSS or side is False) and hole not in slots:
+        found.append(('hole crosses outline', x, y))
+    elif ra == HOLE and (how == CROSS or side):
+      found.append(('holes overlap', x, y))
+  outlines = s.outlines().get(0)
+  # a point of each hole not meeting the outline, to test
+  points = [(c, s.x0[s.start[c]], s.y0[s.start[c]]) for c in range(len(s.start))
+            if s.role[c] == HOLE and s.count[c] and c not in touching]
+  points.extend([(-1-i, cx, cy) for (i,(r,cx,cy,p)) in enumerate(s.circles) if -1-i not in touching])
+  if outlines and points:
+    inside = _Slabs(s, outlines).inside
+    for (hole,x,y) in points:
+      if inside(x, y) == 0:
+        found.append(('hole outside outline', x, y))
+  return found
+
+def _overlaps(parts):
+  # [(p, q, x, y)] of the pairs of parts overlapping, x,y in microns
+  boxes = sorted([(part.origin[0], part.origin[0]+part.size[0], part.origin[1], part.origin[1]+part.size[1], p)
+                  for (p,part) in enumerate(parts)])
+  pairs = set()
+  active = []
+  for (x0,x1,y0,y1,p) in boxes:
+    active = [b for b in active if b[1] > x0]
+    for (ax0,ax1,ay0,ay1,q) in active:
+      if ay0 < y1 and y0 < ay1:
+        pairs.add((min(p,q), max(p,q)))
+    active.append((x0,x1,y0,y1,p))
+  if not pairs:
+    return []
+  # sweep the outlines of the parts in those pairs together
+  s = _Segments()
+  for p in sorted(set([p for pair in pairs for p in pair])):
+    s.addPart(parts[p], p, parts[p].origin[0], parts[p].origin[1], holes=False)
+  found = {}
+  for (a,b,how,x,y) in _contacts(s):
+    pair = (s.part[s.contour[a]], s.part[s.contour[b]])
+    pair = (min(pair), max(pair))
+    if pair in pairs and pair not in found and (how == CROSS or (how == ALONG and s.sameSide(a, b))):
+      found[pair] = (x, y)
+  outlines = s.outlines()
+  slabs = {}
+  for (p,q) in sorted(pairs):
+    if (p,q) not in found and p in outlines and q in outlines:
+      for (inner,outer) in ((p,q), (q,p)):
+        if outer not in slabs:
+          slabs[outer] = _Slabs(s, outlines[outer])
+        point = _nested(s, outlines[inner], slabs[outer])
+        if point:
+          found[(p,q)] = point
+          break
+  return [(p, q, x, y) for ((p,q),(x,y)) in sorted(found.items())]
+
+def _nested(s, inner, slabs):
+  # a point of the contours inner inside slabs, or None; if no point of
+  # inner is clear of the slabs' contours they are the same shape, which
+  # counts
+  for c in inner:
+    for k in range(s.start[c], s.start[c]+s.count[c]):
+      where = slabs.inside(s.x0[k], s.y0[k])
+      if where is not None:
+        return (s.x0[k], s.y0[k]) if where else None
+  k = s.start[inner[0]]
+  return (s.x0[k], s.y0[k])
+
+
+def validateParts(parts):
+  # list of problems (kind, part name, other part name or None, (x,y) in mm)
+  # of the parts as drawn, at most one per kind and part or pair of parts
+  mm = lambda v: v/float(SCALE)
+  shapes = {}
+  found = {}
+  for part in parts:
+    shape = part.shape()
+    if shape not in shapes:
+      shapes[shape] = _shapeProblems(part)
+    (ox,oy) = part.origin
+    for (kind,x,y) in shapes[shape]:
+      if (kind, part.name) not in found:
+        found[(kind, part.name)] = (kind, part.name, None, (mm(x+ox), mm(y+oy)))
+  problems = sorted(found.values())
+  for (p,q,x,y) in _overlaps(parts):
+    problems.append(('parts overlap', parts[p].name, parts[q].name, (mm(x), mm(y))))
+  return problems
+
+def validateBox(box, kernel=side):
+  # the problems of box as generated, see validateParts()
+  return validateParts(collectParts(box, kernel=kernel))
+
+def describe(problem):
+  (kind,name,other,(x,y)) = problem
+  return '%s: %s%s at (%.3f, %.3f)' % (name, kind, '' if other is None else ' with '+other, x, y)
+
+
+class ValidatingSink(object):
+  # sink proxy passing everything on to sink and keeping the parts drawn for
+  # problems(), a part placed with placePart() as a copy of the earlier one
+  def __init__(self, sink):
+    self.sink = sink
+    self.collector = PartCollector()
+    self.named = {}  # part name -> Part
+    # only offer placePart() and drawPattern() if the sink takes them
+    self.placePart = self._placePart if getattr(sink, 'placePart', None) is not None else None
+    self.drawPattern = self._drawPattern if getattr(sink, 'drawPattern', None) is not None else None
+
+  def beginPart(self, name):
+    self.collector.beginPart(name)
+    self.sink.beginPart(name)
+
+  def endPart(self):
+    self.collector.endPart()
+    part = self.collector.parts[-1]
+    self.named[part.name] = part
+    self.sink.endPart()
+
+  def drawS(self, path):
+    self.collector.drawS(path)
+    self.sink.drawS(path)
+
+  def drawHole(self, path):
+    self.collector.drawHole(path)
+    self.sink.drawHole(path)
+
+  def drawCircle(self, r, centre):
+    self.collector.drawCircle(r, centre)
+    self.sink.drawCircle(r, centre)
+
+  def _drawPattern(self, pattern):
+    pattern.draw(self.collector)
+    self.sink.drawPattern(pattern)
+
+  def _placePart(self, name, like, offset):
+    part = self.named[like].placed(name, microns(offset[0]), microns(offset[1]))
+    self.collector.parts.append(part)
+    self.named[name] = part
+    self.sink.placePart(name, like, offset)
+
+  def problems(self):
+    return validateParts(self.collector.parts)